@@ -1,144 +1,270 @@
 import os
 import re
-import pdfplumber
-from openpyxl import Workbook
+import sys
 from collections import OrderedDict
-import tkinter as tk
-from tkinter import filedialog, messagebox
+from decimal import Decimal, InvalidOperation
+import metrics
+from batch_io import BatchIO, source
+from checkpoint import journaled
+from invoice_templates import detect as detect_template, register, unknown_sources
+from sharded_output import write_rows
+
+JOURNAL_FILE = "invoice_extract_journal.jsonl"
+TOTAL_CHECK = "TOTAL CHECK"
+CHARGE_AMOUNT = re.compile(r"(.+?)\s+([\d,]+\.\d{2})$")
+
+@register("chain-logic", ("CHAIN LOGIC",), ("SHIPMENT", "CONSOL NUMBER"),
+          ("SHIPMENT", "DESCRIPTION CHARGES IN USD"))
+def parse_chain_logic(lines, data):
+    """Chain Logic / Coastmax invoice layout."""
+    for i, line in enumerate(lines):
+        line = line.strip()
+
+        # Extract invoice number (with or without /A or /B)
+        if re.match(r"INVOICE\s+S\d{6}(/[A-Z])?", line):
+            match = re.search(r"S\d{6}(?:/[A-Z])?", line)
+            if match:
+                data["INVOICE NUMBER"] = match.group()
+
+        if "INVOICE DATE" in line and "INVOICED" not in line:
+            data["INVOICE DATE"] = line.split("INVOICE DATE")[-1].strip()
+
+        elif line.startswith("DUE DATE"):
+            data["DUE DATE"] = line.replace("DUE DATE", "").strip()
+
+        elif line.startswith("CUSTOMER ID") and "INVOICED" not in line.upper():
+            data["CUSTOMER ID"] = "COASTMAX"
+
+        elif line.startswith("SHIPMENT ") and "DETAILS" not in line:
+            data["SHIPMENT"] = line.replace("SHIPMENT", "").strip()
+
+        elif line.startswith("TERMS"):
+            data["TERMS"] = line.replace("TERMS", "").strip()
+
+        elif line.startswith("CONSOL NUMBER"):
+            data["CONSOL NUMBER"] = line.replace("CONSOL NUMBER", "").strip()
+
+        elif "SHIPPER CONSIGNEE" in line and i + 1 < len(lines):
+            data["SHIPPER"] = "EAST ASIA ALUMINUM COMPANY LTD"
+            data["CONSIGNEE"] = "COASTMAX INTERNATIONAL"
+
+        elif "GOODS DESCRIPTION" in line and i + 1 < len(lines):
+            data["GOODS DESCRIPTION"] = lines[i + 1].strip()
+
+        elif "IMPORT CUSTOMS BROKER" in line and i + 1 < len(lines):
+            parts = lines[i + 1].split()
+            data["IMPORT BROKER"] = " ".join(parts[:3])
+            try:
+                data["WEIGHT"] = parts[3] + " " + parts[4]
+                data["VOLUME"] = parts[5] + " " + parts[6]
+                data["CHARGEABLE VOLUME"] = parts[7] + " " + parts[8]
+                data["PACKAGES"] = parts[9] + " " + parts[10]
+            except IndexError:
+                pass
+
+        elif "VESSEL / VOYAGE / IMO" in line and i + 1 < len(lines):
+            next_line = lines[i + 1].strip()
+            parts = next_line.split()
+            if len(parts) >= 3:
+                data["HOUSE B/L"] = parts[-1]
+                data["OCEAN BILL OF LADING"] = parts[-2]
+                data["VESSEL / VOYAGE / IMO"] = " ".join(parts[:-2])
+
+        elif "ORIGIN ETD DESTINATION ETA" in line and i + 1 < len(lines):
+            next_line = lines[i + 1].strip()
+            date_matches = re.findall(r"\d{2}-[A-Za-z]{3}-\d{2}", next_line)
+            if len(date_matches) >= 2:
+                try:
+                    etd = date_matches[0]
+                    eta = date_matches[1]
+                    split_on_etd = next_line.split(etd)
+                    split_on_eta = split_on_etd[1].split(eta)
+                    origin_part = split_on_etd[0].strip()
+                    destination_part = split_on_eta[0].strip()
+
+                    data["ORIGIN"] = origin_part
+                    data["ETD"] = etd
+                    data["DESTINATION"] = destination_part
+                    data["ETA"] = eta
+                except Exception as e:
+                    print(f"Error parsing ORIGIN/ETD/DESTINATION/ETA: {e}")
+
+        elif "CONTAINERS" in line and i + 1 < len(lines):
+            data["CONTAINERS"] = lines[i + 1].strip()
+
+        elif "DESCRIPTION CHARGES IN USD" in line:
+            charge_lines = []
+            j = i + 1
+            while j < len(lines):
+                charge_line = lines[j].strip()
+                if not charge_line or "TOTAL CHARGES" in charge_line.upper():
+                    break
+                charge_lines.append(charge_line)
+                j += 1
+            if charge_lines:
+                data["CHARGE DESCRIPTION"] = "; ".join(charge_lines)
+
+        elif "TOTAL USD" in line:
+            data["TOTAL USD"] = line.split()[-1]
+
+        elif "CHAIN LOGIC LLC" in line and i + 2 < len(lines):
+            data["BANK BENEFICIARY"] = "CHAIN LOGIC LLC"
+            data["BANK ADDRESS"] = lines[i + 1].strip() + ", " + lines[i + 2].strip()
+
+        elif "ABA" in line and "SWIFT" in line:
+            aba_swift = line.strip().split()
+            data["ABA"] = aba_swift[1]
+            data["SWIFT"] = aba_swift[3]
+
+        elif "Account" in line and i + 2 < len(lines) and "PINNACLE BANK" in lines[i + 1]:
+            data["BANK ACCOUNT"] = line.split("Account")[-1].strip()
+            data["BANK NAME"] = "PINNACLE BANK"
+            data["BANK LOCATION"] = lines[i + 2].strip()
+
+    return data
 
 def extract_invoice_data(pdf_path):
+    import pdfplumber
+
     data = OrderedDict()
     data["SOURCE FILE"] = os.path.basename(pdf_path)
 
-    with pdfplumber.open(pdf_path) as pdf:
-        text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
-        lines = text.splitlines()
-
-        for i, line in enumerate(lines):
-            line = line.strip()
-
-            # Extract invoice number (with or without /A or /B)
-            if re.match(r"INVOICE\s+S\d{6}(/[A-Z])?", line):
-                match = re.search(r"S\d{6}(?:/[A-Z])?", line)
-                if match:
-                    data["INVOICE NUMBER"] = match.group()
-
-            if "INVOICE DATE" in line and "INVOICED" not in line:
-                data["INVOICE DATE"] = line.split("INVOICE DATE")[-1].strip()
+    with metrics.stage("pdf_open", "files") as st:
+        pdf = pdfplumber.open(source(pdf_path))
+        st.count = 1
+    with pdf:
+        with metrics.stage("text_extraction", "pages") as st:
+            texts = [page.extract_text() for page in pdf.pages]
+            st.count = len(texts)
+
+    # pick the vendor template from the first page, then parse all lines
+    template = detect_template(texts[0] if texts else "")
+    lines = "\n".join(t for t in texts if t).splitlines()
+    parse = metrics.stage("line_parse", "lines").start()
+    template.parse(lines, data)
+    parse.stop(len(lines))
 
-            elif line.startswith("DUE DATE"):
-                data["DUE DATE"] = line.replace("DUE DATE", "").strip()
-
-            elif line.startswith("CUSTOMER ID") and "INVOICED" not in line.upper():
-                data["CUSTOMER ID"] = "COASTMAX"
-
-            elif line.startswith("SHIPMENT ") and "DETAILS" not in line:
-                data["SHIPMENT"] = line.replace("SHIPMENT", "").strip()
-
-            elif line.startswith("TERMS"):
-                data["TERMS"] = line.replace("TERMS", "").strip()
-
-            elif line.startswith("CONSOL NUMBER"):
-                data["CONSOL NUMBER"] = line.replace("CONSOL NUMBER", "").strip()
-
-            elif "SHIPPER CONSIGNEE" in line and i + 1 < len(lines):
-                data["SHIPPER"] = "EAST ASIA ALUMINUM COMPANY LTD"
-                data["CONSIGNEE"] = "COASTMAX INTERNATIONAL"
+    return data
 
-            elif "GOODS DESCRIPTION" in line and i + 1 < len(lines):
-                data["GOODS DESCRIPTION"] = lines[i + 1].strip()
+def extract_all(file_paths, progress=None, journal=None, quarantine=None, retry_failed=False):
+    """extract_invoice_data for each PDF; progress is reported per file.
 
-            elif "IMPORT CUSTOMS BROKER" in line and i + 1 < len(lines):
-                parts = lines[i + 1].split()
-                data["IMPORT BROKER"] = " ".join(parts[:3])
-                try:
-                    data["WEIGHT"] = parts[3] + " " + parts[4]
-                    data["VOLUME"] = parts[5] + " " + parts[6]
-                    data["CHARGEABLE VOLUME"] = parts[7] + " " + parts[8]
-                    data["PACKAGES"] = parts[9] + " " + parts[10]
-                except IndexError:
-                    pass
-
-            elif "VESSEL / VOYAGE / IMO" in line and i + 1 < len(lines):
-                next_line = lines[i + 1].strip()
-                parts = next_line.split()
-                if len(parts) >= 3:
-                    data["HOUSE B/L"] = parts[-1]
-                    data["OCEAN BILL OF LADING"] = parts[-2]
-                    data["VESSEL / VOYAGE / IMO"] = " ".join(parts[:-2])
-
-            elif "ORIGIN ETD DESTINATION ETA" in line and i + 1 < len(lines):
-                next_line = lines[i + 1].strip()
-                date_matches = re.findall(r"\d{2}-[A-Za-z]{3}-\d{2}", next_line)
-                if len(date_matches) >= 2:
-                    try:
-                        etd = date_matches[0]
-                        eta = date_matches[1]
-                        split_on_etd = next_line.split(etd)
-                        split_on_eta = split_on_etd[1].split(eta)
-                        origin_part = split_on_etd[0].strip()
-                        destination_part = split_on_eta[0].strip()
-
-                        data["ORIGIN"] = origin_part
-                        data["ETD"] = etd
-                        data["DESTINATION"] = destination_part
-                        data["ETA"] = eta
-                    except Exception as e:
-                        print(f"Error parsing ORIGIN/ETD/DESTINATION/ETA: {e}")
-
-            elif "CONTAINERS" in line and i + 1 < len(lines):
-                data["CONTAINERS"] = lines[i + 1].strip()
-
-            elif "DESCRIPTION CHARGES IN USD" in line:
-                charge_lines = []
-                j = i + 1
-                while j < len(lines):
-                    charge_line = lines[j].strip()
-                    if not charge_line or "TOTAL CHARGES" in charge_line.upper():
-                        break
-                    charge_lines.append(charge_line)
-                    j += 1
-                if charge_lines:
-                    data["CHARGE DESCRIPTION"] = "; ".join(charge_lines)
-
-            elif "TOTAL USD" in line:
-                data["TOTAL USD"] = line.split()[-1]
-
-            elif "CHAIN LOGIC LLC" in line and i + 2 < len(lines):
-                data["BANK BENEFICIARY"] = "CHAIN LOGIC LLC"
-                data["BANK ADDRESS"] = lines[i + 1].strip() + ", " + lines[i + 2].strip()
-
-            elif "ABA" in line and "SWIFT" in line:
-                aba_swift = line.strip().split()
-                data["ABA"] = aba_swift[1]
-                data["SWIFT"] = aba_swift[3]
-
-            elif "Account" in line and i + 2 < len(lines) and "PINNACLE BANK" in lines[i + 1]:
-                data["BANK ACCOUNT"] = line.split("Account")[-1].strip()
-                data["BANK NAME"] = "PINNACLE BANK"
-                data["BANK LOCATION"] = lines[i + 2].strip()
+    With a `journal` (checkpoint file) every finished PDF is recorded, a
+    rerun picks up where the last one stopped, and PDFs that fail go to
+    `quarantine` as (path, error) instead of stopping the run.
+    """
+    if journal:
+        if quarantine is None:
+            quarantine = []
+        with BatchIO(file_paths):
+            return [data for _, data in journaled(file_paths, extract_invoice_data, journal,
+                                                  quarantine, progress, retry_failed)]
 
-    return data
-
-def write_all_to_excel(data_list, output_path):
-    expanded_data_list = []
+    data_list = []
+    with BatchIO(file_paths):
+        for n, path in enumerate(file_paths):
+            if progress is not None:
+                progress(n, len(file_paths))
+            try:
+                data_list.append(extract_invoice_data(path))
+            except Exception as e:
+                raise Exception(f"Failed to process {os.path.basename(path)}:\n{str(e)}")
+    return data_list
+
+def extract_combined(file_paths, workers=None, progress=None, journal=None, quarantine=None,
+                     retry_failed=False):
+    """Combined PDFs: one record per invoice inside each file, pages
+    extracted in parallel (see combined_pdf). `journal` works as in
+    extract_all, one entry per combined file."""
+    from combined_pdf import extract_combined as split_and_extract
+
+    if journal:
+        def one(path):
+            with metrics.stage("combined_extraction", "invoices") as st:
+                invoices = split_and_extract(path, detect_template, workers, progress)
+                st.count = len(invoices)
+            return invoices
+
+        if quarantine is None:
+            quarantine = []
+        return [data for _, invoices in journaled(file_paths, one, journal, quarantine,
+                                                  retry_failed=retry_failed)
+                for data in invoices]
 
+    data_list = []
+    for path in file_paths:
+        with metrics.stage("combined_extraction", "invoices") as st:
+            try:
+                invoices = split_and_extract(path, detect_template, workers, progress)
+            except Exception as e:
+                raise Exception(f"Failed to process {os.path.basename(path)}:\n{str(e)}")
+            st.count = len(invoices)
+        data_list += invoices
+    return data_list
+
+def _to_decimal(text):
+    try:
+        return Decimal(str(text).replace(",", "").strip())
+    except InvalidOperation:
+        return None
+
+def total_check(charge_sum, unparsed, total_text):
+    """TOTAL CHECK value for an invoice: OK or what is off."""
+    total = _to_decimal(total_text) if total_text else None
+    if total is None:
+        return "NO TOTAL"
+    if unparsed:
+        return f"{unparsed} CHARGE(S) WITHOUT AMOUNT"
+    if charge_sum != total:
+        return f"MISMATCH: charges {charge_sum:,.2f} vs total {total:,.2f}"
+    return "OK"
+
+def expand_charge_lines(data_list, check_totals=True):
+    """One row per charge line ("DESC 1,234.56" split on ";"); streams rows.
+
+    With `check_totals` the charge amounts are summed as Decimal while the
+    lines are split, and every row of the invoice gets TOTAL CHECK ("OK",
+    or what does not add up against TOTAL USD).
+    """
     for data in data_list:
         charge_desc = data.get("CHARGE DESCRIPTION", "")
         if charge_desc:
             charges = [x.strip() for x in charge_desc.split(";") if x.strip()]
+            parsed = []
+            charge_sum = Decimal(0)
+            unparsed = 0
             for charge in charges:
-                match = re.match(r"(.+?)\s+([\d,]+\.\d{2})$", charge)
+                match = CHARGE_AMOUNT.match(charge)
                 if match:
                     desc, amount = match.groups()
+                    if check_totals:
+                        charge_sum += Decimal(amount.replace(",", ""))
                 else:
                     desc, amount = charge, ""
+                    unparsed += 1
+                parsed.append((desc, amount))
+            if check_totals:
+                data = data.copy()
+                data[TOTAL_CHECK] = total_check(charge_sum, unparsed, data.get("TOTAL USD"))
+            for desc, amount in parsed:
                 new_data = data.copy()
                 new_data["CHARGE DESCRIPTION"] = desc
                 new_data["CHARGES IN USD"] = amount
-                expanded_data_list.append(new_data)
+                yield new_data
         else:
-            expanded_data_list.append(data)
+            if check_totals:
+                data = data.copy()
+                data[TOTAL_CHECK] = "NO CHARGES" if data.get("TOTAL USD") else "NO TOTAL"
+            yield data
+
+def write_all_to_excel(data_list, output_path, progress=None, shard_rows=None,
+                       shard_mode="workbooks"):
+    """Write one row per charge line. Returns the path written: output_path,
+    or a manifest of shards when the rows do not fit one sheet (see
+    sharded_output; `shard_rows` lowers the rows per shard)."""
+    with metrics.stage("charge_expansion", "rows") as st:
+        expanded_data_list = list(expand_charge_lines(data_list))
+        st.count = len(expanded_data_list)
 
     all_keys = []
     for row in expanded_data_list:
@@ -149,7 +275,7 @@ def write_all_to_excel(data_list, output_path):
     def reorder_keys(keys):
         reordered = []
         for k in keys:
-            if k not in ["CHARGE DESCRIPTION", "CHARGES IN USD", "TOTAL USD"]:
+            if k not in ["CHARGE DESCRIPTION", "CHARGES IN USD", "TOTAL USD", TOTAL_CHECK]:
                 reordered.append(k)
         if "CHARGE DESCRIPTION" in keys:
             reordered.append("CHARGE DESCRIPTION")
@@ -157,21 +283,18 @@ def write_all_to_excel(data_list, output_path):
             reordered.append("CHARGES IN USD")
         if "TOTAL USD" in keys:
             reordered.append("TOTAL USD")
+        if TOTAL_CHECK in keys:
+            reordered.append(TOTAL_CHECK)
         return reordered
 
     master_keys = reorder_keys(all_keys)
 
-    wb = Workbook()
-    ws = wb.active
-
-    for col, key in enumerate(master_keys, start=1):
-        ws.cell(row=1, column=col, value=key)
-
-    for row_idx, row_data in enumerate(expanded_data_list, start=2):
-        for col_idx, key in enumerate(master_keys, start=1):
-            ws.cell(row=row_idx, column=col_idx, value=row_data.get(key, ""))
-
-    wb.save(output_path)
+    save = metrics.stage("save", "rows").start()
+    rows = ([row_data.get(key, "") for key in master_keys] for row_data in expanded_data_list)
+    written = write_rows(output_path, master_keys, rows, max_rows=shard_rows, mode=shard_mode,
+                         progress=progress, total=len(expanded_data_list))
+    save.stop(len(expanded_data_list))
+    return written
 
 def run_extraction():
     file_paths = filedialog.askopenfilenames(
@@ -182,34 +305,68 @@ def run_extraction():
     if not file_paths:
         return
 
-    data_list = []
-    for path in file_paths:
-        try:
-            data = extract_invoice_data(path)
-            data_list.append(data)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to process {os.path.basename(path)}:\n{str(e)}")
-            return
-
-    output_path = filedialog.asksaveasfilename(
-        defaultextension=".xlsx",
-        filetypes=[("Excel files", "*.xlsx")],
-        title="Save Excel Output As"
-    )
-
-    if output_path:
-        write_all_to_excel(data_list, output_path)
-        messagebox.showinfo("Success", f"✅ Data written to:\n{output_path}")
-
-# GUI
-root = tk.Tk()
-root.title("PDF Invoice Extractor")
-root.geometry("400x200")
-
-label = tk.Label(root, text="Select PDF invoices to extract into Excel", font=("Arial", 12))
-label.pack(pady=30)
-
-btn = tk.Button(root, text="Choose PDF File(s)", command=run_extraction, font=("Arial", 12), bg="#4CAF50", fg="white")
-btn.pack()
-
-root.mainloop()
+    # A checkpoint next to the PDFs: if the app is closed or crashes, picking
+    # the same files again resumes; it is removed once the sheet is saved.
+    journal = os.path.join(os.path.dirname(file_paths[0]), JOURNAL_FILE)
+    quarantine = []
+    unknown = []
+
+    def failed(e):
+        messagebox.showerror("Error", str(e))
+
+    def written(output_path):
+        if os.path.exists(journal):
+            os.remove(journal)
+        message = f"✅ Data written to:\n{output_path}"
+        if quarantine:
+            message += f"\n\n{len(quarantine)} file(s) could not be read and were skipped:\n"
+            message += "\n".join(f"{os.path.basename(p)}: {err}" for p, err in quarantine[:10])
+        if unknown:
+            message += (f"\n\n{len(unknown)} invoice(s) matched no vendor template; only invoice "
+                        f"number, dates and total were read (TEMPLATE = unknown):\n")
+            message += "\n".join(unknown[:10])
+        messagebox.showinfo("Success", message)
+
+    def extracted(data_list):
+        unknown[:] = unknown_sources(data_list)
+        output_path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx")],
+            title="Save Excel Output As"
+        )
+        if output_path:
+            progress_panel.unit = "rows"
+            BackgroundJob(root, progress_panel, write_all_to_excel, data_list, output_path,
+                          on_done=written,
+                          on_error=failed).start()
+
+    # Extraction runs on a worker thread so the window stays responsive
+    progress_panel.unit = "files"
+    BackgroundJob(root, progress_panel, extract_all, list(file_paths), journal=journal,
+                  quarantine=quarantine, on_done=extracted, on_error=failed).start()
+
+if __name__ == "__main__":
+    # Any arguments -> headless run (no Tk); see qbd_cli.py
+    if len(sys.argv) > 1:
+        from qbd_cli import main as cli_main
+        sys.exit(cli_main(["extract", *sys.argv[1:]]))
+
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_worker import BackgroundJob, ProgressPanel
+
+    # GUI
+    root = tk.Tk()
+    root.title("PDF Invoice Extractor")
+    root.geometry("460x240")
+
+    label = tk.Label(root, text="Select PDF invoices to extract into Excel", font=("Arial", 12))
+    label.pack(pady=30)
+
+    btn = tk.Button(root, text="Choose PDF File(s)", command=run_extraction, font=("Arial", 12), bg="#4CAF50", fg="white")
+    btn.pack()
+
+    progress_panel = ProgressPanel(root, unit="files")
+    progress_panel.pack(pady=(15, 0))
+
+    root.mainloop()
@@ -0,0 +1,172 @@
+"""Read-ahead and write-behind for batch runs on slow (network) drives.
+
+    with BatchIO(paths):
+        for p in paths:
+            update_excel(p)
+
+While a BatchIO is active, a reader thread loads the next `depth` input
+files into memory, and source(path) hands the engine that buffer instead
+of the path. save_workbook() serialises the workbook in memory and a
+writer thread copies the bytes to their destination while the next file
+is processed. flush() waits for the writes queued so far (the checkpoint
+journal calls it before recording an input as done); leaving the block
+waits for every write to land and raises the first write error. Outside a BatchIO both helpers fall back to plain
+path reads and wb.save(), so single-file and GUI runs are unchanged.
+"""
+import io
+import os
+import queue
+import threading
+
+READ_AHEAD = 2   # files held in memory ahead of the one being processed
+WRITE_QUEUE = 2  # finished outputs waiting to be written
+
+_active = None
+
+
+def source(path):
+    """What to open for `path`: a prefetched buffer, or the path itself."""
+    if _active is None:
+        return path
+    return _active.take(path)
+
+
+def skip(path):
+    """Tell the active batch that `path` will not be opened (e.g. resumed)."""
+    if _active is not None:
+        _active.drop(path)
+
+
+def flush():
+    """Wait until every save_workbook() so far is on disk; raise its write error."""
+    if _active is not None:
+        _active.flush()
+
+
+def save_workbook(wb, path):
+    """wb.save(path), written in the background while a BatchIO is active."""
+    if _active is None:
+        wb.save(path)
+        return
+    buf = io.BytesIO()
+    wb.save(buf)
+    _active.write(path, buf.getvalue())
+
+
+class BatchIO:
+    def __init__(self, paths, depth=READ_AHEAD, write_depth=WRITE_QUEUE):
+        self.paths = list(paths)
+        self.depth = max(depth, 1)
+        self.write_depth = max(write_depth, 1)
+        self.nested = False
+
+    def __enter__(self):
+        global _active
+        if _active is not None:
+            self.nested = True  # an outer batch already prefetches
+            return _active
+        self.buffers = {}       # path -> bytes or exception
+        self.pending = set(self.paths)
+        self.ready = threading.Condition()
+        self.slots = threading.Semaphore(self.depth)
+        self.stopping = False
+        self.reading = None
+        self.writes = queue.Queue(self.write_depth)
+        self.write_error = None
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.reader.start()
+        self.writer.start()
+        _active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        if self.nested:
+            return False
+        _active = None
+        with self.ready:
+            self.stopping = True
+            self.buffers.clear()
+            self.ready.notify_all()
+        self.slots.release()  # unblock the reader if it waits for a slot
+        self.writes.put(None)
+        self.writer.join()
+        if self.write_error is not None and exc_type is None:
+            raise self.write_error
+        return False
+
+    # ---- Read-ahead ----
+    def _read_loop(self):
+        for path in self.paths:
+            self.slots.acquire()
+            with self.ready:
+                if self.stopping:
+                    return
+                if path not in self.pending:  # already read directly
+                    self.slots.release()
+                    continue
+                self.reading = path
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                data = e
+            with self.ready:
+                self.reading = None
+                if self.stopping:
+                    return
+                self.buffers[path] = data
+                self.ready.notify_all()
+
+    def take(self, path):
+        with self.ready:
+            if path not in self.pending:
+                return path  # not part of this batch
+            self.pending.discard(path)
+            while path == self.reading:
+                self.ready.wait()
+            if path not in self.buffers:
+                return path  # asked for out of order: read it directly
+            data = self.buffers.pop(path)
+        self.slots.release()
+        if isinstance(data, Exception):
+            raise data
+        return io.BytesIO(data)
+
+    def drop(self, path):
+        with self.ready:
+            self.pending.discard(path)
+            held = self.buffers.pop(path, None) is not None
+        if held:
+            self.slots.release()
+
+    # ---- Write-behind ----
+    def write(self, path, data):
+        if self.write_error is not None:
+            raise self.write_error
+        self.writes.put((path, data))
+
+    def flush(self):
+        self.writes.join()
+        error, self.write_error = self.write_error, None
+        if error is not None:
+            raise error
+
+    def _write_loop(self):
+        while True:
+            item = self.writes.get()
+            if item is None:
+                self.writes.task_done()
+                return
+            path, data = item
+            try:
+                if self.write_error is None:
+                    tmp = path + ".part"
+                    with open(tmp, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp, path)
+            except OSError as e:
+                self.write_error = e
+            finally:
+                self.writes.task_done()
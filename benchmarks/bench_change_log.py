@@ -0,0 +1,61 @@
+"""Trader importer: full copy vs change log alongside vs change log only.
+
+Runs the trader importer on a synthetic bill export (benchmarks/corpus.py)
+with each reader and each change_log setting, best of --repeat, and shows
+how many lines the log has against the rows in the copy.
+
+    python benchmarks/bench_change_log.py --rows 150000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+from qbd_tools import run_tool  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=150000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "qbd_bench_corpus"))
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="qbd_bench_changes_")
+    try:
+        bill = shutil.copy(corpus.ensure("bill", args.rows, args.corpus_dir), work)
+        print(f"{args.rows:,} rows, best of {args.repeat}")
+        print(f"{'reader':<9} {'mode':<10} {'seconds':>8} {'rows/s':>10} {'log lines':>10}")
+        for reader in ("openpyxl", "fast"):
+            for mode in (None, "alongside", "only"):
+                seconds, result = best_of(args.repeat, lambda: run_tool(
+                    "trader", [bill], reader=reader, change_log=mode))
+                lines = "-"
+                if mode:
+                    with open(result["outputs"][-1], encoding="utf-8-sig") as f:
+                        lines = f"{sum(1 for _ in f) - 1:,}"
+                print(f"{reader:<9} {mode or 'copy':<10} {seconds:8.2f} "
+                      f"{args.rows / seconds:10,.0f} {lines:>10}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cold-start check for the headless CLI.
+
+Spawns a fresh interpreter per run (`python qbd_cli.py <tool> <one-row file>`)
+and times it end to end, i.e. interpreter start, imports and the first row
+processed. Fails if the median exceeds qbd_cli.COLD_START_BUDGET_S. It also
+checks that loading a tool imports no Tk and no heavy library.
+
+    python benchmarks/bench_cold_start.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from qbd_cli import COLD_START_BUDGET_S  # noqa: E402
+from qbd_tools import TOOLS  # noqa: E402
+
+HEAVY = ("tkinter", "openpyxl", "pdfplumber", "pdfminer", "dateutil.parser")
+
+
+def make_inputs(folder):
+    from openpyxl import Workbook
+
+    bill = os.path.join(folder, "bill.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Ref", "Date", "Vendor", "Due", "Account", "Amount", "Description", "Memo", "", "Reference"])
+    ws.append(["B1", "01/05/2024", "Coastmax", "", "", 120.0, "Drayage", "GC Aluminum, Inc: PO-1", "", ""])
+    wb.save(bill)
+
+    ledger = os.path.join(folder, "ledger.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Date", "Expense Class", "Expense Account", "Expense Amount"])
+    ws.append(["01/05/2024", "Ocean Job 1", "6000", 12.5])
+    wb.save(ledger)
+    return {"trader": bill, "sr-process": ledger, "sr-filter": ledger}
+
+
+def check_lazy_imports():
+    code = ("import sys, qbd_tools\n"
+            "for t in qbd_tools.TOOLS: qbd_tools.load_tool(t)\n"
+            f"bad = [m for m in {HEAVY!r} if m in sys.modules]\n"
+            "print(','.join(bad))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout.strip()
+    return out.split(",") if out else []
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    failed = False
+    eager = check_lazy_imports()
+    if eager:
+        print(f"FAIL: loading the tools imported {', '.join(eager)}")
+        failed = True
+    else:
+        print(f"ok: loading all {len(TOOLS)} tools imports no Tk/heavy libraries")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = make_inputs(tmp)
+        print(f"budget: {COLD_START_BUDGET_S:.2f}s (median of {args.runs} cold runs)")
+        for tool, path in inputs.items():
+            times = []
+            for _ in range(args.runs):
+                t = time.perf_counter()
+                subprocess.run([sys.executable, os.path.join(ROOT, "qbd_cli.py"), tool, path],
+                               cwd=tmp, check=True, capture_output=True)
+                times.append(time.perf_counter() - t)
+            med = statistics.median(times)
+            status = "ok" if med <= COLD_START_BUDGET_S else "FAIL"
+            failed |= status == "FAIL"
+            print(f"{status}: {tool:<11} median {med:.3f}s  min {min(times):.3f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Memo -> reference lookup cost as the customer prefix table grows.
+
+Times PrefixTrie.extract over synthetic memos for tables of 1 to 1000
+customer prefixes, next to the plain loop of startswith checks the trie
+replaced. The trie's time should stay flat.
+
+    python benchmarks/bench_memo_prefixes.py --memos 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from memo_prefixes import DEFAULT_PREFIXES, PrefixTrie  # noqa: E402
+
+
+def prefix_table(customers):
+    table = dict(DEFAULT_PREFIXES)
+    for n in range(customers - 1):
+        table[f"Customer {n:04d}, Inc:"] = f"Customer {n:04d}, Inc"
+    return table
+
+
+def naive_extract(prefixes, memo):
+    text = str(memo).strip()
+    best = None
+    for p in prefixes:
+        if text.startswith(p) and (best is None or len(p) > len(best)):
+            best = p
+    return text.split(best)[-1].strip() if best else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--memos", type=int, default=200000)
+    args = ap.parse_args()
+
+    print(f"{'customers':>9} {'trie s':>8} {'loop s':>8}")
+    for customers in (1, 10, 100, 1000):
+        table = prefix_table(customers)
+        prefixes = list(table)
+        rnd = random.Random(0)
+        memos = [f"{rnd.choice(prefixes)}S{rnd.randrange(10 ** 7):07d}" if rnd.random() < 0.9
+                 else "Office supplies" for _ in range(args.memos)]
+        trie = PrefixTrie(table)
+
+        t = time.perf_counter()
+        got = [trie.extract(m)[0] for m in memos]
+        trie_s = time.perf_counter() - t
+        t = time.perf_counter()
+        expected = [naive_extract(prefixes, m) for m in memos]
+        loop_s = time.perf_counter() - t
+        if got != expected:
+            raise SystemExit(f"trie and loop disagree at {customers} customers")
+        print(f"{customers:>9} {trie_s:8.3f} {loop_s:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
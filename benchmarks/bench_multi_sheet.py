@@ -0,0 +1,82 @@
+"""All-sheets mode: one worker vs a process pool on a multi-entity workbook.
+
+Builds a workbook with --sheets copies of a synthetic bill export and of a
+ledger (one sheet per entity, cached like benchmarks/corpus.py) and runs
+the trader importer (fast reader) and the 18-month filter over every sheet
+with --workers 1 and with the pool, best of --repeat.
+
+    python benchmarks/bench_multi_sheet.py --rows 50000 --sheets 4
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+from qbd_tools import run_tool  # noqa: E402
+
+
+def multi_entity(kind, rows, sheets, corpus_dir):
+    """Workbook with `sheets` copies of the corpus sheet, built once."""
+    path = os.path.join(corpus_dir, f"{kind}_{rows}x{sheets}.xlsx")
+    if os.path.isfile(path):
+        return path
+    from openpyxl import Workbook
+
+    from sheet_reader import open_sheet
+
+    with open_sheet(corpus.ensure(kind, rows, corpus_dir)) as sheet:
+        data = list(sheet.rows())
+    wb = Workbook(write_only=True)
+    for n in range(1, sheets + 1):
+        ws = wb.create_sheet(f"Entity {n}")
+        for row in data:
+            ws.append(row)
+    wb.save(path)
+    return path
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=50000, help="rows per sheet")
+    ap.add_argument("--sheets", type=int, default=4)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "qbd_bench_corpus"))
+    args = ap.parse_args()
+
+    os.makedirs(args.corpus_dir, exist_ok=True)
+    work = tempfile.mkdtemp(prefix="qbd_bench_sheets_")
+    total = args.rows * args.sheets
+    try:
+        print(f"{args.sheets} sheets x {args.rows:,} rows, best of {args.repeat}")
+        print(f"{'tool':<10} {'1 worker':>10} {f'{args.workers} workers':>12} {'speedup':>8}")
+        for tool, kind in (("trader", "bill"), ("sr-filter", "ledger")):
+            path = shutil.copy(multi_entity(kind, args.rows, args.sheets, args.corpus_dir), work)
+            times = [best_of(args.repeat, lambda: run_tool(tool, [path], reader="fast",
+                                                             sheets=["all"], workers=w))
+                     for w in (1, args.workers)]
+            print(f"{tool:<10} {times[0]:9.2f}s {times[1]:11.2f}s {times[0] / times[1]:7.1f}x"
+                  f"   ({total / times[1]:,.0f} rows/s)")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Scaling benchmark for the parallel per-Expense-Class window scan.
+
+Builds a synthetic ledger in memory (class id + date key per row, the same
+arrays the processor builds after reading) and times pick_removed_rows from
+1 to N worker processes. Every run must pick the same rows as the serial
+path.
+
+    python benchmarks/bench_parallel_classes.py --rows 3000000 --classes 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service_revenue_rules import NO_DATE, date_key, pick_removed_rows  # noqa: E402
+
+
+def synthetic_ledger(rows, classes, seed=0):
+    rnd = random.Random(seed)
+    start = date_key(datetime(2015, 1, 1))
+    day = 86400 * 1000000
+    class_ids = array("l")
+    date_keys = array("q")
+    for _ in range(rows):
+        class_ids.append(rnd.randrange(classes))
+        # ~1% undated rows, dates spread over ten years
+        date_keys.append(NO_DATE if rnd.random() < 0.01 else start + rnd.randrange(3650) * day)
+    class_keys = [f"job {i:06d}" for i in range(classes)]
+    return class_ids, date_keys, class_keys
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=2000000)
+    ap.add_argument("--classes", type=int, default=40000)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--window", type=int, default=18)
+    args = ap.parse_args()
+
+    t = time.perf_counter()
+    class_ids, date_keys, class_keys = synthetic_ledger(args.rows, args.classes)
+    print(f"ledger: {args.rows:,} rows, {args.classes:,} classes "
+          f"(built in {time.perf_counter() - t:.1f}s)")
+
+    baseline = None
+    serial = None
+    counts = sorted({1, 2, 4, 8, 16, args.max_workers} & set(range(1, args.max_workers + 1)))
+    print(f"{'workers':>7} {'seconds':>8} {'rows/s':>12} {'speedup':>8}")
+    for w in counts:
+        t = time.perf_counter()
+        picked = pick_removed_rows(class_ids, date_keys, class_keys, args.window, workers=w)
+        elapsed = time.perf_counter() - t
+        if serial is None:
+            serial, baseline = picked, elapsed
+        elif picked != serial:
+            raise SystemExit(f"workers={w}: result differs from serial run")
+        print(f"{w:>7} {elapsed:>8.2f} {args.rows / elapsed:>12,.0f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Rows/sec of the two sheet reader backends, alone and inside the tools.
+
+Reads every row of a synthetic bill and ledger export with each backend
+of sheet_reader, then runs the trader importer and the 18-month filter
+end to end with each, best of --repeat. Corpora are cached like the
+bench suite's (benchmarks/corpus.py).
+
+    python benchmarks/bench_readers.py --rows 100000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+from qbd_tools import load_tool  # noqa: E402
+from sheet_reader import BACKENDS, open_sheet  # noqa: E402
+
+
+def read_all(path, backend):
+    with open_sheet(path, backend) as sheet:
+        return sum(1 for _ in sheet.rows(min_row=2))
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "qbd_bench_corpus"))
+    args = ap.parse_args()
+
+    bill = corpus.ensure("bill", args.rows, args.corpus_dir)
+    ledger = corpus.ensure("ledger", args.rows, args.corpus_dir)
+    work = tempfile.mkdtemp(prefix="qbd_bench_readers_")
+    trader = load_tool("trader")
+    sr_filter = load_tool("sr-filter")
+    jobs = [
+        ("read bill", lambda b: read_all(bill, b)),
+        ("read ledger", lambda b: read_all(ledger, b)),
+        ("trader", lambda b: trader.update_excel(shutil.copy(bill, work), backend=b)),
+        ("sr-filter", lambda b: sr_filter.filter_excel(shutil.copy(ledger, work), backend=b)),
+    ]
+    try:
+        print(f"{args.rows:,} rows, best of {args.repeat}")
+        print(f"{'job':<12} " + " ".join(f"{b + ' rows/s':>18}" for b in BACKENDS) + f" {'speedup':>8}")
+        for name, job in jobs:
+            rates = []
+            for backend in BACKENDS:
+                job(backend)  # warm-up
+                rates.append(args.rows / best_of(args.repeat, lambda: job(backend)))
+            speedup = rates[0] / rates[1]
+            print(f"{name:<12} " + " ".join(f"{r:18,.0f}" for r in rates) + f" {speedup:7.1f}x")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
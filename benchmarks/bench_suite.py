@@ -0,0 +1,153 @@
+"""Throughput regression suite for the invoice, trader and service revenue engines.
+
+Times each engine on the synthetic corpora from corpus.py and compares
+rows/s with stored baselines:
+
+    extract     extract_invoice_data on one invoice PDF   (charge lines/s)
+    trader      update_excel of the ver4 importer          (bill rows/s)
+    sr-filter   18-month filter, filter_excel              (ledger rows/s)
+    sr-process  18-month filter, filter_and_return_removed_only (ledger rows/s)
+
+    python benchmarks/bench_suite.py                     # 1k scale
+    python benchmarks/bench_suite.py --scale 1k,100k --only trader,sr-process
+    python benchmarks/bench_suite.py --save-baseline     # accept current numbers
+
+A missing baseline is recorded from the current run. Exits 1 when any
+benchmark is more than --threshold (default 20%) below its baseline.
+Baselines are per machine. 1k runs take well under a second each and are
+a smoke test; gate releases on 100k. Corpora are cached in --corpus-dir;
+1m files take a while to build once.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+from qbd_tools import load_tool  # noqa: E402
+
+BASELINE_FILE = os.path.join(HERE, "baselines.json")
+DEFAULT_THRESHOLD = 0.20
+
+
+def bench_extract(path, rows):
+    data = load_tool("extract").extract_invoice_data(path)
+    # every charge line must come back, or the timing means nothing
+    found = len([c for c in data.get("CHARGE DESCRIPTION", "").split(";") if c.strip()])
+    if found != rows:
+        raise Exception(f"extract: expected {rows} charge lines, got {found}")
+
+
+def bench_trader(path, rows):
+    _, processed, _ = load_tool("trader").update_excel(path)
+    if processed != rows:
+        raise Exception(f"trader: expected {rows} rows, got {processed}")
+
+
+def bench_sr_filter(path, rows):
+    load_tool("sr-filter").filter_excel(path)
+
+
+def bench_sr_process(path, rows):
+    _, total, _ = load_tool("sr-process").filter_and_return_removed_only(path)
+    if total != rows:
+        raise Exception(f"sr-process: expected {rows} rows, got {total}")
+
+
+# name -> (corpus kind, function)
+BENCHMARKS = {
+    "extract": ("invoice", bench_extract),
+    "trader": ("bill", bench_trader),
+    "sr-filter": ("ledger", bench_sr_filter),
+    "sr-process": ("ledger", bench_sr_process),
+}
+
+
+def load_baselines(path=BASELINE_FILE):
+    if os.path.isfile(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_baselines(baselines, path=BASELINE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def run_one(name, scale, corpus_dir, repeat):
+    """Best-of-`repeat` throughput (rows/s) of one benchmark at one scale."""
+    kind, fn = BENCHMARKS[name]
+    rows = corpus.SCALES[scale]
+    path = corpus.ensure(kind, rows, corpus_dir)
+    fn(path, rows)  # warm-up: imports, page cache, first-call costs
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(path, rows)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return rows / best, best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scale", default="1k", help="comma list of " + ",".join(corpus.SCALES))
+    ap.add_argument("--only", help="comma list of " + ",".join(BENCHMARKS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                    help="allowed drop below baseline, as a fraction")
+    ap.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "qbd_bench_corpus"))
+    ap.add_argument("--baselines", default=BASELINE_FILE)
+    ap.add_argument("--save-baseline", action="store_true", help="overwrite baselines with this run")
+    args = ap.parse_args()
+
+    scales = [s.strip().lower() for s in args.scale.split(",") if s.strip()]
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHMARKS)
+    for s in scales:
+        if s not in corpus.SCALES:
+            ap.error(f"unknown scale '{s}'")
+    for n in names:
+        if n not in BENCHMARKS:
+            ap.error(f"unknown benchmark '{n}'")
+
+    baselines = load_baselines(args.baselines)
+    changed = False
+    failures = []
+    print(f"{'benchmark':<22}{'rows/s':>14}{'baseline':>14}{'change':>9}")
+    for scale in scales:
+        for name in names:
+            key = f"{name}@{scale}"
+            rate, _ = run_one(name, scale, args.corpus_dir, args.repeat)
+            base = baselines.get(key)
+            if base is None or args.save_baseline:
+                baselines[key] = round(rate, 1)
+                changed = True
+                print(f"{key:<22}{rate:>14,.0f}{'(new)':>14}")
+                continue
+            change = rate / base - 1
+            flag = ""
+            if change < -args.threshold:
+                failures.append(key)
+                flag = "  REGRESSION"
+            print(f"{key:<22}{rate:>14,.0f}{base:>14,.0f}{change:>+8.0%}{flag}")
+
+    if changed:
+        save_baselines(baselines, args.baselines)
+        print(f"Baselines written to {args.baselines}")
+    if failures:
+        print(f"FAIL: throughput dropped more than {args.threshold:.0%}: {', '.join(failures)}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Overhead of the TOTAL CHECK validation in expand_charge_lines.
+
+Builds invoice records the way the extractor does (charges joined with
+";" plus TOTAL USD, about 1 in 50 off by a cent) and times the charge-line
+expansion with and without the running Decimal sum, best of --repeat.
+Relative to the expansion stage alone this looks large; the line that
+matters is the cost per invoice next to extracting one invoice PDF with
+the same number of charges (a corpus invoice, see corpus.py).
+
+    python benchmarks/bench_total_check.py --invoices 20000 --charges 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+from qbd_tools import load_tool  # noqa: E402
+
+
+def synthetic_invoices(invoices, charges, seed=0):
+    rnd = random.Random(seed)
+    out = []
+    for n in range(invoices):
+        amounts = [Decimal(rnd.randrange(100, 500000)) / 100 for _ in range(charges)]
+        total = sum(amounts)
+        if rnd.random() < 0.02:
+            total += Decimal("0.01")
+        out.append({
+            "SOURCE FILE": f"inv{n}.pdf",
+            "INVOICE NUMBER": f"S{100000 + n}",
+            "CHARGE DESCRIPTION": "; ".join(f"{rnd.choice(corpus.DESCRIPTIONS)} {a:,.2f}" for a in amounts),
+            "TOTAL USD": f"{total:,.2f}",
+        })
+    return out
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--invoices", type=int, default=20000)
+    ap.add_argument("--charges", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "qbd_bench_corpus"))
+    args = ap.parse_args()
+
+    extract = load_tool("extract")
+    expand = extract.expand_charge_lines
+    data = synthetic_invoices(args.invoices, args.charges)
+    rows = args.invoices * args.charges
+
+    checked = list(expand(data))
+    flagged = sum(1 for r in checked if r["TOTAL CHECK"] != "OK") // args.charges
+    plain = best_of(args.repeat, lambda: list(expand(data, check_totals=False)))
+    check = best_of(args.repeat, lambda: list(expand(data)))
+    print(f"{args.invoices:,} invoices, {rows:,} charge lines, {flagged:,} flagged")
+    print(f"  without check  {plain:7.3f}s  {rows / plain:12,.0f} rows/s")
+    print(f"  with check     {check:7.3f}s  {rows / check:12,.0f} rows/s")
+    print(f"  overhead       {(check - plain) / plain:7.1%} of the expansion stage")
+
+    pdf = corpus.ensure("invoice", args.charges, args.corpus_dir)
+    per_pdf = best_of(args.repeat, lambda: extract.extract_invoice_data(pdf))
+    per_invoice = (check - plain) / args.invoices
+    print(f"  per invoice    {per_invoice * 1e6:7.1f}us vs {per_pdf * 1e3:.1f}ms to extract "
+          f"one {args.charges}-charge PDF ({per_invoice / per_pdf:.3%})")
+
+
+if __name__ == "__main__":
+    main()
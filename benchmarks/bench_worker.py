@@ -0,0 +1,74 @@
+"""Repeat-run latency: a fresh `qbd_cli` run vs the same run via --worker.
+
+Times `python qbd_cli.py <tool> <one-row file>` end to end, once as a
+plain run (interpreter, imports, rule tables, work) and once with
+--worker against a resident worker (client start-up plus the work). Uses
+the worker already running, or starts one for the benchmark and stops
+it afterwards.
+
+    python benchmarks/bench_worker.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from bench_cold_start import make_inputs  # noqa: E402
+from qbd_worker import _request  # noqa: E402
+
+
+def start_worker():
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "qbd_worker.py")],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(300):
+        if _request({"command": "status"}) is not None:
+            return proc
+        if proc.poll() is not None:
+            break
+        time.sleep(0.1)
+    proc.kill()
+    raise Exception("The resident worker did not start")
+
+
+def median_run(cmd, cwd, runs):
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, check=True, capture_output=True)
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    started = None
+    if _request({"command": "status"}) is None:
+        started = start_worker()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(f"median of {args.runs} runs")
+            print(f"{'tool':<12} {'fresh':>8} {'--worker':>9} {'saved':>8}")
+            for tool, path in make_inputs(tmp).items():
+                cmd = [sys.executable, os.path.join(ROOT, "qbd_cli.py"), tool, path]
+                fresh = median_run(cmd, tmp, args.runs)
+                warm = median_run(cmd + ["--worker"], tmp, args.runs)
+                print(f"{tool:<12} {fresh:7.3f}s {warm:8.3f}s {fresh - warm:7.3f}s")
+    finally:
+        if started is not None:
+            _request({"command": "stop"})
+            started.wait(10)
+
+
+if __name__ == "__main__":
+    main()
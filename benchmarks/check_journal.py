@@ -0,0 +1,101 @@
+"""Crash check: a journaled input always has its output on disk.
+
+Runs the trader importer over a few bill exports with --journal and
+write-behind on (more than one input), in a child process whose writer
+thread is slowed down and which dies (os._exit) right after the first
+input is journaled, i.e. between the enqueued save and the write. Every
+input the journal lists as done must then have its output; a resumed run
+must finish the rest. Exits 1 otherwise.
+
+    python benchmarks/check_journal.py
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+
+CRASHING_RUN = """
+import os, sys, time
+sys.path.insert(0, {root!r})
+import batch_io, checkpoint
+from qbd_tools import run_tool
+
+loop = batch_io.BatchIO._write_loop
+def slow_loop(self):
+    time.sleep(1.0)  # keep the first save queued while its input is journaled
+    loop(self)
+batch_io.BatchIO._write_loop = slow_loop
+
+record_done = checkpoint.Journal.record_done
+def crash_after(self, path, result):
+    record_done(self, path, result)
+    os._exit(3)
+checkpoint.Journal.record_done = crash_after
+
+run_tool("trader", sys.argv[2:], journal=sys.argv[1])
+"""
+
+
+def done_outputs(journal):
+    done = {}
+    with open(journal, encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            if rec["status"] == "done":
+                done[rec["input"]] = rec["result"]["outputs"]
+    return done
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--files", type=int, default=3)
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="qbd_journal_")
+    try:
+        inputs = []
+        for n in range(args.files):
+            path = os.path.join(work, f"bill{n}.xlsx")
+            corpus.bill_workbook(path, args.rows, seed=n)
+            inputs.append(path)
+        journal = os.path.join(work, "run.jsonl")
+
+        crash = subprocess.run([sys.executable, "-c", CRASHING_RUN.format(root=ROOT), journal, *inputs])
+        if crash.returncode != 3:
+            print(f"FAIL the crashing run exited with {crash.returncode}, not at the first journal record")
+            sys.exit(1)
+        failures = 0
+        done = done_outputs(journal)
+        for path, outputs in done.items():
+            missing = [o for o in outputs if not os.path.isfile(o)]
+            print(f"{'FAIL' if missing else 'ok  '} crash  {os.path.basename(path)} journaled"
+                  + (f", output missing: {', '.join(map(os.path.basename, missing))}" if missing else ""))
+            failures += bool(missing)
+
+        from qbd_tools import run_tool
+
+        result = run_tool("trader", inputs, journal=journal)
+        missing = [o for o in result["outputs"] if not os.path.isfile(o)]
+        ok = len(result["outputs"]) == len(inputs) and not missing
+        print(f"{'ok  ' if ok else 'FAIL'} resume {len(result['outputs'])} of {len(inputs)} outputs")
+        failures += not ok
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    if failures:
+        sys.exit(1)
+    print("journal never runs ahead of the outputs")
+
+
+if __name__ == "__main__":
+    main()
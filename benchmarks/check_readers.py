@@ -0,0 +1,197 @@
+"""Conformance check: the fast sheet reader against openpyxl.
+
+For every workbook in the corpus (synthetic bill and ledger exports, an
+edge-case workbook built here, plus any .xlsx given on the command line)
+it compares the rows both backends of sheet_reader return, then runs each
+xlsx tool once per backend and compares the output workbooks cell by
+cell. Exits 1 if anything differs.
+
+The bill and ledger exports are also checked with formula cells, some
+with a cached value (as Excel saves them) and some without (as openpyxl
+and other generators do). The fast reader reads those as openpyxl does
+with data_only=True; the tools that keep formulas (FORMULA_TOOLS) must
+give their openpyxl output by default, the others the same output from
+either reader.
+
+    python benchmarks/check_readers.py "lastest bill.xlsx" ledger.xlsx
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import zipfile
+from datetime import datetime, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+from qbd_tools import run_tool  # noqa: E402
+from sheet_reader import open_sheet  # noqa: E402
+
+BILL_TOOLS = ("trader", "trader-coastmax", "trader-plain", "trader-flex", "qbxml")
+LEDGER_TOOLS = ("sr-filter", "sr-removed", "sr-process")
+FORMULA_TOOLS = ("trader", "trader-coastmax", "trader-plain", "trader-flex", "sr-filter", "sr-removed")
+
+# columns turned into formulas in the formula copies: (number, text)
+BILL_FORMULAS = ("I", "K")      # Class, past the header
+LEDGER_FORMULAS = ("C", "E")    # Num, Memo
+
+
+def edge_case_workbook(path):
+    """Types and layouts the readers must agree on."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+
+    wb = Workbook()
+    wb.active.title = "Notes"
+    wb.active["A1"] = "not the active sheet"
+    ws = wb.create_sheet("Data")
+    ws.append(["Text", "Int", "Float", "Date", "Bool", "Time", "Empty", "Unicode"])
+    ws.append(["plain", 1, 1.5, datetime(2024, 3, 5), True, time(13, 30), None, "Café ✓"])
+    ws.append([" padded ", -7, 1e-9, datetime(1900, 3, 1, 12, 0), False, None, None, "日本"])
+    ws.append(["12345", 2 ** 40, 0.1 + 0.2, None, None, None, None, ""])
+    ws["A7"] = "after a gap"            # rows 5-6 missing
+    ws["K7"] = "past the header width"
+    ws["B9"].font = Font(bold=True)    # styled but empty
+    ws["D8"] = datetime(2030, 12, 31)
+    ws["D8"].number_format = "dd/mm/yyyy"
+    wb.active = 1
+    wb.save(path)
+
+
+def formula_copy(path, new_path, columns):
+    """Copy of a workbook whose active sheet has a formula in every data row
+    of `columns` (a number and a text column). Even rows keep a cached
+    value, as Excel saves them; odd rows have none, as openpyxl saves them.
+    """
+    from openpyxl import load_workbook
+
+    number, text = columns
+    wb = load_workbook(path)
+    ws = wb.active
+    cached = {}
+    for r in range(2, ws.max_row + 1):
+        ws[f"{number}{r}"] = f"={r}*2"
+        ws[f"{text}{r}"] = f'="R"&{r}'
+        if r % 2 == 0:
+            cached[f"{number}{r}"] = ("", r * 2)
+            cached[f"{text}{r}"] = (' t="str"', f"R{r}")
+    wb.save(new_path)
+
+    def add_value(m):
+        if m.group(1) not in cached:
+            return m.group(0)
+        kind, value = cached[m.group(1)]
+        return f'<c r="{m.group(1)}"{m.group(2)}{kind}>{m.group(3)}<v>{value}</v>'
+
+    with zipfile.ZipFile(new_path) as zf:
+        parts = {name: zf.read(name) for name in zf.namelist()}
+    sheet = "xl/worksheets/sheet1.xml"
+    xml = parts[sheet].decode("utf-8")
+    xml = re.sub(r'<c r="([A-Z]+\d+)"([^>]*)>(<f>[^<]*</f>)<v\s*/>', add_value, xml)
+    parts[sheet] = xml.encode("utf-8")
+    with zipfile.ZipFile(new_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+
+
+def sheet_rows(path, backend):
+    # data_only: formula cells as their cached values, as on the fast path
+    with open_sheet(path, backend, data_only=True) as sheet:
+        return sheet.header(), list(sheet.rows(min_row=1))
+
+
+def output_values(path):
+    """Values of the output's active sheet (the fast trader path writes only that one)."""
+    from openpyxl import load_workbook
+
+    ws = load_workbook(path).active
+    return [list(r) for r in ws.iter_rows(values_only=True)]
+
+
+def first_difference(a, b):
+    for n, (x, y) in enumerate(zip(a, b), start=1):
+        if x != y:
+            return f"row {n}: {x!r} != {y!r}"
+    return f"{len(a)} rows != {len(b)} rows"
+
+
+def compare_tool(tool, path, workdir, backends=("openpyxl", "fast")):
+    """Outputs of `tool` with the two readers (None: the tool's default)."""
+    results = {}
+    for n, backend in enumerate(backends):
+        folder = os.path.join(workdir, f"{tool}_{backend or 'default'}")
+        os.makedirs(folder, exist_ok=True)
+        copy = os.path.join(folder, os.path.basename(path))
+        shutil.copy(path, copy)
+        options = {"reader": backend} if backend else {}
+        result = run_tool(tool, [copy], **options)
+        out = result["outputs"][0]
+        if os.path.isdir(out):  # qbxml: a folder of request files
+            results[n] = [open(os.path.join(out, f), encoding="utf-8").read().count("<BillAdd>")
+                                for f in sorted(os.listdir(out))]
+            results[n].append(result["stats"]["bills"])
+        else:
+            results[n] = output_values(out)
+    return results[0], results[1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("files", nargs="*", help="extra .xlsx files (bill or ledger exports)")
+    ap.add_argument("--rows", type=int, default=3000, help="rows in the synthetic corpora")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="qbd_readers_")
+    try:
+        bill = os.path.join(workdir, "bill.xlsx")
+        ledger = os.path.join(workdir, "ledger.xlsx")
+        edge = os.path.join(workdir, "edge.xlsx")
+        bill_formulas = os.path.join(workdir, "bill_formulas.xlsx")
+        ledger_formulas = os.path.join(workdir, "ledger_formulas.xlsx")
+        corpus.bill_workbook(bill, args.rows)
+        corpus.ledger_workbook(ledger, args.rows)
+        edge_case_workbook(edge)
+        formula_copy(bill, bill_formulas, BILL_FORMULAS)
+        formula_copy(ledger, ledger_formulas, LEDGER_FORMULAS)
+
+        failures = 0
+        for path in [bill, ledger, edge, bill_formulas, ledger_formulas, *args.files]:
+            expected, got = sheet_rows(path, "openpyxl"), sheet_rows(path, "fast")
+            ok = expected == got
+            detail = "" if ok else "  " + (
+                "header differs" if expected[0] != got[0] else first_difference(expected[1], got[1]))
+            print(f"{'ok  ' if ok else 'FAIL'} rows  {os.path.basename(path)}{detail}")
+            failures += not ok
+
+        jobs = [(t, bill) for t in BILL_TOOLS] + [(t, ledger) for t in LEDGER_TOOLS]
+        jobs += [(t, bill_formulas) for t in BILL_TOOLS] + [(t, ledger_formulas) for t in LEDGER_TOOLS]
+        for path in args.files:
+            with open_sheet(path) as sheet:
+                header = [str(h).strip().lower() for h in sheet.header() if h is not None]
+            tools = LEDGER_TOOLS if "expense class" in header else BILL_TOOLS
+            jobs += [(t, path) for t in tools]
+        for tool, path in jobs:
+            # with formulas, tools that copy them through must not default to the fast path
+            formulas = path in (bill_formulas, ledger_formulas) and tool in FORMULA_TOOLS
+            backends = ("openpyxl", None) if formulas else ("openpyxl", "fast")
+            expected, got = compare_tool(tool, path, workdir, backends)
+            ok = expected == got
+            detail = "" if ok else "  " + first_difference(expected, got)
+            label = f"{tool} (default)" if formulas else tool
+            print(f"{'ok  ' if ok else 'FAIL'} {label:<26} {os.path.basename(path)}{detail}")
+            failures += not ok
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if failures:
+        print(f"{failures} difference(s)")
+        sys.exit(1)
+    print("fast reader matches openpyxl")
+
+
+if __name__ == "__main__":
+    main()
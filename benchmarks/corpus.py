@@ -0,0 +1,171 @@
+"""Deterministic synthetic inputs for the benchmarks.
+
+    invoice_pdf    Chain Logic-style invoice; `rows` charge lines over as
+                   many pages as needed (PDF written by hand, no library)
+    bill_workbook  trader bill sheet, C/E/G/H/J as the importers expect
+    ledger_workbook service revenue ledger with Date / Expense Class /
+                   Expense Account / Expense Amount
+
+The same (rows, seed) always gives the same data. ensure() builds a file
+once into a corpus folder and reuses it on later runs.
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bill_layout import HEADERS as BILL_HEADERS  # noqa: E402
+
+SCALES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+
+# Mostly keywords from the trader reference maps, a few that match nothing
+DESCRIPTIONS = [
+    "International Freight", "Drayage", "Destination Drayage", "Customs Clearance & Admin",
+    "ISF Fee", "Freight Insurance", "Chassis", "Destination Pier Pass", "Storage",
+    "Per Diem", "Customs Exam Fee", "Delivery", "Fuel Surcharge", "Handling Fee",
+    "Duty", "Terminal Fee", "Pre-Pull", "Detention", "Dry Run", "Transload",
+    "Documentation Charge", "Misc Adjustment", "Bank Charges",
+]
+
+VENDORS = ["Perfect Gateway Enterprises Ltd", "Chain Logic LLC", "Coastmax", "Ocean Network Express"]
+
+LINES_PER_PAGE = 60
+
+
+# ---- PDF ----
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages):
+    """Minimal PDF: one Helvetica text block per page, one line per entry."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        body = "BT /F1 8 Tf 36 770 Td 12 TL\n" + "".join(f"({_pdf_escape(l)}) '\n" for l in lines) + "ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        content = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Contents {content} 0 R /Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def invoice_lines(rows, seed=0, number=100000):
+    """Text lines of one invoice with `rows` charge lines."""
+    rnd = random.Random(seed)
+    lines = [
+        f"INVOICE S{number:06d}",
+        "INVOICE DATE 05-Mar-24",
+        "DUE DATE 04-Apr-24",
+        "CUSTOMER ID COASTMAX",
+        f"SHIPMENT S{number + 1:06d}",
+        "TERMS 30 DAYS",
+        f"CONSOL NUMBER C{number:07d}",
+        "SHIPPER CONSIGNEE",
+        "EAST ASIA ALUMINUM COMPANY LTD COASTMAX INTERNATIONAL",
+        "GOODS DESCRIPTION",
+        "ALUMINUM EXTRUSIONS",
+        "IMPORT CUSTOMS BROKER WEIGHT VOLUME CHARGEABLE PACKAGES",
+        "ACME BROKERAGE INC 18250 KG 56.3 M3 56.3 M3 42 PLT",
+        "VESSEL / VOYAGE / IMO OCEAN BILL OF LADING HOUSE B/L",
+        "EVER GIVEN 123E 9811000 EGLV123456789 CLHB00012345",
+        "DESCRIPTION CHARGES IN USD",
+    ]
+    total = 0
+    for _ in range(rows):
+        cents = rnd.randrange(1000, 500000)
+        total += cents
+        lines.append(f"{rnd.choice(DESCRIPTIONS)} {cents / 100:,.2f}")
+    lines += [
+        f"TOTAL CHARGES {total / 100:,.2f}",
+        f"TOTAL USD {total / 100:,.2f}",
+        "CHAIN LOGIC LLC",
+        "1200 HARBOR BLVD",
+        "LONG BEACH CA 90802",
+        "ABA 123456789 SWIFT PINBUS44",
+        "Account 000123456789",
+        "PINNACLE BANK",
+        "NASHVILLE TN",
+    ]
+    return lines
+
+
+def invoice_pdf(path, rows, seed=0):
+    lines = invoice_lines(rows, seed)
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+    write_pdf(path, pages)
+
+
+# ---- Workbooks ----
+def bill_workbook(path, rows, seed=0):
+    from openpyxl import Workbook
+
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(BILL_HEADERS)
+    for i in range(rows):
+        memo = rnd.choice([f"GC Aluminum, Inc: PO-{i % 9000:04d}", "Other memo", None])
+        ws.append([f"S{100000 + i // 8:06d}", "03/05/2024", rnd.choice(VENDORS), "04/04/2024",
+                   None, round(rnd.randrange(1000, 500000) / 100, 2), rnd.choice(DESCRIPTIONS),
+                   memo, None, None])
+    wb.save(path)
+
+
+def ledger_workbook(path, rows, classes=None, seed=0):
+    from openpyxl import Workbook
+
+    rnd = random.Random(seed)
+    classes = classes or max(rows // 15, 1)
+    start = datetime(2016, 1, 1)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(["Type", "Date", "Num", "Name", "Memo", "Expense Class",
+               "Expense Account", "Expense Amount"])
+    for i in range(rows):
+        r = rnd.random()
+        if r < 0.01:
+            cls = None
+        else:
+            kind = "AIR" if rnd.random() < 0.3 else "OCEAN"
+            cls = f"{kind} JOB {rnd.randrange(classes):06d}"
+        date = None if r > 0.995 else start + timedelta(days=rnd.randrange(3650))
+        ws.append(["Bill", date, i, rnd.choice(VENDORS), "", cls, "6000 Freight",
+                   round(rnd.randrange(1000, 500000) / 100, 2)])
+    wb.save(path)
+
+
+# ---- Cache ----
+GENERATORS = {
+    "invoice": (invoice_pdf, ".pdf"),
+    "bill": (bill_workbook, ".xlsx"),
+    "ledger": (ledger_workbook, ".xlsx"),
+}
+
+
+def ensure(kind, rows, folder, seed=0):
+    """Path of the `kind` corpus at `rows`, generated on first use."""
+    make, ext = GENERATORS[kind]
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{kind}_{rows}_s{seed}{ext}")
+    if not os.path.isfile(path):
+        tmp = path + ".part" + ext
+        make(tmp, rows, seed=seed)
+        os.replace(tmp, path)
+    return path
@@ -0,0 +1,43 @@
+"""Column layout of the QuickBooks bill sheet the trader importers edit.
+
+The importers only rely on C (Vendor), E (Account), G (Description),
+H (Memo) and J (Reference); the other columns follow the usual bill
+export so a generated sheet imports the same way. Tools that read those
+other columns from an export find them by header name (header_columns).
+"""
+
+HEADERS = ["Ref No", "Date", "Vendor", "Due Date", "Account",
+           "Amount", "Description", "Memo", "Class", "Reference"]
+
+# 0-based positions (A=0)
+REF_NUMBER = 0
+TXN_DATE = 1
+VENDOR = 2     # C
+DUE_DATE = 3
+ACCOUNT = 4    # E
+AMOUNT = 5
+DESCRIPTION = 6  # G
+MEMO = 7       # H
+CLASS = 8
+REFERENCE = 9  # J
+
+
+def blank_row():
+    return [None] * len(HEADERS)
+
+
+def header_columns(headers, positions, confirm=None, where=None):
+    """{layout position: column index in this sheet} for `positions`.
+
+    Each column is looked up by its HEADERS name through the schema
+    registry (so a confirmed layout is known to every tool); a missing
+    header raises, naming `where` (the file) if given.
+    """
+    from schema_registry import resolve_columns
+
+    names = {pos: HEADERS[pos].lower() for pos in positions}
+    try:
+        idxs = resolve_columns(headers, tuple(names.values()), confirm=confirm)
+    except Exception as e:
+        raise Exception(f"{where}: {e}" if where else str(e))
+    return {pos: idxs[name] for pos, name in names.items()}
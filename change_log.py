@@ -0,0 +1,77 @@
+"""Change-only log of what a trader importer did to a bill sheet.
+
+One CSV line per cell the importer actually changed:
+
+    sheet, row, ref_no, column, old, new, keyword
+
+`ref_no` is column A of that row (with `sheet` and `row` it finds the
+line), `keyword` the column G keyword that set the account code (empty
+for the vendor cleanup, the reference and the 99000 fallback). The lines
+are written while the rows are coded, so reviewing a run means reading
+the changes instead of opening the full *_updatedfortrader copy. Mode
+"alongside" writes it next to that copy, "only" instead of it.
+"""
+import csv
+import os
+
+from bill_layout import ACCOUNT, HEADERS, REF_NUMBER
+
+CHANGE_LOG_MODES = ("alongside", "only")
+FIELDS = ["sheet", "row", "ref_no", "column", "old", "new", "keyword"]
+
+
+def check_mode(mode):
+    if mode is not None and mode not in CHANGE_LOG_MODES:
+        raise Exception(f"Unknown change log mode: '{mode}' (use {' or '.join(CHANGE_LOG_MODES)})")
+
+
+def log_path(file_path):
+    """<input>_changes.csv next to the input."""
+    return os.path.splitext(file_path)[0] + "_changes.csv"
+
+
+def column_name(c):
+    """0-based index -> "E (Account)"."""
+    letters = ""
+    n = c + 1
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return f"{letters} ({HEADERS[c]})" if c < len(HEADERS) else letters
+
+
+def _text(value):
+    return "" if value is None else value
+
+
+class ChangeLog:
+    """CSV writer for changed cells (utf-8 with BOM, so Excel opens it as such)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(FIELDS)
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def add(self, sheet, row, ref_no, column, old, new, keyword=None):
+        self.writer.writerow([sheet, row, _text(ref_no), column_name(column),
+                              _text(old), _text(new), keyword or ""])
+        self.count += 1
+
+    def row(self, sheet, row, before, cells, keyword=None):
+        """Log the cells of one row that differ from `before` (its values before coding)."""
+        for c, old in enumerate(before):
+            new = cells[c].value
+            if new != old:
+                self.add(sheet, row, before[REF_NUMBER], c, old, new,
+                         keyword if c == ACCOUNT else None)
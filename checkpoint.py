@@ -0,0 +1,133 @@
+"""Checkpoint journal for long batch runs: resume after a crash, quarantine
+bad inputs instead of stopping.
+
+The journal is a JSON-lines file. After each input one line is appended
+and fsync'ed:
+
+    {"input": "...", "size": 1234, "mtime": 1700000000.0,
+     "status": "done", "result": {...}}
+    {"input": "...", "size": 99, "mtime": ..., "status": "failed", "error": "..."}
+
+An input is only recorded as done once its outputs are on disk: in a
+batch run with write-behind (batch_io) the journal waits for the queued
+saves first, so a crash cannot leave a "done" input without its output.
+
+A rerun with the same journal reuses the stored result of every input
+that is done and unchanged (same size and mtime), skips inputs already in
+quarantine and processes the rest. A torn last line from a crash is
+ignored.
+"""
+import json
+import os
+
+from batch_io import flush, skip
+from jobs import JobCancelled
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self.done = {}      # abs input path -> (size, mtime, result)
+        self.failed = {}    # abs input path -> (size, mtime, error)
+        torn = False
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    torn = not line.endswith("\n")
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn write
+                    key = rec.get("input")
+                    if rec.get("status") == "done":
+                        self.done[key] = (rec.get("size"), rec.get("mtime"), rec.get("result"))
+                        self.failed.pop(key, None)
+                    elif rec.get("status") == "failed":
+                        self.failed[key] = (rec.get("size"), rec.get("mtime"), rec.get("error"))
+        self.f = open(path, "a", encoding="utf-8")
+        if torn:
+            self.f.write("\n")  # keep the next record off the torn line
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _append(self, rec):
+        self.f.write(json.dumps(rec, default=str) + "\n")
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def lookup(self, path):
+        """("done", result) / ("failed", error) for an unchanged input, else (None, None)."""
+        key = os.path.abspath(path)
+        try:
+            stamp = _stamp(path)
+        except OSError:
+            return None, None
+        for status, table in (("done", self.done), ("failed", self.failed)):
+            rec = table.get(key)
+            if rec is not None and (rec[0], rec[1]) == stamp:
+                return status, rec[2]
+        return None, None
+
+    def record_done(self, path, result):
+        size, mtime = _stamp(path)
+        key = os.path.abspath(path)
+        self._append({"input": key, "size": size, "mtime": mtime, "status": "done", "result": result})
+        self.done[key] = (size, mtime, result)
+        self.failed.pop(key, None)
+
+    def record_failed(self, path, error):
+        try:
+            size, mtime = _stamp(path)
+        except OSError:
+            size = mtime = None
+        key = os.path.abspath(path)
+        self._append({"input": key, "size": size, "mtime": mtime, "status": "failed", "error": error})
+        self.failed[key] = (size, mtime, error)
+
+
+def journaled(paths, fn, journal_path, quarantine, progress=None, retry_failed=False):
+    """Yield (path, result) for every input that succeeds, in input order.
+
+    Results of inputs already done come from the journal; new results are
+    journaled as soon as fn(path) returns and its queued saves are written. Inputs that raise are appended
+    to `quarantine` as (path, error) and the run goes on. A cancelled job
+    (JobCancelled) still stops the run.
+    """
+    with Journal(journal_path) as journal:
+        for n, path in enumerate(paths):
+            if progress is not None:
+                progress(n, len(paths))
+            status, value = journal.lookup(path)
+            if status == "done":
+                skip(path)
+                yield path, value
+                continue
+            if status == "failed" and not retry_failed:
+                skip(path)
+                quarantine.append((path, value))
+                continue
+            try:
+                result = fn(path)
+                flush()  # its outputs must be written before it is journaled
+            except JobCancelled:
+                raise
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                journal.record_failed(path, error)
+                quarantine.append((path, error))
+                continue
+            journal.record_done(path, result)
+            yield path, result
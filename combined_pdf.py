@@ -0,0 +1,94 @@
+"""Split one combined PDF (hundreds of invoices) by invoice and extract the
+pages on a process pool.
+
+Text extraction is the slow part, so the page list is cut into ranges and
+each worker opens the file itself and returns the text of its pages. The
+parent puts the pages back in order, starts a new invoice on every page
+whose "INVOICE S######" header names a new invoice number (repeated
+headers on continuation pages stay with their invoice) and parses each
+invoice with the vendor template picked from its first page. Only the
+first HEADER_LINES lines of a page count as its header, so an invoice
+number quoted in the body (remarks, "INVOICE S123456 credited ...") does
+not split the invoice.
+"""
+import os
+import re
+from itertools import repeat
+
+INVOICE_HEADER = re.compile(r"^\s*INVOICE\s+(S\d{6}(?:/[A-Z])?)", re.M)
+HEADER_LINES = 8
+PAGES_PER_TASK = 25
+
+
+def page_count(pdf_path):
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def page_texts(pdf_path, start, stop):
+    """Text of pages [start, stop); runs in a worker process."""
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def page_ranges(n_pages, per_task=PAGES_PER_TASK):
+    return [(a, min(a + per_task, n_pages)) for a in range(0, n_pages, per_task)]
+
+
+def split_invoices(texts):
+    """[(first_page, last_page), ...] (0-based, inclusive) per invoice."""
+    groups = []
+    current = None
+    for i, text in enumerate(texts):
+        m = INVOICE_HEADER.search("\n".join(text.splitlines()[:HEADER_LINES]))
+        number = m.group(1) if m else None
+        if not groups or (number and number != current):
+            groups.append([i, i])
+            current = number or current
+        else:
+            groups[-1][1] = i
+    return [tuple(g) for g in groups]
+
+
+def extract_combined(pdf_path, detect, workers=None, progress=None):
+    """One invoice dict per invoice in `pdf_path`, in page order.
+
+    `detect(first_page_text)` returns the template used to parse each
+    invoice (invoice_templates.detect).
+    """
+    from collections import OrderedDict
+
+    n_pages = page_count(pdf_path)
+    ranges = page_ranges(n_pages)
+    workers = workers or os.cpu_count() or 1
+    texts = []
+    if workers <= 1 or len(ranges) <= 1:
+        for n, (a, b) in enumerate(ranges, start=1):
+            texts += page_texts(pdf_path, a, b)
+            if progress is not None:
+                progress(len(texts), n_pages)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            # map() yields in submission order, so pages come back in order
+            for chunk in pool.map(page_texts, repeat(pdf_path), *zip(*ranges)):
+                texts += chunk
+                if progress is not None:
+                    progress(len(texts), n_pages)
+
+    invoices = []
+    name = os.path.basename(pdf_path)
+    for first, last in split_invoices(texts):
+        data = OrderedDict()
+        data["SOURCE FILE"] = name
+        data["PAGES"] = f"{first + 1}-{last + 1}" if last > first else str(first + 1)
+        pages = texts[first:last + 1]
+        lines = "\n".join(t for t in pages if t).splitlines()
+        detect(pages[0]).parse(lines, data)
+        invoices.append(data)
+    return invoices
@@ -0,0 +1,202 @@
+"""Run tool jobs off the Tk thread, with a progress bar, rate and Cancel.
+
+The job runs on a worker thread. Progress, results and errors come back
+through a queue that the Tk thread polls with after(), so the window keeps
+repainting and Windows never marks it "Not Responding".
+
+Ctrl+Shift+P (not shown anywhere in the window) toggles profiling: later
+jobs run under profiling.ProfileSession and save the profile next to
+their output.
+"""
+import os
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from jobs import JobCancelled, ProgressTracker
+
+POLL_MS = 100
+PROFILE_KEY = "<Control-Shift-KeyPress-P>"
+
+
+class ProgressPanel(tk.Frame):
+    """Progress bar + "N rows · X rows/s" label + Cancel button."""
+
+    def __init__(self, master, unit="rows", **kw):
+        super().__init__(master, **kw)
+        self.unit = unit
+        self.job = None
+        self.profile_mode = None  # None, "deterministic" or "sample"
+        self.winfo_toplevel().bind(PROFILE_KEY, self.toggle_profile)
+        self.bar = ttk.Progressbar(self, length=360, mode="determinate")
+        self.bar.pack(side=tk.LEFT, padx=(0, 8))
+        self.btn_cancel = tk.Button(self, text="Cancel", state=tk.DISABLED, command=self.cancel)
+        self.btn_cancel.pack(side=tk.LEFT)
+        self.label = tk.Label(master, text="", fg="#555555")
+
+    def pack(self, **kw):
+        super().pack(**kw)
+        self.label.pack()
+
+    @property
+    def busy(self):
+        return self.job is not None
+
+    def started(self, job):
+        self.job = job
+        self.bar.configure(mode="indeterminate", value=0)
+        self.bar.start(15)
+        self.btn_cancel.configure(state=tk.NORMAL)
+        self.label.configure(text="Working...")
+
+    def update_progress(self, done, total, elapsed):
+        if total:
+            if str(self.bar.cget("mode")) != "determinate":
+                self.bar.stop()
+                self.bar.configure(mode="determinate")
+            self.bar.configure(maximum=total, value=min(done, total))
+        rate = done / elapsed if elapsed > 0 else 0
+        of = f" of {total:,}" if total else ""
+        self.label.configure(text=f"{done:,}{of} {self.unit} · {rate:,.0f} {self.unit}/s")
+
+    def finished(self, text=""):
+        self.job = None
+        self.bar.stop()
+        self.bar.configure(mode="determinate", value=0)
+        self.btn_cancel.configure(state=tk.DISABLED)
+        self.label.configure(text=text)
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.label.configure(text="Cancelling...")
+
+    def toggle_profile(self, event=None):
+        """Hidden toggle: off -> deterministic -> sample -> off."""
+        order = [None, "deterministic", "sample"]
+        self.profile_mode = order[(order.index(self.profile_mode) + 1) % len(order)]
+        state = f"Profiling: {self.profile_mode}" if self.profile_mode else "Profiling off"
+        if not self.busy:
+            self.label.configure(text=state)
+
+
+class BackgroundJob:
+    """Call fn(*args, progress=tracker, **kwargs) on a worker thread.
+
+    on_done(result) / on_error(exc) run on the Tk thread. A cancelled job
+    calls neither and resets the panel.
+    """
+
+    def __init__(self, root, panel, fn, *args, on_done=None, on_error=None, **kwargs):
+        self.root = root
+        self.panel = panel
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.queue = queue.Queue()
+        self.tracker = ProgressTracker(self._report)
+        self.t0 = None
+
+    def _report(self, done, total):
+        self.queue.put(("progress", done, total))
+
+    def start(self):
+        if self.panel.busy:
+            return None
+        self.t0 = time.perf_counter()
+        self.panel.started(self)
+        threading.Thread(target=self._run, daemon=True).start()
+        self.root.after(POLL_MS, self._poll)
+        return self
+
+    def cancel(self):
+        self.tracker.cancel()
+
+    def _run(self):
+        try:
+            mode = getattr(self.panel, "profile_mode", None)
+            if mode:
+                result = self._run_profiled(mode)
+            else:
+                result = self.fn(*self.args, progress=self.tracker, **self.kwargs)
+        except JobCancelled:
+            self.queue.put(("cancelled",))
+        except Exception as e:
+            self.queue.put(("error", e))
+        else:
+            self.queue.put(("done", result))
+
+    def _run_profiled(self, mode):
+        from profiling import ProfileSession, profile_base
+
+        with ProfileSession(mode) as prof:
+            result = self.fn(*self.args, progress=self.tracker, **self.kwargs)
+        inputs = _paths(self.args[0]) if self.args else []
+        output = _paths(result[0] if isinstance(result, tuple) else result) or inputs
+        if output:
+            prof.save(profile_base(output[0]), inputs, _tool_name(self.fn))
+        return result
+
+    def in_ui(self, fn):
+        """Wrap fn so that calls from the worker thread run on the Tk thread."""
+        def call(*args):
+            reply = {}
+            ready = threading.Event()
+            self.queue.put(("call", fn, args, reply, ready))
+            ready.wait()
+            if "error" in reply:
+                raise reply["error"]
+            return reply.get("value")
+        return call
+
+    def _poll(self):
+        finished = False
+        try:
+            while True:
+                msg = self.queue.get_nowait()
+                kind = msg[0]
+                if kind == "progress":
+                    self.panel.update_progress(msg[1], msg[2], time.perf_counter() - self.t0)
+                elif kind == "call":
+                    _, fn, args, reply, ready = msg
+                    try:
+                        reply["value"] = fn(*args)
+                    except Exception as e:
+                        reply["error"] = e
+                    ready.set()
+                elif kind == "cancelled":
+                    self.panel.finished("Cancelled.")
+                    finished = True
+                elif kind == "error":
+                    self.panel.finished("")
+                    finished = True
+                    if self.on_error:
+                        self.on_error(msg[1])
+                elif kind == "done":
+                    self.panel.finished(f"Done in {time.perf_counter() - self.t0:.1f}s")
+                    finished = True
+                    if self.on_done:
+                        self.on_done(msg[1])
+        except queue.Empty:
+            pass
+        if not finished:
+            self.root.after(POLL_MS, self._poll)
+
+
+def _tool_name(fn):
+    """The qbd_tools name of the script `fn` comes from (as the CLI passes it), else None."""
+    from qbd_tools import TOOLS
+
+    code = getattr(fn, "__code__", None)
+    script = os.path.basename(code.co_filename) if code else None
+    return next((name for name, (file, _) in TOOLS.items() if file == script), None)
+
+
+def _paths(value):
+    """Existing file path(s) in a job argument or result, else []."""
+    items = value if isinstance(value, (list, tuple)) else [value]
+    return [p for p in items if isinstance(p, str) and os.path.isfile(p)]
@@ -1,7 +1,11 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from openpyxl import load_workbook
 import os
+import sys
+import metrics
+from jobs import PROGRESS_EVERY
+from sheet_reader import open_for_update
+from multi_sheet import update_sheets
+from change_log import ChangeLog, check_mode, log_path
+from memo_prefixes import extract_reference
 
 CONFIG_FILE = "config.txt"
 
@@ -101,76 +105,128 @@ for key_string, code in raw_reference_map.items():
 # This prevents "freight" (short) from matching inside "freight insurance" (long).
 sorted_keywords = sorted(reference_map.keys(), key=len, reverse=True)
 
+UNCLASSIFIED_CODE = "99000"  # Unclassified / review
+
 
 # ==============================
-# EXCEL UPDATE LOGIC
+# ROW RULES (shared with invoice_pipeline)
 # ==============================
-def update_excel(file_path):
-    try:
-        wb = load_workbook(file_path)
-        ws = wb.active
-
-        # Track stats for the user
-        rows_processed = 0
-        matches_found = 0
-
-        for row in ws.iter_rows(min_row=2):
-            col_c = row[2]   # Vendor (Index 2 = Column C)
-            col_e = row[4]   # Account Code (Index 4 = Column E)
-            col_g = row[6]   # Description (Index 6 = Column G)
-            col_h = row[7]   # Memo (Index 7 = Column H)
-            col_j = row[9]   # Extracted Reference (Index 9 = Column J)
-
-            # Skip empty rows to prevent errors/clutter
-            if not col_c.value and not col_g.value:
-                continue
-            
-            rows_processed += 1
-
-            # ---- SAFE Vendor Cleanup (non-destructive) ----
-            if col_c.value:
-                vendor = str(col_c.value).strip().lower()
-                if "perfect gateway enterprises ltd" in vendor:
-                    col_c.value = "Perfect Gateway"
-
-            # ---- Cost Code Matching (Using SORTED keywords) ----
-            matched = False
-            if col_g.value:
-                text = str(col_g.value).strip().lower()
-                
-                # Iterate through Longest keywords first
-                for keyword in sorted_keywords:
-                    if keyword in text:
-                        col_e.value = reference_map[keyword]
-                        matched = True
-                        matches_found += 1
-                        break # Stop checking other words once a match is found
-
-            if not matched:
-                col_e.value = "99000"  # Unclassified / review
-
-            # ---- Extract Reference from Column H ----
-            if col_h.value:
-                h_val = str(col_h.value).strip()
-                # Safe check using startswith
-                if h_val.startswith("GC Aluminum, Inc:"):
-                    extracted = h_val.split("GC Aluminum, Inc:")[-1].strip()
-                    if extracted:
-                        col_j.value = extracted
-
-        # Save Logic
-        folder, original = os.path.split(file_path)
-        name, ext = os.path.splitext(original)
-        new_path = os.path.join(folder, f"{name}_updatedfortrader{ext}")
-        wb.save(new_path)
+def clean_vendor(value):
+    """SAFE vendor cleanup (non-destructive): only known aliases change."""
+    vendor = str(value).strip().lower()
+    if "perfect gateway enterprises ltd" in vendor:
+        return "Perfect Gateway"
+    return value
+
+def code_for_description(text):
+    """(account code, matched keyword) for a description; keyword is None if unmatched."""
+    text = str(text).strip().lower()
+    # Iterate through Longest keywords first
+    for keyword in sorted_keywords:
+        if keyword in text:
+            return reference_map[keyword], keyword
+    return UNCLASSIFIED_CODE, None
+
+def code_row(row):
+    """Code one bill line in place (cells with .value, columns A to J).
+
+    Returns the keyword that matched column G, "" if none did, or None
+    for an empty row (no vendor, no description), which is left alone.
+    """
+    col_c = row[2]   # Vendor (Index 2 = Column C)
+    col_e = row[4]   # Account Code (Index 4 = Column E)
+    col_g = row[6]   # Description (Index 6 = Column G)
+    col_h = row[7]   # Memo (Index 7 = Column H)
+    col_j = row[9]   # Extracted Reference (Index 9 = Column J)
+
+    # Skip empty rows to prevent errors/clutter
+    if not col_c.value and not col_g.value:
+        return None
+
+    # ---- SAFE Vendor Cleanup (non-destructive) ----
+    if col_c.value:
+        vendor = clean_vendor(col_c.value)
+        if vendor != col_c.value:
+            col_c.value = vendor
+
+    # ---- Cost Code Matching (Using SORTED keywords) ----
+    code, keyword = UNCLASSIFIED_CODE, None
+    if col_g.value:
+        code, keyword = code_for_description(col_g.value)
+    col_e.value = code
+
+    # ---- Extract Reference from Column H ----
+    if col_h.value:
+        extracted = extract_reference(col_h.value)
+        if extracted:
+            col_j.value = extracted
+    return keyword or ""
 
-        messagebox.showinfo(
-            "Success", 
-            f"✅ Update Complete!\n\nRows Processed: {rows_processed}\nCodes Matched: {matches_found}\n\nSaved to:\n{new_path}"
-        )
 
-    except Exception as e:
-        messagebox.showerror("Error", f"❌ Update failed:\n{e}")
+# ==============================
+# EXCEL UPDATE LOGIC
+# ==============================
+def update_excel(file_path, progress=None, backend="openpyxl", sheets=None, workers=None,
+                 change_log=None):
+    """Code column E from the column G description and save a copy.
+
+    `progress(done, total)` is called every PROGRESS_EVERY rows.
+    `backend` "fast" streams the sheet instead of loading it with openpyxl
+    (values only, see sheet_reader). `sheets` ("all" or a list of sheet
+    names) codes those sheets instead of the active one, on `workers`
+    processes (see multi_sheet). `change_log` "alongside" also writes the
+    changed cells to <name>_changes.csv, "only" writes just that log
+    instead of the copy (see change_log). Returns (new_path or the log
+    path with "only", rows_processed, matches_found).
+    """
+    check_mode(change_log)
+    folder, original = os.path.split(file_path)
+    name, ext = os.path.splitext(original)
+    new_path = os.path.join(folder, f"{name}_updatedfortrader{ext}")
+    if sheets is not None:
+        rows_processed, matches_found = update_sheets(__file__, file_path, sheets, new_path,
+                                                      backend, workers, progress, change_log)
+        out = log_path(file_path) if change_log == "only" else new_path
+        return out, rows_processed, matches_found
+
+    with metrics.stage("workbook_load", "rows") as st:
+        sheet = open_for_update(file_path, backend, copy=change_log != "only")
+        st.count = sheet.total
+    log = ChangeLog(log_path(file_path)) if change_log else None
+
+    # Track stats for the user
+    rows_processed = 0
+    matches_found = 0
+
+    total = sheet.total
+    classify = metrics.stage("classify", "rows").start()
+    for n, row in enumerate(sheet.rows(min_row=2), start=1):
+        if progress is not None and n % PROGRESS_EVERY == 0:
+            progress(n, total)
+        before = [cell.value for cell in row] if log else None
+        keyword = code_row(row)
+        if keyword is None:
+            continue
+        rows_processed += 1
+        if keyword:
+            matches_found += 1
+        if log:
+            log.row(sheet.title, n + 1, before, row, keyword)
+
+    classify.stop(rows_processed)
+    if log:
+        log.close()
+    if change_log == "only":
+        sheet.close()
+        return log.path, rows_processed, matches_found
+
+    # Save Logic
+    with metrics.stage("save", "rows") as st:
+        sheet.save(new_path)
+        st.count = rows_processed
+
+    sheet.close()
+    return new_path, rows_processed, matches_found
 
 # ==============================
 # CONFIG HANDLING
@@ -204,22 +260,47 @@ def run_update():
     if not os.path.isfile(path):
         messagebox.showwarning("Warning", "Invalid file path.")
         return
-    update_excel(path)
 
-root = tk.Tk()
-root.title("Excel Bill Updater (Accounting Safe)")
-root.geometry("520x220") # Slightly taller for better spacing
-root.resizable(False, False)
-
-tk.Label(root, text="Excel File Path:").pack(pady=(10, 0))
-entry_file_path = tk.Entry(root, width=65)
-entry_file_path.pack(pady=5)
-entry_file_path.insert(0, load_default_path())
+    def done(result):
+        new_path, rows_processed, matches_found = result
+        messagebox.showinfo(
+            "Success", 
+            f"✅ Update Complete!\n\nRows Processed: {rows_processed}\nCodes Matched: {matches_found}\n\nSaved to:\n{new_path}"
+        )
 
-tk.Button(root, text="Browse...", command=browse_file).pack()
-tk.Button(root, text="Save as default path", command=save_default_path,
-          bg="#2196F3", fg="white").pack(pady=(10, 5))
-tk.Button(root, text="Run Update", command=run_update,
-          bg="#4CAF50", fg="white", height=2, width=20).pack(pady=5)
+    def failed(e):
+        messagebox.showerror("Error", f"❌ Update failed:\n{e}")
 
-root.mainloop()
\ No newline at end of file
+    # Runs on a worker thread so the window stays responsive
+    BackgroundJob(root, progress_panel, update_excel, path,
+                  on_done=done, on_error=failed).start()
+
+if __name__ == "__main__":
+    # Any arguments -> headless run (no Tk); see qbd_cli.py
+    if len(sys.argv) > 1:
+        from qbd_cli import main as cli_main
+        sys.exit(cli_main(["trader", *sys.argv[1:]]))
+
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_worker import BackgroundJob, ProgressPanel
+
+    root = tk.Tk()
+    root.title("Excel Bill Updater (Accounting Safe)")
+    root.geometry("520x280") # Slightly taller for better spacing
+    root.resizable(False, False)
+
+    tk.Label(root, text="Excel File Path:").pack(pady=(10, 0))
+    entry_file_path = tk.Entry(root, width=65)
+    entry_file_path.pack(pady=5)
+    entry_file_path.insert(0, load_default_path())
+
+    tk.Button(root, text="Browse...", command=browse_file).pack()
+    tk.Button(root, text="Save as default path", command=save_default_path,
+              bg="#2196F3", fg="white").pack(pady=(10, 5))
+    tk.Button(root, text="Run Update", command=run_update,
+              bg="#4CAF50", fg="white", height=2, width=20).pack(pady=5)
+    progress_panel = ProgressPanel(root)
+    progress_panel.pack(pady=(5, 0))
+
+    root.mainloop()
@@ -1,7 +1,11 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from openpyxl import load_workbook
 import os
+import sys
+import metrics
+from jobs import PROGRESS_EVERY
+from sheet_reader import open_for_update
+from multi_sheet import update_sheets
+from change_log import ChangeLog, check_mode, log_path
+from memo_prefixes import extract_reference
 
 CONFIG_FILE = "config.txt"
 
@@ -39,51 +43,98 @@ for key_string, value in raw_reference_map.items():
         reference_map[key] = value
 
 # Function to update the Excel file
-def update_excel(file_path):
-    try:
-        wb = load_workbook(file_path)
-        ws = wb.active
-
-        for row in ws.iter_rows(min_row=2):
-            col_c = row[2]  # Column C
-            col_g = row[6]  # Column G
-            col_e = row[4]  # Column E
-            col_h = row[7]  # Column H
-            col_j = row[9]  # Column J
-
-            # === Vendor name cleanup in Column C ===
-            if col_c.value and "perfect gateway enterprises ltd" in str(col_c.value).strip().lower():
-                col_c.value = "Perfect Gateway"
-
-            # === Match from Column G and update Column E ===
-            if col_g.value:
-                cleaned_text = str(col_g.value).strip().lower()
-                matched = False
-                for keyword, code in reference_map.items():
-                    if keyword in cleaned_text:
-                        col_e.value = code
-                        matched = True
-                        break  # Stop after first match
-                if not matched:
-                    col_e.value = "99000"
-
-            # === Extract value from Column H to Column J ===
-            if col_h.value:
-                h_val = str(col_h.value).strip()
-                if h_val.startswith("GC Aluminum, Inc:"):
-                    extracted = h_val.split("GC Aluminum, Inc:")[-1].strip()
-                    if extracted:
-                        col_j.value = extracted
-
-        folder, original_file = os.path.split(file_path)
-        name, ext = os.path.splitext(original_file)
-        new_filename = f"{name}_updatedfortrader{ext}"
-        new_file_path = os.path.join(folder, new_filename)
-        wb.save(new_file_path)
-
-        messagebox.showinfo("Success", f"✅ Updated File saved to:\n{new_file_path}")
-    except Exception as e:
-        messagebox.showerror("Error", f"❌ Failed to update file:\n{str(e)}")
+def code_row(row):
+    """Code one bill line in place (cells with .value, columns A to J).
+
+    Returns the keyword that matched column G, or "" if none did.
+    """
+    col_c = row[2]  # Column C
+    col_g = row[6]  # Column G
+    col_e = row[4]  # Column E
+    col_h = row[7]  # Column H
+    col_j = row[9]  # Column J
+
+    # === Vendor name cleanup in Column C ===
+    if col_c.value and "perfect gateway enterprises ltd" in str(col_c.value).strip().lower():
+        col_c.value = "Perfect Gateway"
+
+    # === Match from Column G and update Column E ===
+    matched = ""
+    if col_g.value:
+        cleaned_text = str(col_g.value).strip().lower()
+        for keyword, code in reference_map.items():
+            if keyword in cleaned_text:
+                col_e.value = code
+                matched = keyword
+                break  # Stop after first match
+        if not matched:
+            col_e.value = "99000"
+
+    # === Extract value from Column H to Column J ===
+    if col_h.value:
+        extracted = extract_reference(col_h.value)
+        if extracted:
+            col_j.value = extracted
+    return matched
+
+
+def update_excel(file_path, progress=None, backend="openpyxl", sheets=None, workers=None,
+                 change_log=None):
+    """Code column E from the column G description and save a copy.
+
+    `progress(done, total)` is called every PROGRESS_EVERY rows.
+    `backend` "fast" streams the sheet instead of loading it with openpyxl
+    (values only, see sheet_reader). `sheets` ("all" or a list of sheet
+    names) codes those sheets instead of the active one, on `workers`
+    processes (see multi_sheet). `change_log` "alongside" also writes the
+    changed cells to <name>_changes.csv, "only" writes just that log
+    instead of the copy (see change_log). Returns (new_path or the log
+    path with "only", rows_processed, matches_found).
+    """
+    check_mode(change_log)
+    folder, original_file = os.path.split(file_path)
+    name, ext = os.path.splitext(original_file)
+    new_filename = f"{name}_updatedfortrader{ext}"
+    new_file_path = os.path.join(folder, new_filename)
+    if sheets is not None:
+        rows_processed, matches_found = update_sheets(__file__, file_path, sheets, new_file_path,
+                                                      backend, workers, progress, change_log)
+        out = log_path(file_path) if change_log == "only" else new_file_path
+        return out, rows_processed, matches_found
+
+    with metrics.stage("workbook_load", "rows") as st:
+        sheet = open_for_update(file_path, backend, copy=change_log != "only")
+        st.count = sheet.total
+    log = ChangeLog(log_path(file_path)) if change_log else None
+    rows_processed = 0
+    matches_found = 0
+
+    total = sheet.total
+    classify = metrics.stage("classify", "rows").start()
+    for r, row in enumerate(sheet.rows(min_row=2), start=2):
+        rows_processed += 1
+        if progress is not None and rows_processed % PROGRESS_EVERY == 0:
+            progress(rows_processed, total)
+        before = [cell.value for cell in row] if log else None
+        keyword = code_row(row)
+        if keyword:
+            matches_found += 1
+        if log:
+            log.row(sheet.title, r, before, row, keyword)
+
+    classify.stop(rows_processed)
+    if log:
+        log.close()
+    if change_log == "only":
+        sheet.close()
+        return log.path, rows_processed, matches_found
+
+    with metrics.stage("save", "rows") as st:
+        sheet.save(new_file_path)
+        st.count = rows_processed
+
+    sheet.close()
+    return new_file_path, rows_processed, matches_found
 
 # Load saved default path
 def load_default_path():
@@ -114,23 +165,45 @@ def run_update():
     if not os.path.isfile(path):
         messagebox.showwarning("Warning", "Please select a valid file.")
         return
-    update_excel(path)
-
-# GUI Setup
-root = tk.Tk()
-root.title("Excel Bill Updater")
-root.geometry("500x200")
-root.resizable(False, False)
-
-# File path input
-tk.Label(root, text="Excel File Path:").pack(pady=(10, 0))
-entry_file_path = tk.Entry(root, width=60)
-entry_file_path.pack(pady=5)
-entry_file_path.insert(0, load_default_path())  # Load from config or fallback default
-tk.Button(root, text="Browse...", command=browse_file).pack()
-
-# Buttons
-tk.Button(root, text="Save this as my default path", command=save_default_path, bg="#2196F3", fg="white").pack(pady=(10, 5))
-tk.Button(root, text="Run Update", command=run_update, bg="#4CAF50", fg="white", height=2).pack(pady=5)
-
-root.mainloop()
+
+    def done(result):
+        new_file_path, _, _ = result
+        messagebox.showinfo("Success", f"✅ Updated File saved to:\n{new_file_path}")
+
+    def failed(e):
+        messagebox.showerror("Error", f"❌ Failed to update file:\n{str(e)}")
+
+    # Runs on a worker thread so the window stays responsive
+    BackgroundJob(root, progress_panel, update_excel, path,
+                  on_done=done, on_error=failed).start()
+
+if __name__ == "__main__":
+    # Any arguments -> headless run (no Tk); see qbd_cli.py
+    if len(sys.argv) > 1:
+        from qbd_cli import main as cli_main
+        sys.exit(cli_main(["trader-plain", *sys.argv[1:]]))
+
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_worker import BackgroundJob, ProgressPanel
+
+    # GUI Setup
+    root = tk.Tk()
+    root.title("Excel Bill Updater")
+    root.geometry("500x260")
+    root.resizable(False, False)
+
+    # File path input
+    tk.Label(root, text="Excel File Path:").pack(pady=(10, 0))
+    entry_file_path = tk.Entry(root, width=60)
+    entry_file_path.pack(pady=5)
+    entry_file_path.insert(0, load_default_path())  # Load from config or fallback default
+    tk.Button(root, text="Browse...", command=browse_file).pack()
+
+    # Buttons
+    tk.Button(root, text="Save this as my default path", command=save_default_path, bg="#2196F3", fg="white").pack(pady=(10, 5))
+    tk.Button(root, text="Run Update", command=run_update, bg="#4CAF50", fg="white", height=2).pack(pady=5)
+    progress_panel = ProgressPanel(root)
+    progress_panel.pack(pady=(5, 0))
+
+    root.mainloop()
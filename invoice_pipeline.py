@@ -0,0 +1,131 @@
+"""Chain Logic invoice PDFs -> coded QuickBooks bill sheet, in one pass.
+
+Replaces the manual hop "extract to xlsx, open it in the trader importer,
+save again". Records flow through generator stages in memory:
+
+    extract_invoice_data -> expand_charge_lines -> cost coding -> bill rows
+
+and only the final bill workbook is written. With `audit_dir` the
+intermediate extraction sheet is written too, for checking.
+"""
+import os
+import time
+
+import metrics
+from batch_io import save_workbook
+from bill_layout import (ACCOUNT, AMOUNT, DESCRIPTION, DUE_DATE, HEADERS, MEMO,
+                         REF_NUMBER, REFERENCE, TXN_DATE, VENDOR, blank_row)
+from checkpoint import journaled
+from invoice_templates import unknown_sources
+from qbd_tools import load_tool
+
+DEFAULT_VENDOR = "CHAIN LOGIC LLC"
+MEMO_FIELD = "SHIPMENT"
+
+
+# ---- Stages ----
+def extracted(pdf_paths, progress=None, journal=None, quarantine=None, retry_failed=False):
+    """Stage 1: one invoice dict per PDF.
+
+    With a `journal` finished PDFs are checkpointed and reused on a rerun,
+    and failing PDFs go to `quarantine` instead of stopping the run.
+    """
+    extract = load_tool("extract")
+    if journal:
+        for _, data in journaled(pdf_paths, extract.extract_invoice_data, journal,
+                                 quarantine, progress, retry_failed):
+            yield data
+        return
+    for n, path in enumerate(pdf_paths, start=1):
+        try:
+            yield extract.extract_invoice_data(path)
+        except Exception as e:
+            raise Exception(f"Failed to process {os.path.basename(path)}:\n{e}")
+        if progress is not None:
+            progress(n, len(pdf_paths))
+
+
+def to_amount(text):
+    if text in (None, ""):
+        return None
+    try:
+        return float(str(text).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def bill_rows(charge_lines, vendor=None, memo_field=MEMO_FIELD):
+    """Stage 3: coded bill rows in the trader importer layout.
+
+    Same rules as update_excel in the trader importer (ver4): vendor
+    cleanup, longest-keyword cost code with 99000 fallback, and the
+    reference taken from the memo (left blank when the memo has none).
+    """
+    trader = load_tool("trader")
+    seconds = 0.0
+    count = 0
+    for data in charge_lines:
+        t0 = time.perf_counter()
+        row = blank_row()
+        row[REF_NUMBER] = data.get("INVOICE NUMBER")
+        row[TXN_DATE] = data.get("INVOICE DATE")
+        row[DUE_DATE] = data.get("DUE DATE")
+        row[VENDOR] = trader.clean_vendor(vendor or data.get("BANK BENEFICIARY") or DEFAULT_VENDOR)
+        desc = data.get("CHARGE DESCRIPTION")
+        row[DESCRIPTION] = desc
+        row[AMOUNT] = to_amount(data.get("CHARGES IN USD"))
+        row[ACCOUNT], _ = trader.code_for_description(desc) if desc else (trader.UNCLASSIFIED_CODE, None)
+        memo = data.get(memo_field)
+        row[MEMO] = memo
+        if memo:
+            row[REFERENCE] = trader.extract_reference(memo)
+        seconds += time.perf_counter() - t0
+        count += 1
+        yield row
+    # upstream stages time themselves, so only the per-row work counts here
+    metrics.record("classify", seconds, count)
+
+
+# ---- Runner ----
+def run_pipeline(pdf_paths, output_path, audit_dir=None, vendor=None, progress=None,
+                 journal=None, retry_failed=False):
+    """Write the coded bill sheet. Returns (output_path, stats).
+
+    With a `journal` (see checkpoint.py) PDFs that fail are listed in
+    stats["quarantined"] instead of stopping the run. PDFs no vendor
+    template recognised are listed in stats["unknown_vendor"].
+    """
+    from openpyxl import Workbook
+
+    extract = load_tool("extract")
+    quarantine = []
+    invoices = extracted(pdf_paths, progress, journal, quarantine, retry_failed)
+    if audit_dir:
+        # the audit sheet needs every invoice before it can lay out columns
+        invoices = list(invoices)
+        os.makedirs(audit_dir, exist_ok=True)
+        extract.write_all_to_excel(invoices, os.path.join(audit_dir, "invoices_extracted.xlsx"))
+
+    stats = {"invoices": 0, "bill_lines": 0, "coded": 0, "unknown_vendor": []}
+
+    def counted(rows):
+        for data in rows:
+            stats["invoices"] += 1
+            stats["unknown_vendor"] += unknown_sources([data])
+            yield data
+
+    unclassified = load_tool("trader").UNCLASSIFIED_CODE
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Bills")
+    ws.append(HEADERS)
+    for row in bill_rows(extract.expand_charge_lines(counted(invoices)), vendor=vendor):
+        ws.append(row)
+        stats["bill_lines"] += 1
+        if row[ACCOUNT] != unclassified:
+            stats["coded"] += 1
+    with metrics.stage("save", "rows") as st:
+        save_workbook(wb, output_path)
+        st.count = stats["bill_lines"]
+    if journal:
+        stats["quarantined"] = quarantine
+    return output_path, stats
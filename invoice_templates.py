@@ -0,0 +1,110 @@
+"""Vendor invoice templates: fingerprint the first page, then parse with the
+matching vendor's parser.
+
+A template registers a parser for the invoice's text lines together with
+one or more fingerprints. A fingerprint is a few tokens that all appear in
+the header of that vendor's first page; any one fingerprint is enough:
+
+    @register("chain-logic", ("CHAIN LOGIC",), ("SHIPMENT", "CONSOL NUMBER"))
+    def parse_chain_logic(lines, data):
+        ...
+
+detect() splits at most HEADER_CHARS of the first page into words once
+and only looks for the tokens whose first word is among them (tokens are
+indexed by their first word), so adding vendors adds almost nothing per
+file.
+Files that match no template go to the generic parser, which only picks up
+invoice number, dates and total and sets TEMPLATE to "unknown";
+unknown_sources() lists them so the tools can report them.
+"""
+import re
+from collections import namedtuple
+
+HEADER_CHARS = 3000
+UNKNOWN = "unknown"
+_WORD = re.compile(r"[A-Z0-9]+")
+
+Template = namedtuple("Template", "name fingerprints parse")
+
+_templates = {}
+_by_token = {}      # token -> [(template name, fingerprint)]
+_by_word = {}       # first word of a token -> [tokens]
+
+
+def register(name, *fingerprints):
+    """Decorator: register `parse(lines, data)` as the template `name`."""
+    fingerprints = [frozenset(t.upper() for t in fp) for fp in fingerprints]
+    if not fingerprints or not all(fingerprints):
+        raise Exception(f"Template '{name}' needs at least one fingerprint token")
+
+    for fp in fingerprints:
+        for t in fp:
+            if not _WORD.match(t):
+                raise Exception(f"Template '{name}': token '{t}' must start with a letter or digit")
+
+    def wrap(parse):
+        _templates[name] = Template(name, fingerprints, parse)
+        for fp in fingerprints:
+            for t in fp:
+                if t not in _by_token:
+                    _by_word.setdefault(_WORD.match(t).group(), []).append(t)
+                _by_token.setdefault(t, []).append((name, fp))
+        return parse
+    return wrap
+
+
+def templates():
+    return list(_templates.values())
+
+
+def detect(first_page_text):
+    """Template for an invoice, from its first page's text."""
+    if not _by_word or not first_page_text:
+        return GENERIC
+    header = first_page_text[:HEADER_CHARS].upper()
+    found = set()
+    for word in _by_word.keys() & _WORD.findall(header):
+        found.update(t for t in _by_word[word] if t in header)
+    best, score = None, 0
+    for token in found:
+        for name, fp in _by_token[token]:
+            # the most specific fully matched fingerprint wins
+            if len(fp) > score and found.issuperset(fp):
+                best, score = name, len(fp)
+    return _templates[best] if best else GENERIC
+
+
+# ---- Generic fallback ----
+_INVOICE_NO = re.compile(r"INVOICE\s*(?:NO\.?|NUMBER|#)?\s*[:#]?\s*([A-Z0-9][A-Z0-9/-]{3,})", re.I)
+_LABELLED = [
+    ("INVOICE DATE", re.compile(r"INVOICE DATE\s*[:#]?\s*(.+)", re.I)),
+    ("DUE DATE", re.compile(r"DUE DATE\s*[:#]?\s*(.+)", re.I)),
+    ("TOTAL USD", re.compile(r"TOTAL(?:\s+USD|\s+DUE|\s+AMOUNT)?\s*[:$]?\s*([\d,]+\.\d{2})\s*$", re.I)),
+]
+
+
+def parse_generic(lines, data):
+    """Unknown vendor: invoice number, dates and total only, flagged for review."""
+    data["TEMPLATE"] = UNKNOWN
+    for line in lines:
+        line = line.strip()
+        if "INVOICE NUMBER" not in data:
+            m = _INVOICE_NO.match(line)
+            if m and "DATE" not in line.upper():
+                data["INVOICE NUMBER"] = m.group(1)
+                continue
+        for key, rx in _LABELLED:
+            if key not in data:
+                m = rx.match(line)
+                if m:
+                    data[key] = m.group(1).strip()
+                    break
+    return data
+
+
+GENERIC = Template("generic", [], parse_generic)
+
+
+def unknown_sources(data_list):
+    """Source files of the invoices no template recognised (parsed generically)."""
+    return [d.get("SOURCE FILE") for d in data_list if d.get("TEMPLATE") == UNKNOWN]
@@ -0,0 +1,333 @@
+"""Small local HTTP job service so several people can share one copy of the tools.
+
+    python job_service.py --port 8765 --workers 4
+
+    curl --data-binary @"lastest bill.xlsx" "http://host:8765/jobs/trader?filename=bill.xlsx"
+    curl http://host:8765/jobs/<id>
+    curl -o out.xlsx http://host:8765/jobs/<id>/result
+
+Upload one file per job (PDF tools also take a .zip of PDFs); `filename`
+must be a plain file name, no folders. An upload is
+only read once the queue has room; a zip may hold at most MAX_ZIP_MEMBERS
+files and MAX_UNZIPPED_BYTES in total, and members with the same file
+name in different folders are renamed "name_2.pdf", ... Jobs go to a
+bounded pool of warm worker processes that import pdfplumber/openpyxl and
+load every tool (keyword maps etc.) once at start-up, so a job pays no
+import cost; if a worker dies the pool is replaced at the next upload. Standard library only.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from qbd_tools import TOOLS, run_tool, warm_up
+
+DEFAULT_PORT = 8765
+SPOOL_DIR = "job_spool"
+MAX_QUEUED = 20
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+MAX_ZIP_MEMBERS = 2000
+MAX_UNZIPPED_BYTES = 2 * 1024 * 1024 * 1024
+CHUNK = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """An upload the service will not run; `status` is the HTTP code."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---- Worker side ----
+def _run_job(tool, inputs, output, options):
+    return run_tool(tool, inputs, output, **options)
+
+
+def _options(query):
+    """Query string -> run_tool options."""
+    q = {k: v[-1] for k, v in parse_qs(query, keep_blank_values=True).items()}
+    options = {}
+    if "window" in q:
+        options["window_months"] = int(q["window"])
+        if options["window_months"] < 0:
+            raise ValueError("window must be 0 or more months")
+    if q.get("simulate") in ("1", "true", "yes"):
+        options["simulate"] = True
+    if q.get("windows"):
+        options["windows"] = [int(w) for w in q["windows"].split(",") if w.strip()]
+    if q.get("vendor"):
+        options["vendor"] = q["vendor"]
+    return q.get("filename"), options
+
+
+def _save_upload(body, length, path):
+    """Copy `length` bytes of the request body to `path`."""
+    with open(path, "wb") as f:
+        left = length
+        while left:
+            chunk = body.read(min(CHUNK, left))
+            if not chunk:
+                raise UploadRejected(400, "upload ended early")
+            f.write(chunk)
+            left -= len(chunk)
+
+
+def _upload_name(name):
+    """`name` if it is a plain file name to keep in a job directory."""
+    if name in ("", ".", "..") or "/" in name or "\\" in name or (os.altsep and os.altsep in name):
+        raise UploadRejected(400, f"bad file name {name!r}")
+    return name
+
+
+def _unique_name(name, taken):
+    base, ext = os.path.splitext(name)
+    n = 1
+    while name in taken:
+        n += 1
+        name = f"{base}_{n}{ext}"
+    taken.add(name)
+    return name
+
+
+def _extract_zip(path, job_dir):
+    """Unpack the files of a zip into `job_dir` (flat); returns their paths.
+
+    Stops at MAX_ZIP_MEMBERS files or MAX_UNZIPPED_BYTES written, counting
+    the bytes actually inflated rather than the sizes the zip claims.
+    """
+    inputs = []
+    taken = {os.path.basename(path)}
+    written = 0
+    with zipfile.ZipFile(path) as zf:
+        members = [m for m in zf.infolist() if not m.is_dir()]
+        if len(members) > MAX_ZIP_MEMBERS:
+            raise UploadRejected(413, f"zip has {len(members)} files (at most {MAX_ZIP_MEMBERS})")
+        for member in sorted(members, key=lambda m: m.filename):
+            name = _upload_name(member.filename.replace("\\", "/").rsplit("/", 1)[-1])
+            target = os.path.join(job_dir, _unique_name(name, taken))
+            with zf.open(member) as src, open(target, "wb") as dst:
+                while True:
+                    chunk = src.read(CHUNK)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if written > MAX_UNZIPPED_BYTES:
+                        raise UploadRejected(413, f"zip unpacks to more than {MAX_UNZIPPED_BYTES} bytes")
+                    dst.write(chunk)
+            inputs.append(target)
+    return inputs
+
+
+# ---- Job table ----
+class JobService:
+    def __init__(self, workers=None, max_queued=MAX_QUEUED, spool=SPOOL_DIR):
+        self.spool = os.path.abspath(spool)
+        os.makedirs(self.spool, exist_ok=True)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = self.workers + max_queued
+        self.pool = self._new_pool()
+        self.jobs = {}
+        self.receiving = 0  # uploads admitted but not yet queued
+        self.lock = threading.Lock()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up)
+
+    def _queue(self, *args):
+        """Submit to the pool; a pool broken by a dead worker is replaced."""
+        try:
+            return self.pool.submit(_run_job, *args)
+        except BrokenProcessPool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool()
+            return self.pool.submit(_run_job, *args)
+
+    def pending(self):
+        return self.receiving + sum(1 for j in self.jobs.values() if j["state"] == "queued")
+
+    def submit(self, tool, filename, body, length, options):
+        """Queue a job for the upload in `body` (`length` bytes).
+
+        Returns None, without reading the upload, when the queue is full.
+        """
+        if tool not in TOOLS:
+            raise KeyError(tool)
+        filename = _upload_name("upload" if filename is None else filename)
+        with self.lock:
+            if self.pending() >= self.max_pending:
+                return None
+            self.receiving += 1
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.spool, job_id)
+        try:
+            os.makedirs(job_dir)
+            path = os.path.join(job_dir, filename)
+            _save_upload(body, length, path)
+            inputs = [path]
+            if filename.lower().endswith(".zip"):
+                inputs = _extract_zip(path, job_dir)
+                os.remove(path)
+        except BaseException:
+            with self.lock:
+                self.receiving -= 1
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        output = os.path.join(job_dir, "result.xlsx") if tool in ("extract", "pipeline") else None
+
+        job = {"id": job_id, "tool": tool, "state": "queued", "inputs": [os.path.basename(p) for p in inputs],
+               "outputs": [], "stats": {}, "error": None}
+        with self.lock:
+            self.receiving -= 1
+            self.jobs[job_id] = job
+            job["future"] = self._queue(tool, inputs, output, options)
+        job["future"].add_done_callback(lambda fut: self._finished(job, fut))
+        return job
+
+    def _finished(self, job, fut):
+        with self.lock:
+            try:
+                result = fut.result()
+            except Exception as e:
+                job["state"] = "failed"
+                job["error"] = str(e)
+            else:
+                job["state"] = "done"
+                job["outputs"] = result["outputs"]
+                job["stats"] = result["stats"]
+
+    def status(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        out = {k: v for k, v in job.items() if k != "future"}
+        if out["state"] == "queued" and job["future"].running():
+            out["state"] = "running"
+        out["outputs"] = [os.path.basename(p) for p in job["outputs"]]
+        return out
+
+    def delete(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["state"] == "queued":
+                return False
+            del self.jobs[job_id]
+        shutil.rmtree(os.path.join(self.spool, job_id), ignore_errors=True)
+        return True
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ---- HTTP ----
+class Handler(BaseHTTPRequestHandler):
+    service = None  # set by serve()
+
+    def _send_json(self, code, obj):
+        body = json.dumps(obj, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parts(self):
+        url = urlparse(self.path)
+        return [p for p in url.path.split("/") if p], url.query
+
+    def do_GET(self):
+        parts, _ = self._parts()
+        if parts == ["tools"]:
+            return self._send_json(200, {name: desc for name, (_, desc) in TOOLS.items()})
+        if len(parts) >= 2 and parts[0] == "jobs":
+            job = self.service.status(parts[1])
+            if job is None:
+                return self._send_json(404, {"error": "unknown job"})
+            if len(parts) == 2:
+                return self._send_json(200, job)
+            if parts[2] == "result":
+                if job["state"] != "done":
+                    return self._send_json(409, {"error": f"job is {job['state']}"})
+                n = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else 0
+                if n >= len(job["outputs"]):
+                    return self._send_json(404, {"error": "no such output"})
+                return self._send_file(self.service.jobs[parts[1]]["outputs"][n])
+        self._send_json(404, {"error": "not found"})
+
+    def _send_file(self, path):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_POST(self):
+        parts, query = self._parts()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send_json(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            return self._send_json(400, {"error": "empty upload"})
+        if length > MAX_UPLOAD_BYTES:
+            return self._send_json(413, {"error": "upload too large"})
+        try:
+            filename, options = _options(query)
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        try:
+            job = self.service.submit(parts[1], filename, self.rfile, length, options)
+        except KeyError:
+            return self._send_json(404, {"error": f"unknown tool '{parts[1]}'"})
+        except zipfile.BadZipFile:
+            return self._send_json(400, {"error": "bad zip file"})
+        except UploadRejected as e:
+            return self._send_json(e.status, {"error": str(e)})
+        if job is None:
+            return self._send_json(503, {"error": "queue full, try again later"})
+        self._send_json(202, self.service.status(job["id"]))
+
+    def do_DELETE(self):
+        parts, _ = self._parts()
+        if len(parts) == 2 and parts[0] == "jobs" and self.service.delete(parts[1]):
+            return self._send_json(200, {"deleted": parts[1]})
+        self._send_json(404, {"error": "unknown or unfinished job"})
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=None, max_queued=MAX_QUEUED, spool=SPOOL_DIR):
+    service = JobService(workers, max_queued, spool)
+    Handler.service = service
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(f"Job service on http://{host}:{port} ({service.workers} workers, spool {service.spool})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local HTTP job service for the QBD tools")
+    ap.add_argument("--host", default="127.0.0.1", help="use 0.0.0.0 to share on the office network")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    ap.add_argument("--max-queued", type=int, default=MAX_QUEUED, help="jobs waiting beyond the busy workers")
+    ap.add_argument("--spool", default=SPOOL_DIR, help="where uploads and results are kept")
+    args = ap.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.max_queued, args.spool)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
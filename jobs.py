@@ -0,0 +1,34 @@
+"""Progress reporting and cancellation for long-running tool jobs.
+
+Core functions accept an optional `progress(done, total)` callable and
+call it every PROGRESS_EVERY rows. The callable may raise JobCancelled to
+stop the job; no GUI code is involved here.
+"""
+import threading
+
+PROGRESS_EVERY = 500
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when the user asked to cancel it."""
+
+
+class ProgressTracker:
+    """progress(done, total) callable that forwards updates and checks cancel."""
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def __call__(self, done, total=None):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        if self.callback is not None:
+            self.callback(done, total)
@@ -0,0 +1,92 @@
+"""Customer memo prefixes for the column H -> J reference extraction.
+
+A bill line's memo (H) starts with the billed customer entity, e.g.
+"GC Aluminum, Inc:S1234567"; the part after the prefix is the reference
+that goes to column J. The prefixes come from memo_prefixes.json next to
+the tools (prefix -> customer name):
+
+    {"GC Aluminum, Inc:": "GC Aluminum, Inc",
+     "GC Aluminum, Inc: West:": "GC Aluminum West"}
+
+and are compiled into a character trie, so one walk along the memo finds
+the longest matching prefix however many customers are listed. Matching
+is case-sensitive, as it always was. Without the file only the original
+"GC Aluminum, Inc:" prefix is known.
+"""
+import json
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PREFIX_FILE = os.path.join(HERE, "memo_prefixes.json")
+DEFAULT_PREFIXES = {"GC Aluminum, Inc:": "GC Aluminum, Inc"}
+
+_END = None  # trie key marking "a prefix ends here"
+
+
+class PrefixTrie:
+    def __init__(self, prefixes):
+        """`prefixes`: {prefix: customer} (or an iterable of prefixes)."""
+        if not isinstance(prefixes, dict):
+            prefixes = {p: p for p in prefixes}
+        self.root = {}
+        for prefix, customer in prefixes.items():
+            if not prefix:
+                raise Exception("Memo prefixes cannot be empty")
+            node = self.root
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node[_END] = (prefix, customer)
+        self.size = len(prefixes)
+
+    def longest(self, text):
+        """(prefix, customer) of the longest prefix `text` starts with, or None."""
+        node = self.root
+        found = None
+        for ch in text:
+            node = node.get(ch)
+            if node is None:
+                break
+            found = node.get(_END, found)
+        return found
+
+    def extract(self, memo):
+        """(reference, customer) from a memo, or (None, None) if no prefix matches."""
+        text = str(memo).strip()
+        found = self.longest(text)
+        if found is None:
+            return None, None
+        prefix, customer = found
+        # same as the original split(prefix)[-1]: text after the last occurrence
+        reference = text.split(prefix)[-1].strip()
+        return (reference or None), customer
+
+
+def load_prefixes(path=PREFIX_FILE):
+    if not os.path.isfile(path):
+        return dict(DEFAULT_PREFIXES)
+    try:
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+    except ValueError as e:
+        raise Exception(f"{os.path.basename(path)} is not valid JSON: {e}")
+    if isinstance(table, list):
+        table = {p: p for p in table}
+    if not isinstance(table, dict) or not table:
+        raise Exception(f"{os.path.basename(path)} must map memo prefixes to customer names")
+    return table
+
+
+_trie = None
+
+
+def default_trie():
+    """The trie for PREFIX_FILE, compiled once per process."""
+    global _trie
+    if _trie is None:
+        _trie = PrefixTrie(load_prefixes())
+    return _trie
+
+
+def extract_reference(memo):
+    """Reference after the customer prefix in a memo, or None."""
+    return default_trie().extract(memo)[0]
@@ -0,0 +1,210 @@
+"""Per-stage timing, throughput and memory for the QBD tools.
+
+Engines wrap their steps in stages:
+
+    with metrics.stage("workbook_load", "rows") as st:
+        wb = load_workbook(path)
+        st.count = wb.active.max_row
+
+or, where a `with` block would re-indent a long loop,
+
+    st = metrics.stage("line_parse", "lines").start()
+    ...
+    st.stop(len(lines))
+
+Stages with the same name are summed over the run. When nobody called
+start_run() the numbers are simply dropped, so the GUI pays only a couple
+of perf_counter() calls. finish_run() appends one JSON line per stage
+(plus a "run" line) and can also write a Prometheus textfile for the node
+exporter, so runs can be trended across versions.
+
+Memory is the process's peak so far (ru_maxrss, or PeakWorkingSetSize on
+Windows), read when a stage ends: a stage's figure is the highest the
+process had reached by then, not what that stage used on its own.
+"""
+import json
+import os
+import sys
+import time
+import uuid
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_run = None  # current run: {"tool", "id", "t0", "stages": {name: totals}}
+
+
+_win_memory_info = None  # (GetProcessMemoryInfo, counters) once set up
+
+
+def _windows_peak_bytes():
+    """PeakWorkingSetSize of this process (psapi GetProcessMemoryInfo)."""
+    global _win_memory_info
+    import ctypes
+    from ctypes import wintypes
+
+    if _win_memory_info is None:
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        get_info = ctypes.WinDLL("psapi").GetProcessMemoryInfo
+        get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        get_info.restype = wintypes.BOOL
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        _win_memory_info = (get_info, counters)
+    get_info, counters = _win_memory_info
+    current = wintypes.HANDLE(-1)  # GetCurrentProcess() pseudo-handle
+    if not get_info(current, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unknown)."""
+    if resource is None:
+        if os.name != "nt":
+            return None
+        try:
+            peak = _windows_peak_bytes()
+        except (OSError, AttributeError):
+            return None
+        return round(peak / (1024 * 1024), 1) if peak is not None else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def code_version():
+    """Short git commit of the checkout, read without running git."""
+    try:
+        with open(os.path.join(HERE, ".git", "HEAD")) as f:
+            head = f.read().strip()
+        if head.startswith("ref: "):
+            with open(os.path.join(HERE, ".git", head[5:])) as f:
+                head = f.read().strip()
+        return head[:12]
+    except OSError:
+        return None
+
+
+class Stage:
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.count = 0
+        self.t0 = None
+
+    def start(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def stop(self, count=None):
+        if count is not None:
+            self.count = count
+        seconds = time.perf_counter() - self.t0
+        record(self.name, seconds, self.count, self.unit)
+        return seconds
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def stage(name, unit="rows"):
+    return Stage(name, unit)
+
+
+def record(name, seconds, count=0, unit="rows"):
+    """Add time measured by the caller (e.g. summed inside a generator)."""
+    if _run is None:
+        return
+    s = _run["stages"].setdefault(name, {"calls": 0, "seconds": 0.0, "count": 0, "unit": unit})
+    s["calls"] += 1
+    s["seconds"] += seconds
+    s["count"] += count or 0
+    s["peak_rss_so_far_mb"] = peak_rss_mb()
+
+
+def start_run(tool):
+    global _run
+    _run = {"tool": tool, "id": uuid.uuid4().hex[:12], "t0": time.perf_counter(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": {}}
+    return _run
+
+
+def summary():
+    """Stage totals of the current run as a list of dicts (stage order)."""
+    if _run is None:
+        return []
+    out = []
+    for name, s in _run["stages"].items():
+        rate = s["count"] / s["seconds"] if s["seconds"] > 0 else None
+        out.append({"stage": name, "calls": s["calls"], "seconds": round(s["seconds"], 6),
+                    "count": s["count"], "unit": s["unit"],
+                    "per_second": round(rate, 1) if rate is not None else None,
+                    "peak_rss_so_far_mb": s.get("peak_rss_so_far_mb")})
+    return out
+
+
+def finish_run(jsonl_path=None, prom_path=None, ok=True):
+    """End the run; write JSON lines and/or a Prometheus textfile. Returns the stages."""
+    global _run
+    if _run is None:
+        return []
+    stages = summary()
+    base = {"run": _run["id"], "tool": _run["tool"], "started": _run["started"],
+            "version": code_version()}
+    total = {"stage": "run", "seconds": round(time.perf_counter() - _run["t0"], 6),
+             "ok": ok, "peak_rss_mb": peak_rss_mb()}
+    if jsonl_path:
+        with open(jsonl_path, "a", encoding="utf-8") as f:
+            for s in stages + [total]:
+                f.write(json.dumps(dict(base, **s)) + "\n")
+    if prom_path:
+        write_prometheus(prom_path, base, stages, total)
+    _run = None
+    return stages
+
+
+def write_prometheus(path, base, stages, total):
+    """node_exporter textfile collector format; replaced atomically."""
+    tool = base["tool"]
+    lines = [
+        "# HELP qbd_stage_seconds Wall time spent in a stage during the last run.",
+        "# TYPE qbd_stage_seconds gauge",
+    ]
+    for s in stages:
+        lines.append(f'qbd_stage_seconds{{tool="{tool}",stage="{s["stage"]}"}} {s["seconds"]}')
+    lines += ["# HELP qbd_stage_items Rows/pages/files handled by a stage during the last run.",
+              "# TYPE qbd_stage_items gauge"]
+    for s in stages:
+        lines.append(f'qbd_stage_items{{tool="{tool}",stage="{s["stage"]}",unit="{s["unit"]}"}} {s["count"]}')
+    lines += ["# HELP qbd_run_seconds Wall time of the last run.",
+              "# TYPE qbd_run_seconds gauge",
+              f'qbd_run_seconds{{tool="{tool}"}} {total["seconds"]}',
+              "# HELP qbd_run_success 1 if the last run finished without error.",
+              "# TYPE qbd_run_success gauge",
+              f'qbd_run_success{{tool="{tool}"}} {1 if total["ok"] else 0}']
+    if total["peak_rss_mb"] is not None:
+        lines += ["# HELP qbd_peak_rss_megabytes Peak resident memory of the process at the end "
+                  "of the last run (a resident worker's includes earlier jobs).",
+                  "# TYPE qbd_peak_rss_megabytes gauge",
+                  f'qbd_peak_rss_megabytes{{tool="{tool}"}} {total["peak_rss_mb"]}']
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
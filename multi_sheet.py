@@ -0,0 +1,216 @@
+"""Run a tool over several worksheets of one workbook in one go.
+
+The trader importers and the service revenue filters read only the active
+sheet. With `sheets="all"` (or a list of sheet names) every selected sheet
+is handed to a worker process as its own stream (xlsx_fast_reader opens
+one sheet part without touching the others) and the results are put back
+together in the workbook's sheet order:
+
+    trader importers   one copy of the workbook with each selected sheet
+                       coded; workers send back only the cells they changed
+    filters            one output workbook, one sheet per selected sheet
+
+Workers load the tool script by its file name through qbd_tools, so this
+also works where worker processes are spawned (Windows). Progress is
+reported per finished sheet.
+"""
+import os
+
+import metrics
+from batch_io import save_workbook, source
+
+ALL_SHEETS = "all"
+
+
+def _tool_module(script):
+    from qbd_tools import TOOLS, load_tool
+
+    base = os.path.basename(script)
+    for name, (file, _) in TOOLS.items():
+        if file == base:
+            return load_tool(name)
+    raise Exception(f"Not a registered tool script: {base}")
+
+
+def select_sheets(file_path, sheets):
+    """Names of the selected sheets, in workbook order."""
+    from xlsx_fast_reader import FastSheetReader
+
+    with FastSheetReader(source(file_path)) as reader:
+        names = list(reader.sheet_names)
+    if isinstance(sheets, str):
+        sheets = [sheets]
+    if list(sheets) == [ALL_SHEETS] and ALL_SHEETS not in names:
+        return names
+    missing = [s for s in sheets if s not in names]
+    if missing:
+        raise Exception(f"Worksheet not found: {', '.join(repr(s) for s in missing)} "
+                        f"(the workbook has {', '.join(repr(n) for n in names)})")
+    wanted = set(sheets)
+    picked = [n for n in names if n in wanted]
+    if not picked:
+        raise Exception("No worksheets selected")
+    return picked
+
+
+def check_columns(file_path, names, required, confirm=None):
+    """Resolve the columns of every selected sheet up front.
+
+    Runs in the calling process, where `confirm` can ask the user; new
+    layouts land in the schema registry, so the workers find them cached.
+    """
+    from schema_registry import resolve_columns
+    from xlsx_fast_reader import FastSheetReader
+
+    for name in names:
+        with FastSheetReader(file_path, name) as reader:
+            resolve_columns(reader.header(), required, confirm=confirm)
+
+
+def _call_job(file_path, sheet, script, func, args):
+    """Worker: `func(file_path, sheet, *args)` from the tool script."""
+    return getattr(_tool_module(script), func)(file_path, sheet, *args)
+
+
+def run_sheets(script, func, file_path, names, args=(), workers=None, progress=None):
+    """[func(file_path, name, *args) for name in names] with `func` from a tool script."""
+    return map_sheets(_call_job, file_path, names, (script, func, args), workers, progress)
+
+
+def map_sheets(job, file_path, names, args=(), workers=None, progress=None):
+    """[job(file_path, name, *args) for name in names], one process per sheet."""
+    workers = min(max(workers or os.cpu_count() or 1, 1), len(names))
+    with metrics.stage("sheets", "sheets") as st:
+        st.count = len(names)
+        if workers == 1:
+            results = []
+            for n, name in enumerate(names, start=1):
+                results.append(job(file_path, name, *args))
+                if progress is not None:
+                    progress(n, len(names))
+            return results
+
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(job, file_path, name, *args): i for i, name in enumerate(names)}
+            results = [None] * len(names)
+            try:
+                for n, fut in enumerate(as_completed(futures), start=1):
+                    results[futures[fut]] = fut.result()
+                    if progress is not None:
+                        progress(n, len(names))
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+        return results
+
+
+def write_sheets(output_path, sheets):
+    """One workbook from (title, rows) pairs, in the given order."""
+    from openpyxl import Workbook
+
+    with metrics.stage("save", "rows") as st:
+        wb = Workbook(write_only=True)
+        for title, rows in sheets:
+            ws = wb.create_sheet(title)
+            for row in rows:
+                ws.append(row)
+                st.count += 1
+        save_workbook(wb, output_path)
+
+
+# ---- Trader importers ----
+def _code_job(file_path, sheet, script, backend):
+    """Worker: run the tool's code_row over one sheet.
+
+    Reads with the same backend as the single-sheet run, so formula cells
+    look the same to code_row. Returns (changes, rows_processed,
+    matches_found); changes are (row, column index, old value, new value,
+    keyword, Ref No) for the cells code_row changed.
+    """
+    from bill_layout import ACCOUNT, REF_NUMBER
+    from sheet_reader import ValueCell, open_sheet
+
+    code_row = _tool_module(script).code_row
+    changes = []
+    rows_processed = matches_found = 0
+    with open_sheet(file_path, backend, sheet) as reader:
+        for r, values in enumerate(reader.rows(min_row=2), start=2):
+            cells = [ValueCell(v) for v in values]
+            keyword = code_row(cells)
+            if keyword is not None:
+                rows_processed += 1
+                matches_found += bool(keyword)
+            for c, (cell, old) in enumerate(zip(cells, values)):
+                if cell.value != old:
+                    changes.append((r, c, old, cell.value, keyword if c == ACCOUNT else None,
+                                    values[REF_NUMBER]))
+    return changes, rows_processed, matches_found
+
+
+def update_sheets(script, file_path, sheets, new_path, backend="openpyxl", workers=None, progress=None,
+                  change_log=None):
+    """Code the selected sheets of a bill workbook into `new_path`.
+
+    The sheets are classified in parallel from their values; the changed
+    cells are then written into a copy of the whole workbook: with openpyxl
+    (formatting and every other sheet kept) or, for backend "fast", as a
+    values-only copy of every sheet. `change_log` as for update_excel
+    (change_log.py). Returns (rows_processed, matches_found).
+    """
+    backend = backend or "openpyxl"
+    names = select_sheets(file_path, sheets)
+    results = map_sheets(_code_job, file_path, names, (script, backend), workers, progress)
+    changes = {name: result[0] for name, result in zip(names, results)}
+    rows_processed = sum(result[1] for result in results)
+    matches_found = sum(result[2] for result in results)
+
+    if change_log:
+        from change_log import ChangeLog, log_path
+
+        with ChangeLog(log_path(file_path)) as log:
+            for name in names:
+                for r, c, old, new, keyword, ref_no in changes[name]:
+                    log.add(name, r, ref_no, c, old, new, keyword)
+        if change_log == "only":
+            return rows_processed, matches_found
+
+    with metrics.stage("save", "rows") as st:
+        if backend == "openpyxl":
+            from openpyxl import load_workbook
+
+            wb = load_workbook(file_path)
+            for name in names:
+                ws = wb[name]
+                for r, c, _, value, _, _ in changes[name]:
+                    ws.cell(row=r, column=c + 1).value = value
+        else:
+            wb = _values_copy(file_path, changes)
+        st.count = rows_processed
+        save_workbook(wb, new_path)
+    return rows_processed, matches_found
+
+
+def _values_copy(file_path, changes):
+    """Write-only copy of every sheet's values with `changes` applied."""
+    from openpyxl import Workbook
+
+    from xlsx_fast_reader import FastSheetReader
+
+    wb = Workbook(write_only=True)
+    with FastSheetReader(file_path) as reader:
+        all_names = reader.sheet_names
+    for name in all_names:
+        edits = {}
+        for r, c, _, value, _, _ in changes.get(name, ()):
+            edits.setdefault(r, []).append((c, value))
+        ws = wb.create_sheet(name)
+        with FastSheetReader(file_path, name) as reader:
+            for r, row in enumerate(reader.rows(), start=1):
+                row = list(row)
+                for c, value in edits.get(r, ()):
+                    row[c] = value
+                ws.append(row)
+    return wb
@@ -0,0 +1,185 @@
+"""Profile one tool run and save the results next to its output.
+
+    with ProfileSession("deterministic") as prof:   # or "sample"
+        result = run_tool(...)
+    prof.save(profile_base(output_path), inputs, tool)
+
+"deterministic" runs cProfile. "sample" is the low-overhead mode: a
+background thread reads the profiled thread's stack every few
+milliseconds. Both modes write:
+
+    <output>_profile.pstats         open with pstats / snakeviz
+    <output>_profile.collapsed.txt  "a;b;c count" lines for flamegraph.pl
+                                    or speedscope
+    <output>_profile.input.json     size of the input (rows, pages,
+                                    unique descriptions)
+
+In deterministic mode the collapsed stacks come from a sampler running
+alongside cProfile, since cProfile only keeps caller/callee pairs.
+"""
+import cProfile
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.005  # seconds
+MODES = ("deterministic", "sample")
+
+
+class Sampler(threading.Thread):
+    """Counts the call stacks of one thread at a fixed interval."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # tuple of (file, line, func), root first -> samples
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class ProfileSession:
+    """Profile the calling thread between __enter__ and __exit__."""
+
+    def __init__(self, mode="deterministic", interval=SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise Exception(f"Unknown profile mode: '{mode}'")
+        self.mode = mode
+        self.interval = interval
+        self.profiler = None
+        self.sampler = None
+        self.seconds = None
+
+    def __enter__(self):
+        self.sampler = Sampler(threading.get_ident(), self.interval)
+        self.sampler.start()
+        if self.mode == "deterministic":
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.t0
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.sampler.stop()
+        return False
+
+    # ---- Output ----
+    def collapsed_lines(self):
+        lines = []
+        for stack, count in self.sampler.stacks.most_common():
+            names = ";".join(f"{os.path.basename(f)}:{func}" for f, _, func in stack)
+            lines.append(f"{names} {count}")
+        return lines
+
+    def sampled_stats(self):
+        """pstats-compatible dict built from the samples (times in seconds)."""
+        stats = {}
+        dt = self.interval
+        for stack, count in self.sampler.stacks.items():
+            seen = set()
+            for depth, key in enumerate(stack):
+                cc, nc, tt, ct, callers = stats.get(key, (0, 0, 0.0, 0.0, {}))
+                if depth == len(stack) - 1:
+                    tt += count * dt
+                if key not in seen:  # recursion: count inclusive time once
+                    ct += count * dt
+                    seen.add(key)
+                if depth:
+                    caller = stack[depth - 1]
+                    c = callers.get(caller, (0, 0, 0.0, 0.0))
+                    callers[caller] = (c[0] + count, c[1] + count, c[2], c[3] + count * dt)
+                stats[key] = (cc + count, nc + count, tt, ct, callers)
+        return stats
+
+    def save(self, base, inputs=(), tool=None):
+        """Write <base>.pstats, <base>.collapsed.txt and <base>.input.json."""
+        pstats_path = base + ".pstats"
+        if self.profiler is not None:
+            self.profiler.dump_stats(pstats_path)
+        else:
+            with open(pstats_path, "wb") as f:
+                marshal.dump(self.sampled_stats(), f)
+
+        collapsed_path = base + ".collapsed.txt"
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed_lines()) + "\n")
+
+        info_path = base + ".input.json"
+        info = {"tool": tool, "mode": self.mode, "seconds": round(self.seconds or 0, 3),
+                "samples": sum(self.sampler.stacks.values()),
+                "sample_interval": self.interval,
+                "inputs": [describe_input(p, tool) for p in inputs]}
+        with open(info_path, "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2, default=str)
+        return [pstats_path, collapsed_path, info_path]
+
+
+def profile_base(output_path):
+    root, _ = os.path.splitext(output_path)
+    return root + "_profile"
+
+
+# ---- Input characteristics ----
+def describe_input(path, tool=None):
+    """Size of one input: bytes, plus pages (PDF) or rows/columns and
+    unique descriptions / expense classes (workbooks)."""
+    info = {"file": os.path.basename(path), "bytes": os.path.getsize(path)}
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".pdf":
+            import pdfplumber
+
+            with pdfplumber.open(path) as pdf:
+                info["pages"] = len(pdf.pages)
+        elif ext in (".xlsx", ".xlsm"):
+            info.update(_describe_sheet(path, tool))
+    except Exception as e:  # profiling must never fail the run
+        info["error"] = str(e)
+    return info
+
+
+def _describe_sheet(path, tool):
+    from schema_registry import normalize
+    from xlsx_fast_reader import FastSheetReader
+
+    with FastSheetReader(path) as reader:
+        headers = reader.header()
+        names = [normalize(h) for h in headers]
+        if tool and tool.startswith("trader"):
+            column, label = 6, "unique_descriptions"  # column G
+        elif "expense class" in names:
+            column, label = names.index("expense class"), "unique_expense_classes"
+        else:
+            column, label = None, None
+        rows = 0
+        unique = set()
+        for _, values, _ in reader.iter_rows(columns=[column] if column is not None else [],
+                                             min_row=2):
+            rows += 1
+            if column is not None and values[0] not in (None, ""):
+                unique.add(str(values[0]).strip().lower())
+    info = {"sheet": reader.sheet_name, "rows": rows, "columns": len(headers)}
+    if label:
+        info[label] = len(unique)
+    return info
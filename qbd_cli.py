@@ -0,0 +1,182 @@
+"""Headless command line for every QBD automation tool (no Tk needed).
+
+    python qbd_cli.py extract invoices/*.pdf -o out.xlsx
+    python qbd_cli.py pipeline invoices/*.pdf -o bills.xlsx --audit-dir audit
+    python qbd_cli.py trader "lastest bill.xlsx"
+    python qbd_cli.py trader "lastest bill.xlsx" --change-log only
+    python qbd_cli.py qbxml "lastest bill.xlsx" --batch-size 100 --mock
+    python qbd_cli.py reconcile invoices.xlsx "bill export.xlsx" -o recon.xlsx
+    python qbd_cli.py sr-process ledger.xlsx --workers 4
+    python qbd_cli.py sr-filter entities.xlsx --sheets all
+    python qbd_cli.py sr-process ledger.xlsx --simulate --windows 12,18,24
+
+Each tool script also accepts the same arguments directly, e.g.
+python "service revenue processor final_importer.py" ledger.xlsx.
+Pass --timing to print start-up, processing and per-stage times;
+--metrics FILE appends per-stage JSON lines, --prom FILE writes a
+Prometheus textfile (see metrics.py). --profile saves a cProfile run
+(--profile sample: low-overhead sampling) next to the output.
+--journal FILE checkpoints a batch: rerun the same command after a crash
+and finished inputs are skipped; bad inputs are quarantined.
+--worker sends the job to the resident worker (python qbd_worker.py),
+which has everything loaded already; without one it runs here.
+"""
+import time
+
+_T0 = time.perf_counter()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import sys  # noqa: E402
+
+import metrics  # noqa: E402
+from qbd_tools import TOOLS, run_tool  # noqa: E402
+
+# Cold start (interpreter + imports + a one-row job) should stay under this;
+# checked by benchmarks/bench_cold_start.py.
+COLD_START_BUDGET_S = 1.5
+
+
+def _months(text):
+    months = int(text)
+    if months < 0:
+        raise argparse.ArgumentTypeError(f"window must be 0 or more months, not {months}")
+    return months
+
+
+def _windows(text):
+    return [_months(w) for w in text.replace(";", ",").split(",") if w.strip()]
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="qbd_cli", description="QBD automation tools (headless)")
+    sub = ap.add_subparsers(dest="tool", required=True, metavar="TOOL")
+    for name, (_, desc) in TOOLS.items():
+        p = sub.add_parser(name, help=desc, description=desc)
+        p.add_argument("inputs", nargs="+", help="input file(s)")
+        p.add_argument("--timing", action="store_true", help="print start-up and run times")
+        p.add_argument("--json", action="store_true", help="print the result as JSON")
+        p.add_argument("--metrics", metavar="FILE", help="append per-stage metrics as JSON lines")
+        p.add_argument("--prom", metavar="FILE", help="write per-stage metrics as a Prometheus textfile")
+        p.add_argument("--worker", action="store_true",
+                       help="run on the resident worker (qbd_worker.py) if one is running")
+        p.add_argument("--read-ahead", type=int, metavar="N",
+                       help="input files prefetched ahead in batch runs (default 2, 0 = off)")
+        p.add_argument("--profile", nargs="?", const="deterministic",
+                       choices=("deterministic", "sample"),
+                       help="save pstats + collapsed stacks + input size next to the output")
+        if name not in ("extract", "pipeline"):
+            p.add_argument("--reader", choices=("fast", "openpyxl"),
+                           help="xlsx reader: fast streaming or the openpyxl object model "
+                                "(default fast; openpyxl for the trader importers and sr-filter/sr-removed, "
+                                "which keep formula cells)")
+        p.add_argument("--journal", metavar="FILE",
+                       help="checkpoint file: rerunning with it skips finished inputs, "
+                            "failing inputs are quarantined instead of stopping the run")
+        p.add_argument("--retry-failed", action="store_true",
+                       help="with --journal: process quarantined inputs again")
+        if name in ("extract", "pipeline", "reconcile"):
+            p.add_argument("-o", "--output", help="output .xlsx (default: next to the first input)")
+        if name == "extract":
+            p.add_argument("--combined", action="store_true",
+                           help="each PDF holds many invoices: split by invoice, pages in parallel")
+            p.add_argument("--workers", type=int, help="processes for --combined (default: CPU count)")
+        if name in ("extract", "sr-process"):
+            p.add_argument("--shard-rows", type=int, metavar="N",
+                           help="rows per output sheet, header included (default: Excel's "
+                                "1,048,576); more rows are split into shards plus a manifest")
+            p.add_argument("--shard-sheets", action="store_true",
+                           help="put the shards in sheets of one workbook instead of "
+                                "separate workbooks written in parallel")
+        if name.startswith("trader") or name in ("sr-filter", "sr-removed"):
+            p.add_argument("--sheets", nargs="+", metavar="SHEET",
+                           help="process these sheets (or 'all') into one output instead of "
+                                "only the active sheet, one sheet per worker process")
+            p.add_argument("--workers", type=int, help="processes for --sheets (default: CPU count)")
+        if name.startswith("trader"):
+            p.add_argument("--change-log", nargs="?", const="alongside", choices=("alongside", "only"),
+                           help="write the changed cells (row, column, old, new, keyword) to "
+                                "<input>_changes.csv; 'only' skips the full copy")
+        if name == "pipeline":
+            p.add_argument("--audit-dir", help="also write the intermediate extraction sheet here")
+            p.add_argument("--vendor", help="vendor name for every bill (default: from the invoice)")
+        if name == "qbxml":
+            p.add_argument("--batch-size", type=int, help="BillAdds per request (default 50)")
+            p.add_argument("--coded", action="store_true",
+                           help="input is already coded (e.g. *_updatedfortrader.xlsx)")
+            p.add_argument("--mock", action="store_true",
+                           help="send the batches to the local QuickBooks stand-in and time them")
+        if name == "sr-process":
+            p.add_argument("--window", type=_months, dest="window_months",
+                           help="removal window in months (default 18)")
+            p.add_argument("--workers", type=int, help="process pool size for the class scan")
+            p.add_argument("--simulate", action="store_true",
+                           help="what-if comparison of several windows instead of the export")
+            p.add_argument("--windows", type=_windows, help="e.g. 12,18,24 (with --simulate)")
+    return ap
+
+
+def _profiled(args, options):
+    from profiling import ProfileSession, profile_base
+
+    with ProfileSession(args.profile) as prof:
+        result = run_tool(args.tool, args.inputs, getattr(args, "output", None), **options)
+    target = result["outputs"][0] if result["outputs"] else args.inputs[0]
+    result["outputs"] += prof.save(profile_base(target), args.inputs, args.tool)
+    return result
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    options = {k: v for k, v in vars(args).items()
+               if k not in ("tool", "inputs", "timing", "json", "output", "metrics", "prom", "profile",
+                            "worker")
+               and v is not None}
+    t_start = time.perf_counter()
+    reply = None
+    if args.worker and not args.profile:
+        from qbd_worker import submit
+
+        reply = submit(args.tool, args.inputs, getattr(args, "output", None), options,
+                       args.metrics, args.prom)
+        if reply is None:
+            print("No resident worker answered, running here.", file=sys.stderr)
+    if reply is not None:
+        if "error" in reply:
+            print(f"Error: {reply['error']}", file=sys.stderr)
+            return 1
+        result, stages = reply["result"], reply["stages"]
+        t_end = time.perf_counter()
+    else:
+        metrics.start_run(args.tool)
+        try:
+            if args.profile:
+                result = _profiled(args, options)
+            else:
+                result = run_tool(args.tool, args.inputs, getattr(args, "output", None), **options)
+        except Exception as e:
+            metrics.finish_run(args.metrics, args.prom, ok=False)
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        t_end = time.perf_counter()
+        stages = metrics.finish_run(args.metrics, args.prom)
+
+    if args.json:
+        print(json.dumps(result, default=str, indent=2))
+    else:
+        for out in result["outputs"]:
+            print(f"Saved: {out}")
+        for key, value in result["stats"].items():
+            print(f"{key}: {value}")
+    if args.timing:
+        print(f"start-up: {t_start - _T0:.3f}s  run: {t_end - t_start:.3f}s  "
+              f"total: {t_end - _T0:.3f}s", file=sys.stderr)
+        for s in stages:
+            rate = f"{s['per_second']:,.0f} {s['unit']}/s" if s["per_second"] else "-"
+            print(f"  {s['stage']:<16} {s['seconds']:8.3f}s  {s['count']:>9,} {s['unit']:<6} "
+                  f"{rate:>16}  peak so far {s['peak_rss_so_far_mb']} MB", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Registry of the QBD automation tools and a headless way to run them.
+
+The tool scripts keep their historical file names (with spaces), so they
+are loaded by path here instead of imported by name. Loading a tool does
+not create any Tk window, and heavy libraries (pdfplumber, openpyxl,
+dateutil.parser) are only imported when a job actually runs.
+"""
+import importlib.util
+import os
+import sys
+from contextlib import nullcontext
+
+from batch_io import READ_AHEAD, BatchIO
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# tool name -> (script file, one-line description)
+TOOLS = {
+    "extract": ("CL invoice bulk processor per line.py",
+                "Extract Chain Logic invoice PDFs into one Excel sheet"),
+    "pipeline": ("invoice_pipeline.py",
+                 "Invoice PDFs straight to a coded bill sheet for the trader import"),
+    "trader": ("importer to trader with vendor update - Coastmax ver4.py",
+               "Code bill lines for the trader import (accounting-safe map)"),
+    "trader-coastmax": ("importer to trader with vendor update - Coastmax.py",
+                        "Code bill lines and set every vendor to Coastmax"),
+    "trader-plain": ("importer to trader without vendor update final.py",
+                     "Code bill lines, Perfect Gateway vendor cleanup only"),
+    "trader-flex": ("excel_updater_gui_flex_userpath_99000_class.py",
+                    "Code bill lines (original map, 99000 fallback)"),
+    "qbxml": ("qbxml.py",
+              "Bill sheet to batched qbXML BillAdd requests (optionally sent to a mock QB)"),
+    "reconcile": ("reconcile.py",
+                  "Check extracted invoices against a QuickBooks bill export (matched/missing/mismatch)"),
+    "sr-filter": ("service revenue filter_importer.py",
+                  "Keep one row per Expense Class per 18 months"),
+    "sr-removed": ("service revenue filter with updated amount and account number _importer.py",
+                   "Export removed rows with service revenue account/amount"),
+    "sr-process": ("service revenue processor final_importer.py",
+                   "Export one removed row per Expense Class (service revenue)"),
+}
+
+
+def load_tool(name):
+    """Import a tool script as a module (cached)."""
+    if name not in TOOLS:
+        raise Exception(f"Unknown tool: '{name}'")
+    mod_name = "qbd_tool_" + name.replace("-", "_")
+    if mod_name in sys.modules:
+        return sys.modules[mod_name]
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    path = os.path.join(HERE, TOOLS[name][0])
+    spec = importlib.util.spec_from_file_location(mod_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[mod_name]
+        raise
+    return module
+
+
+def warm_up():
+    """Pay the import and rule-compile cost now, for long-lived processes.
+
+    Imports pdfplumber/openpyxl/dateutil, loads every tool (keyword maps,
+    sorted keywords) and compiles the memo prefix trie. Used by the job
+    service pool and the resident worker (qbd_worker.py).
+    """
+    import openpyxl  # noqa: F401
+    import pdfplumber  # noqa: F401
+    import dateutil.parser  # noqa: F401
+    import dateutil.relativedelta  # noqa: F401
+
+    from memo_prefixes import default_trie
+
+    for name in TOOLS:
+        load_tool(name)
+    default_trie()
+
+
+def run_tool(name, inputs, output=None, **options):
+    """Run one tool headlessly. Returns {"outputs": [...], "stats": {...}}.
+
+    `inputs` is a list of file paths. Options: `window_months`, `workers`,
+    `windows` (sr-process), `simulate` (sr-process what-if mode),
+    `combined` (extract: split combined PDFs by invoice, pages on `workers`),
+    `audit_dir`, `vendor` (pipeline), `batch_size`, `coded`, `mock` (qbxml),
+    `read_ahead` (files prefetched in batch runs, 0 turns it off),
+    `reader` (sheet reader backend for xlsx inputs, "fast" or "openpyxl";
+    the trader importers default to openpyxl, which keeps formatting, and
+    so do sr-filter and sr-removed, which keep formula cells),
+    `sheets` (trader importers, sr-filter, sr-removed: "all" or a list of
+    sheet names to process in one output instead of the active sheet,
+    one sheet per `workers` process; see multi_sheet),
+    `change_log` (trader importers: "alongside" also writes the changed
+    cells to <input>_changes.csv, "only" writes that instead of the copy),
+    `shard_rows`, `shard_sheets` (extract, sr-process: rows per output
+    sheet before it is split into workbooks, or sheets; see sharded_output),
+    `journal` (checkpoint file: a rerun skips inputs already done and
+    failing inputs are listed in stats["quarantined"] instead of stopping
+    the run), `retry_failed` (with `journal`: retry quarantined inputs).
+    """
+    tool = load_tool(name)
+    outputs = []
+    stats = {}
+    depth = options.get("read_ahead", READ_AHEAD)
+    if options.get("combined"):
+        depth = 0  # combined PDFs are opened by path from the page workers, never from a prefetch
+    batch = BatchIO(inputs, depth) if depth and len(inputs) > 1 else nullcontext()
+    with batch:
+        if options.get("journal") and name not in ("extract", "pipeline"):
+            _dispatch_journaled(name, tool, inputs, output, options, outputs, stats)
+        else:
+            _dispatch(name, tool, inputs, output, options, outputs, stats)
+    return {"outputs": outputs, "stats": stats}
+
+
+def _dispatch_journaled(name, tool, inputs, output, options, outputs, stats):
+    """Per-file tools with a checkpoint: each input is its own entry."""
+    from checkpoint import journaled
+
+    def one(path):
+        file_outputs, file_stats = [], {}
+        _dispatch(name, tool, [path], output, options, file_outputs, file_stats)
+        return {"outputs": file_outputs, "stats": file_stats}
+
+    quarantine = []
+    for _, result in journaled(inputs, one, options["journal"], quarantine,
+                               retry_failed=options.get("retry_failed", False)):
+        outputs += result["outputs"]
+        for key, value in result["stats"].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats[key] = stats.get(key, 0) + value
+            else:
+                stats[key] = value
+    stats["quarantined"] = quarantine
+
+
+def _shard_options(options):
+    return {"shard_rows": options.get("shard_rows"),
+            "shard_mode": "sheets" if options.get("shard_sheets") else "workbooks"}
+
+
+def _dispatch(name, tool, inputs, output, options, outputs, stats):
+
+    if name == "extract":
+        journal = options.get("journal")
+        quarantine = []
+        if options.get("combined"):
+            data_list = tool.extract_combined(inputs, workers=options.get("workers"),
+                                              journal=journal, quarantine=quarantine,
+                                              retry_failed=options.get("retry_failed", False))
+        else:
+            data_list = tool.extract_all(inputs, journal=journal, quarantine=quarantine,
+                                         retry_failed=options.get("retry_failed", False))
+        if output is None:
+            output = os.path.join(os.path.dirname(os.path.abspath(inputs[0])),
+                                  "invoices_extracted.xlsx")
+        outputs.append(tool.write_all_to_excel(data_list, output, **_shard_options(options)))
+        stats["invoices"] = len(data_list)
+        from invoice_templates import unknown_sources
+
+        stats["unknown_vendor"] = unknown_sources(data_list)
+        if journal:
+            stats["quarantined"] = quarantine
+
+    elif name == "pipeline":
+        if output is None:
+            output = os.path.join(os.path.dirname(os.path.abspath(inputs[0])),
+                                  "invoices_bills_for_trader.xlsx")
+        out, pipeline_stats = tool.run_pipeline(inputs, output, audit_dir=options.get("audit_dir"),
+                                                vendor=options.get("vendor"),
+                                                journal=options.get("journal"),
+                                                retry_failed=options.get("retry_failed", False))
+        stats.update(pipeline_stats)
+        outputs.append(out)
+
+    elif name.startswith("trader"):
+        stats["rows_processed"] = stats["matches_found"] = 0
+        for p in inputs:
+            new_path, rows, matches = tool.update_excel(p, backend=options.get("reader", "openpyxl"),
+                                                        sheets=options.get("sheets"),
+                                                        workers=options.get("workers"),
+                                                        change_log=options.get("change_log"))
+            outputs.append(new_path)
+            if options.get("change_log") == "alongside":
+                from change_log import log_path
+
+                outputs.append(log_path(p))
+            stats["rows_processed"] += rows
+            stats["matches_found"] += matches
+
+    elif name == "qbxml":
+        stats["bills"] = stats["batches"] = 0
+        for p in inputs:
+            out_dir, file_stats = tool.export_bills(
+                p, batch_size=options.get("batch_size") or tool.BATCH_SIZE,
+                classify=not options.get("coded"), mock=options.get("mock", False),
+                backend=options.get("reader"))
+            outputs.append(out_dir)
+            stats["bills"] += file_stats["bills"]
+            stats["batches"] += file_stats["batches"]
+            stats[os.path.basename(p)] = file_stats
+
+    elif name == "reconcile":
+        if len(inputs) != 2:
+            raise Exception("reconcile needs two inputs: the extraction sheet and the bill export")
+        out, reconcile_stats = tool.run_reconcile(inputs[0], inputs[1], output,
+                                                  backend=options.get("reader"))
+        outputs.append(out)
+        stats.update(reconcile_stats)
+
+    elif name in ("sr-filter", "sr-removed"):
+        for p in inputs:
+            outputs.append(tool.filter_excel(p, backend=options.get("reader"),
+                                             sheets=options.get("sheets"),
+                                             workers=options.get("workers")))
+
+    elif name == "sr-process":
+        if options.get("simulate"):
+            windows = options.get("windows") or tool.SIMULATION_WINDOWS
+            for p in inputs:
+                out, summary = tool.simulate_windows(p, windows, backend=options.get("reader"))
+                outputs.append(out)
+                stats[os.path.basename(p)] = summary
+        else:
+            stats["rows"] = stats["removed_classes"] = 0
+            window = options.get("window_months")
+            if window is None:
+                window = tool.WINDOW_MONTHS
+            for p in inputs:
+                out, total, removed = tool.filter_and_return_removed_only(
+                    p, window_months=window,
+                    workers=options.get("workers"), backend=options.get("reader"),
+                    **_shard_options(options))
+                outputs.append(out)
+                stats["rows"] += total
+                stats["removed_classes"] += removed
+
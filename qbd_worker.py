@@ -0,0 +1,202 @@
+"""Resident worker: keeps the tools loaded so repeat runs start at once.
+
+    python qbd_worker.py                 # start it (leave the window open)
+    python qbd_cli.py trader "lastest bill.xlsx" --worker
+    python qbd_worker.py --status
+    python qbd_worker.py --stop
+
+A fresh run pays for the interpreter, the pdfplumber/openpyxl imports and
+rebuilding the keyword maps before any work starts. The worker pays that
+once (qbd_tools.warm_up) and then runs jobs sent by `qbd_cli --worker`
+with run_tool, one at a time, in the client's working directory, so
+relative paths resolve as they would locally.
+
+It listens on localhost only (multiprocessing.connection). Clients must
+prove they hold the key in WORKER_KEY_FILE (created by the worker, in
+the user's home folder), so other users on the machine cannot use it.
+When a tool script or memo_prefixes.json changes, the worker hands the
+job back, to be run locally, and restarts itself with the new code. A
+client that finds no worker also runs the job locally.
+"""
+import argparse
+import os
+import secrets
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 8766
+WORKER_KEY_FILE = os.path.join(os.path.expanduser("~"), ".qbd_worker_key")
+
+
+def _read_key():
+    try:
+        with open(WORKER_KEY_FILE) as f:
+            return f.read().strip().encode()
+    except OSError:
+        return None
+
+
+def _write_key(key):
+    fd = os.open(WORKER_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(key.decode())
+
+
+def _code_stamp():
+    """Modification times of the code and rule files a running worker holds."""
+    names = [n for n in os.listdir(HERE) if n.endswith(".py")] + ["memo_prefixes.json"]
+    stamp = {}
+    for name in names:
+        try:
+            stamp[name] = os.stat(os.path.join(HERE, name)).st_mtime_ns
+        except OSError:
+            pass
+    return stamp
+
+
+def _no_delay(conn):
+    """Send small messages at once: with Nagle's algorithm the request that
+    follows the handshake waits for a delayed ACK (~40 ms a job)."""
+    import socket
+
+    s = socket.socket(fileno=conn.fileno())
+    try:
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    finally:
+        s.detach()
+
+
+# ---- Worker side ----
+def _run(request):
+    import metrics
+    from qbd_tools import run_tool
+
+    os.chdir(request["cwd"])
+    metrics.start_run(request["tool"])
+    t0 = time.perf_counter()
+    try:
+        result = run_tool(request["tool"], request["inputs"], request["output"], **request["options"])
+    except Exception as e:
+        metrics.finish_run(request["metrics"], request["prom"], ok=False)
+        return {"error": str(e)}
+    stages = metrics.finish_run(request["metrics"], request["prom"])
+    return {"result": result, "stages": stages, "seconds": time.perf_counter() - t0}
+
+
+def serve(port=DEFAULT_PORT):
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Listener
+
+    from qbd_tools import warm_up
+
+    t0 = time.perf_counter()
+    key = secrets.token_hex(32).encode()
+    # bind before writing the key, so a second start cannot lock out a running worker
+    listener = Listener(("127.0.0.1", port), authkey=key)
+    _write_key(key)
+    warm_up()
+    stamp = _code_stamp()
+    print(f"QBD worker on 127.0.0.1:{port} (pid {os.getpid()}, warm in "
+          f"{time.perf_counter() - t0:.1f}s). Ctrl+C or --stop to quit.")
+    started = time.strftime("%Y-%m-%d %H:%M:%S")
+    jobs = 0
+    restart = False
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError):  # e.g. a client with the wrong key
+                continue
+            with conn:
+                _no_delay(conn)
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    continue
+                command = request.get("command", "run")
+                if command == "stop":
+                    conn.send({"stopped": True})
+                    break
+                if command == "status":
+                    conn.send({"pid": os.getpid(), "started": started, "jobs": jobs})
+                    continue
+                if _code_stamp() != stamp:
+                    conn.send({"restart": True})
+                    restart = True
+                    break
+                reply = _run(request)
+                jobs += 1
+                print(f"{time.strftime('%H:%M:%S')} {request['tool']} "
+                      f"{len(request['inputs'])} input(s): "
+                      f"{reply.get('error') or format(reply['seconds'], '.2f') + 's'}")
+                try:
+                    conn.send(reply)
+                except OSError:
+                    pass  # client went away; the outputs are on disk anyway
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+    if restart:
+        print("Code changed, restarting.")
+        os.execv(sys.executable, [sys.executable, os.path.abspath(__file__)] + sys.argv[1:])
+
+
+# ---- Client side ----
+def _request(message, port=DEFAULT_PORT):
+    """Send one message and return the reply, or None if no worker answers."""
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+
+    key = _read_key()
+    if key is None:
+        return None
+    try:
+        conn = Client(("127.0.0.1", port), authkey=key)
+    except (OSError, EOFError, AuthenticationError):  # not running, or another key
+        return None
+    with conn:
+        _no_delay(conn)
+        conn.send(message)
+        try:
+            return conn.recv()
+        except (EOFError, OSError):
+            return None
+
+
+def submit(tool, inputs, output=None, options=None, metrics_path=None, prom_path=None,
+           port=DEFAULT_PORT):
+    """Run a job on the resident worker.
+
+    Returns {"result": run_tool's result, "stages": [...]} or {"error": ...},
+    or None when no worker is running (or it is restarting): run locally.
+    """
+    reply = _request({"tool": tool, "inputs": list(inputs), "output": output,
+                      "options": options or {}, "cwd": os.getcwd(),
+                      "metrics": metrics_path, "prom": prom_path}, port)
+    if reply is None or reply.get("restart"):
+        return None
+    return reply
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Resident worker for the QBD tools (see qbd_cli --worker)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--status", action="store_true", help="show whether a worker is running")
+    ap.add_argument("--stop", action="store_true", help="stop the running worker")
+    args = ap.parse_args(argv)
+    if args.status or args.stop:
+        reply = _request({"command": "stop" if args.stop else "status"}, args.port)
+        if reply is None:
+            print("No worker running.")
+            return 1
+        print("Stopped." if args.stop else
+              f"Worker pid {reply['pid']}, up since {reply['started']}, {reply['jobs']} job(s) run.")
+        return 0
+    serve(args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
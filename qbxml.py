@@ -0,0 +1,302 @@
+"""Coded bill rows -> batched qbXML BillAdd requests, plus a local QB stand-in.
+
+Rows are in the bill_layout columns (what the trader importers and the
+invoice pipeline produce); Ref No, Date, Due Date, Amount and Class are
+found by header name, so an export with those columns moved still reads
+right. Lines sharing a Ref No and Vendor become one
+BillAdd with one ExpenseLineAdd per line, and the BillAdds are packed
+`batch_size` per QBXML message, so QuickBooks sees one round trip per
+batch instead of one per bill.
+
+MockRequestProcessor has the same calls as QBXMLRP2.RequestProcessor
+(OpenConnection2 / BeginSession / ProcessRequest / EndSession /
+CloseConnection). It checks each request the way QuickBooks would reject
+it and times every batch, so batch sizes can be tuned without QuickBooks.
+"""
+import os
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from bill_layout import (ACCOUNT, AMOUNT, CLASS, DESCRIPTION, DUE_DATE, MEMO,
+                         REF_NUMBER, REFERENCE, TXN_DATE, VENDOR, header_columns)
+
+# Read by header name; the other columns are the fixed C/E/G/H/J the
+# trader importers use.
+NAMED_COLUMNS = (REF_NUMBER, TXN_DATE, DUE_DATE, AMOUNT, CLASS)
+
+QBXML_VERSION = "13.0"
+BATCH_SIZE = 50
+REF_NUMBER_MAX = 20  # QuickBooks limit for RefNumber
+
+
+# ---- Rows -> bills ----
+def to_iso_date(value):
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    from dateutil.parser import parse as du_parse
+
+    try:
+        return du_parse(str(value)).date().isoformat()
+    except (ValueError, OverflowError):
+        return None
+
+
+def to_amount(value):
+    if value in (None, ""):
+        return None
+    try:
+        return round(float(str(value).replace(",", "")), 2)
+    except ValueError:
+        return None
+
+
+def group_bills(rows):
+    """One bill dict per (Ref No, Vendor), lines in file order."""
+    bills = {}
+    for row in rows:
+        if not row[VENDOR] and not row[DESCRIPTION]:
+            continue
+        key = (row[REF_NUMBER], row[VENDOR])
+        bill = bills.get(key)
+        if bill is None:
+            bill = bills[key] = {
+                "vendor": row[VENDOR],
+                "ref_number": row[REF_NUMBER],
+                "txn_date": to_iso_date(row[TXN_DATE]),
+                "due_date": to_iso_date(row[DUE_DATE]),
+                "memo": row[REFERENCE] or row[MEMO],
+                "lines": [],
+            }
+        bill["lines"].append({
+            "account": row[ACCOUNT],
+            "amount": to_amount(row[AMOUNT]),
+            "memo": row[DESCRIPTION],
+            "class": row[CLASS],
+        })
+    return list(bills.values())
+
+
+def read_bill_rows(file_path, classify=True, backend=None):
+    """Rows of a bill sheet in the bill_layout columns; with `classify` the
+    ver4 trader rules are applied in memory (vendor cleanup, cost code,
+    reference), as update_excel would."""
+    from qbd_tools import load_tool
+    from sheet_reader import open_sheet
+
+    trader = load_tool("trader") if classify else None
+    with open_sheet(file_path, backend, data_only=True) as reader:
+        found = header_columns(reader.header(), NAMED_COLUMNS,
+                               where=os.path.basename(file_path))
+        width = max(reader.max_column or 0, REFERENCE + 1)
+        for _, _, raw in reader.iter_rows(min_row=2, passthrough=True):
+            raw = raw + [None] * (width - len(raw))
+            row = list(raw)
+            for pos, col in found.items():
+                row[pos] = raw[col]
+            if trader is not None and (row[VENDOR] or row[DESCRIPTION]):
+                if row[VENDOR]:
+                    row[VENDOR] = trader.clean_vendor(row[VENDOR])
+                code = trader.UNCLASSIFIED_CODE
+                if row[DESCRIPTION]:
+                    code, _ = trader.code_for_description(row[DESCRIPTION])
+                row[ACCOUNT] = code
+                if row[MEMO]:
+                    row[REFERENCE] = trader.extract_reference(row[MEMO]) or row[REFERENCE]
+            yield row
+
+
+# ---- Bills -> qbXML ----
+def _el(tag, value):
+    return f"<{tag}>{escape(str(value))}</{tag}>"
+
+
+def bill_add_rq(bill, request_id):
+    parts = [f'<BillAddRq requestID="{request_id}"><BillAdd>']
+    if bill["vendor"]:
+        parts.append(f"<VendorRef>{_el('FullName', bill['vendor'])}</VendorRef>")
+    if bill["txn_date"]:
+        parts.append(_el("TxnDate", bill["txn_date"]))
+    if bill["due_date"]:
+        parts.append(_el("DueDate", bill["due_date"]))
+    if bill["ref_number"]:
+        parts.append(_el("RefNumber", str(bill["ref_number"])[:REF_NUMBER_MAX]))
+    if bill["memo"]:
+        parts.append(_el("Memo", bill["memo"]))
+    for line in bill["lines"]:
+        parts.append("<ExpenseLineAdd>")
+        if line["account"]:
+            parts.append(f"<AccountRef>{_el('FullName', line['account'])}</AccountRef>")
+        if line["amount"] is not None:
+            parts.append(_el("Amount", f"{line['amount']:.2f}"))
+        if line["memo"]:
+            parts.append(_el("Memo", line["memo"]))
+        if line["class"]:
+            parts.append(f"<ClassRef>{_el('FullName', line['class'])}</ClassRef>")
+        parts.append("</ExpenseLineAdd>")
+    parts.append("</BillAdd></BillAddRq>")
+    return "".join(parts)
+
+
+def batches(bills, batch_size=BATCH_SIZE, on_error="continueOnError"):
+    """Yield QBXML request documents with up to `batch_size` BillAdds each."""
+    if batch_size < 1:
+        raise Exception("Batch size must be at least 1")
+    for start in range(0, len(bills), batch_size):
+        body = "".join(bill_add_rq(b, start + i + 1)
+                       for i, b in enumerate(bills[start:start + batch_size]))
+        yield (f'<?xml version="1.0" encoding="utf-8"?>'
+               f'<?qbxml version="{QBXML_VERSION}"?>'
+               f'<QBXML><QBXMLMsgsRq onError="{on_error}">{body}</QBXMLMsgsRq></QBXML>')
+
+
+def write_batches(docs, folder):
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for n, doc in enumerate(docs, start=1):
+        path = os.path.join(folder, f"billadd_{n:04d}.xml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(doc)
+        paths.append(path)
+    return paths
+
+
+# ---- Local QuickBooks stand-in ----
+class MockRequestProcessor:
+    """Validates BillAdd batches like QuickBooks and records per-batch timing.
+
+    `known_accounts` / `known_vendors` (optional sets) make unknown names
+    fail with status 3140, as they would in a real company file.
+    """
+
+    def __init__(self, known_accounts=None, known_vendors=None):
+        self.known_accounts = known_accounts
+        self.known_vendors = known_vendors
+        self.timings = []   # (bills in batch, seconds)
+
+    def OpenConnection2(self, app_id, app_name, conn_type=1):
+        pass
+
+    def BeginSession(self, company_file, mode=2):
+        return uuid.uuid4().hex
+
+    def EndSession(self, ticket):
+        pass
+
+    def CloseConnection(self):
+        pass
+
+    def _check(self, add):
+        vendor = add.findtext("VendorRef/FullName")
+        if not vendor:
+            return 3000, "VendorRef is missing"
+        if self.known_vendors is not None and vendor not in self.known_vendors:
+            return 3140, f'There is an invalid reference to QuickBooks Vendor "{vendor}"'
+        for tag in ("TxnDate", "DueDate"):
+            text = add.findtext(tag)
+            if text is not None:
+                try:
+                    date.fromisoformat(text)
+                except ValueError:
+                    return 3020, f'"{text}" in field "{tag}" is not a valid date'
+        ref = add.findtext("RefNumber")
+        if ref is not None and len(ref) > REF_NUMBER_MAX:
+            return 3070, f'"{ref}" in field "RefNumber" is too long'
+        lines = add.findall("ExpenseLineAdd") + add.findall("ItemLineAdd")
+        if not lines:
+            return 3000, "A bill needs at least one line"
+        for line in lines:
+            account = line.findtext("AccountRef/FullName")
+            if not account:
+                return 3000, "AccountRef is missing"
+            if self.known_accounts is not None and account not in self.known_accounts:
+                return 3140, f'There is an invalid reference to QuickBooks Account "{account}"'
+            amount = line.findtext("Amount")
+            if amount is not None:
+                try:
+                    float(amount)
+                except ValueError:
+                    return 3020, f'"{amount}" in field "Amount" is not a valid amount'
+        return 0, "Status OK"
+
+    def ProcessRequest(self, ticket, request):
+        t0 = time.perf_counter()
+        root = ET.fromstring(request)
+        msgs = root.find("QBXMLMsgsRq")
+        if root.tag != "QBXML" or msgs is None:
+            raise Exception("Not a QBXML request")
+        stop = msgs.get("onError") == "stopOnError"
+        out = []
+        failed = False
+        for rq in msgs:
+            rid = rq.get("requestID", "")
+            if failed and stop:
+                break
+            if rq.tag != "BillAddRq":
+                out.append(f'<{rq.tag[:-2]}Rs requestID="{rid}" statusCode="1" '
+                           f'statusSeverity="Info" statusMessage="Ignored by mock"/>')
+                continue
+            code, message = self._check(rq.find("BillAdd"))
+            if code == 0:
+                txn = uuid.uuid4().hex[:12].upper()
+                out.append(f'<BillAddRs requestID="{rid}" statusCode="0" statusSeverity="Info" '
+                           f'statusMessage="Status OK"><BillRet><TxnID>{txn}</TxnID></BillRet></BillAddRs>')
+            else:
+                failed = True
+                out.append(f'<BillAddRs requestID="{rid}" statusCode="{code}" statusSeverity="Error" '
+                           f'statusMessage="{escape(message)}"/>')
+        self.timings.append((len(msgs), time.perf_counter() - t0))
+        return ('<?xml version="1.0" ?><QBXML><QBXMLMsgsRs>' + "".join(out)
+                + "</QBXMLMsgsRs></QBXML>")
+
+
+def send_batches(processor, docs, company_file=""):
+    """Send every batch in one session. Returns (ok, errors, seconds)."""
+    processor.OpenConnection2("", "QBD automation", 1)
+    ticket = processor.BeginSession(company_file, 2)
+    ok = 0
+    errors = []
+    t0 = time.perf_counter()
+    try:
+        for doc in docs:
+            response = ET.fromstring(processor.ProcessRequest(ticket, doc))
+            for rs in response.find("QBXMLMsgsRs"):
+                if rs.get("statusCode") == "0":
+                    ok += 1
+                else:
+                    errors.append((rs.get("requestID"), rs.get("statusCode"), rs.get("statusMessage")))
+    finally:
+        processor.EndSession(ticket)
+        processor.CloseConnection()
+    return ok, errors, time.perf_counter() - t0
+
+
+# ---- Tool entry ----
+def export_bills(file_path, batch_size=BATCH_SIZE, classify=True, mock=False, backend=None):
+    """Write `<name>_qbxml/billadd_NNNN.xml` for a bill sheet.
+
+    Returns (folder, stats). With `mock` the batches are also sent through
+    MockRequestProcessor and its results and timings are added to stats.
+    """
+    bills = group_bills(read_bill_rows(file_path, classify, backend))
+    docs = list(batches(bills, batch_size))
+    folder, fname = os.path.split(file_path)
+    name, _ = os.path.splitext(fname)
+    out_dir = os.path.join(folder, f"{name}_qbxml")
+    write_batches(docs, out_dir)
+    stats = {"bills": len(bills), "lines": sum(len(b["lines"]) for b in bills),
+             "batches": len(docs)}
+    if mock:
+        processor = MockRequestProcessor()
+        ok, errors, seconds = send_batches(processor, docs)
+        stats.update({"accepted": ok, "rejected": len(errors), "seconds": round(seconds, 3),
+                      "bills_per_second": round(len(bills) / seconds, 1) if seconds else None})
+        if errors:
+            stats["first_errors"] = errors[:5]
+    return out_dir, stats
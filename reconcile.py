@@ -0,0 +1,170 @@
+"""Reconcile extracted invoices against a QuickBooks bill export.
+
+Replaces the VLOOKUP check "is every Chain Logic invoice in QuickBooks,
+and for the same amount?". The invoice side (the extraction sheet, one
+invoice may span several charge-line rows) is loaded into two hash
+indexes: invoice number, and shipment (what the "GC Aluminum, Inc:" memo
+reference in column J holds). The bill export is then streamed once; each
+line is looked up by Ref No, then by Reference (J, or taken from the
+memo in H when J is empty), and its Amount is added to that invoice. Ref
+No and Amount are found by header name (bill_layout.header_columns).
+
+The report has one sheet per outcome:
+
+    Matched           invoice found, bill total equals TOTAL USD
+    Amount mismatch   invoice found, totals differ by more than a cent
+    Missing           invoice with no bill line at all
+    Unmatched bills   bill lines that belong to no extracted invoice
+"""
+import os
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+import metrics
+from bill_layout import AMOUNT, MEMO, REF_NUMBER, REFERENCE, VENDOR, header_columns
+
+TOLERANCE = Decimal("0.01")
+INVOICE_COLUMNS = ("SOURCE FILE", "INVOICE NUMBER", "SHIPMENT", "TOTAL USD")
+
+
+def to_decimal(value):
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value).replace(",", "").replace("$", "").strip())
+    except InvalidOperation:
+        return None
+
+
+def _key(value):
+    return str(value).strip().upper() if value not in (None, "") else None
+
+
+# ---- Build side: extracted invoices ----
+def load_invoices(invoice_path, backend=None):
+    """(invoices by number, number by shipment) from an extraction sheet."""
+    from sheet_reader import open_sheet
+
+    with open_sheet(invoice_path, backend, data_only=True) as reader:
+        header = [str(h).strip().upper() if h is not None else "" for h in reader.header()]
+        missing = [c for c in ("INVOICE NUMBER", "TOTAL USD") if c not in header]
+        if missing:
+            raise Exception(f"{os.path.basename(invoice_path)} is not an extraction sheet "
+                            f"(no {', '.join(missing)} column)")
+        cols = [header.index(c) if c in header else None for c in INVOICE_COLUMNS]
+        wanted = [c for c in cols if c is not None]
+        invoices = OrderedDict()
+        by_shipment = {}
+        for _, values, _ in reader.iter_rows(columns=wanted, min_row=2):
+            value = dict(zip(wanted, values))
+            source_file, number, shipment, total = (value.get(c) if c is not None else None
+                                                    for c in cols)
+            number = _key(number)
+            if number is None or number in invoices:
+                continue  # further charge lines of the same invoice
+            invoices[number] = {
+                "source": source_file,
+                "shipment": shipment,
+                "total": to_decimal(total),
+                "billed": Decimal(0),
+                "lines": 0,
+                "vendor": None,
+            }
+            if _key(shipment):
+                by_shipment.setdefault(_key(shipment), number)
+    return invoices, by_shipment
+
+
+# ---- Probe side: bill export ----
+def bill_lines(bill_path, backend=None):
+    """Yield (row number, ref no, reference, vendor, amount) per bill line."""
+    from qbd_tools import load_tool
+    from sheet_reader import open_sheet
+
+    extract_reference = load_tool("trader").extract_reference
+    with open_sheet(bill_path, backend, data_only=True) as reader:
+        found = header_columns(reader.header(), (REF_NUMBER, AMOUNT),
+                               where=os.path.basename(bill_path))
+        cols = [found[REF_NUMBER], VENDOR, found[AMOUNT], MEMO, REFERENCE]
+        for row, (ref_no, vendor, amount, memo, reference), _ in reader.iter_rows(columns=cols,
+                                                                                  min_row=2):
+            if ref_no is None and amount is None and memo is None and reference is None:
+                continue
+            if not reference and memo:
+                reference = extract_reference(memo)
+            yield row, ref_no, reference, vendor, amount
+
+
+def reconcile(invoice_path, bill_path, backend=None):
+    """One pass over the bill export. Returns (invoices, unmatched bill lines)."""
+    with metrics.stage("index", "invoices") as st:
+        invoices, by_shipment = load_invoices(invoice_path, backend)
+        st.count = len(invoices)
+
+    unmatched = []
+    with metrics.stage("probe", "rows") as st:
+        for row, ref_no, reference, vendor, amount in bill_lines(bill_path, backend):
+            st.count += 1
+            number = _key(ref_no)
+            if number not in invoices:
+                number = _key(reference)
+                if number not in invoices:
+                    number = by_shipment.get(number)
+            if number is None:
+                unmatched.append((row, ref_no, reference, vendor, amount))
+                continue
+            inv = invoices[number]
+            inv["billed"] += to_decimal(amount) or 0
+            inv["lines"] += 1
+            inv["vendor"] = inv["vendor"] or vendor
+    return invoices, unmatched
+
+
+def write_report(invoices, unmatched, output_path):
+    from openpyxl import Workbook
+
+    from batch_io import save_workbook
+
+    wb = Workbook(write_only=True)
+    matched = wb.create_sheet("Matched")
+    mismatch = wb.create_sheet("Amount mismatch")
+    missing = wb.create_sheet("Missing")
+    orphans = wb.create_sheet("Unmatched bills")
+    matched.append(["Invoice Number", "Shipment", "Vendor", "Total USD", "Bill Total", "Bill Lines",
+                    "Source File"])
+    mismatch.append(["Invoice Number", "Shipment", "Vendor", "Total USD", "Bill Total",
+                     "Difference", "Bill Lines", "Source File"])
+    missing.append(["Invoice Number", "Shipment", "Total USD", "Source File"])
+    orphans.append(["Bill Row", "Ref No", "Reference", "Vendor", "Amount"])
+
+    stats = {"invoices": len(invoices), "matched": 0, "mismatched": 0, "missing": 0,
+             "unmatched_bill_lines": len(unmatched)}
+    with metrics.stage("save", "rows") as st:
+        for number, inv in invoices.items():
+            if not inv["lines"]:
+                missing.append([number, inv["shipment"], inv["total"], inv["source"]])
+                stats["missing"] += 1
+                continue
+            diff = inv["billed"] - inv["total"] if inv["total"] is not None else None
+            if diff is not None and abs(diff) < TOLERANCE:
+                matched.append([number, inv["shipment"], inv["vendor"], inv["total"], inv["billed"],
+                                inv["lines"], inv["source"]])
+                stats["matched"] += 1
+            else:
+                mismatch.append([number, inv["shipment"], inv["vendor"], inv["total"],
+                                 inv["billed"], diff, inv["lines"], inv["source"]])
+                stats["mismatched"] += 1
+        for line in unmatched:
+            orphans.append(list(line))
+        st.count = len(invoices) + len(unmatched)
+        save_workbook(wb, output_path)
+    return stats
+
+
+def run_reconcile(invoice_path, bill_path, output_path=None, backend=None):
+    """Write the reconciliation workbook. Returns (output_path, stats)."""
+    if output_path is None:
+        output_path = os.path.join(os.path.dirname(os.path.abspath(invoice_path)),
+                                   "reconciliation.xlsx")
+    invoices, unmatched = reconcile(invoice_path, bill_path, backend)
+    return output_path, write_report(invoices, unmatched, output_path)
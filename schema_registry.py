@@ -0,0 +1,174 @@
+"""Header-row fingerprints and cached column mappings for QuickBooks exports.
+
+Every tool that locates columns by header name goes through
+resolve_columns(). The header row is fingerprinted. A layout seen before
+returns its cached mapping straight away. A new layout is resolved once
+(exact name, then a confirmed alias, then a substring match, then
+optionally by asking the user) and stored. The registry is a JSON file
+next to the tools (REGISTRY_FILE), shared by all of them whichever folder
+they run from, so a layout confirmed in one tool is known to the others.
+Runs that save at the same time (job service pool, multi-sheet workers)
+take turns on a lock file, merge in what is already on disk and write
+their own temp file, so neither loses the other's layouts.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_FILE = os.path.join(HERE, "schema_registry.json")
+
+SERVICE_REVENUE_COLUMNS = ("date", "expense class", "expense account", "expense amount")
+
+
+def normalize(header):
+    return str(header).strip().lower() if header is not None else ""
+
+
+def fingerprint(headers):
+    """Stable id for a header row (names and order, case/space-insensitive)."""
+    joined = "\x1f".join(normalize(h) for h in headers).rstrip("\x1f")
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()[:16]
+
+
+def load_registry(path=REGISTRY_FILE):
+    if os.path.isfile(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                reg = json.load(f)
+        except (OSError, ValueError):
+            reg = {}
+    else:
+        reg = {}
+    reg.setdefault("layouts", {})
+    reg.setdefault("aliases", {})
+    return reg
+
+
+@contextmanager
+def _locked(path):
+    """Hold an exclusive lock on `path`.lock while saving."""
+    with open(path + ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10 s; keep waiting
+                    pass
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield  # closing the file releases the lock
+
+
+def save_registry(reg, path=REGISTRY_FILE):
+    """Merge `reg` into the registry on disk (other runs may have saved since)."""
+    with _locked(path):
+        merged = load_registry(path)
+        merged["layouts"].update(reg["layouts"])
+        for key, aliases in reg["aliases"].items():
+            known = merged["aliases"].setdefault(key, [])
+            known += [a for a in aliases if a not in known]
+        fd, tmp = tempfile.mkstemp(prefix=".schema_registry.", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(merged, f, indent=2, sort_keys=True)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+
+def _match(key, norm_map, aliases):
+    if key in norm_map:
+        return norm_map[key]
+    for alias in aliases:
+        if alias in norm_map:
+            return norm_map[alias]
+    # fallback: substring match
+    for h, i in norm_map.items():
+        if key in h:
+            return i
+    return None
+
+
+def resolve_columns(headers, required, confirm=None, registry_path=REGISTRY_FILE):
+    """Map each required column name to its 0-based index in `headers`.
+
+    `confirm(column, headers)` is called for columns that cannot be matched.
+    It returns the chosen index or None. A confirmed choice is saved as an
+    alias for that column, so every tool recognises the new layout from
+    then on.
+    """
+    reg = load_registry(registry_path)
+    fp = fingerprint(headers)
+    cached = reg["layouts"].get(fp, {}).get("columns", {})
+    if all(k in cached for k in required):
+        return {k: cached[k] for k in required}
+
+    norm_map = {normalize(h): i for i, h in enumerate(headers)}
+    need = dict(cached)
+    for key in required:
+        if key in need:
+            continue
+        idx = _match(key, norm_map, reg["aliases"].get(key, []))
+        if idx is None and confirm is not None:
+            idx = confirm(key, headers)
+            if idx is not None:
+                alias = normalize(headers[idx])
+                aliases = reg["aliases"].setdefault(key, [])
+                if alias and alias not in aliases:
+                    aliases.append(alias)
+        if idx is None:
+            raise Exception(f"Required column not found: '{key}'")
+        need[key] = idx
+
+    reg["layouts"][fp] = {
+        "columns": need,
+        "headers": [h if h is None else str(h) for h in headers],
+    }
+    try:
+        save_registry(reg, registry_path)
+    except OSError:
+        pass  # read-only location: still usable, just not cached
+    return {k: need[k] for k in required}
+
+
+def tk_confirm(parent):
+    """confirm() callback that asks the user to pick the column in a dialog."""
+    def confirm(column, headers):
+        import tkinter as tk
+
+        choice = {"idx": None}
+        win = tk.Toplevel(parent)
+        win.title("Confirm column")
+        win.transient(parent)
+        win.grab_set()
+        tk.Label(win, text=f"Which column is '{column}'?").pack(padx=10, pady=(10, 5))
+        lb = tk.Listbox(win, width=50, height=min(15, max(len(headers), 1)))
+        for i, h in enumerate(headers):
+            lb.insert(tk.END, f"{i + 1}. {h if h is not None else ''}")
+        lb.pack(padx=10)
+
+        def ok():
+            sel = lb.curselection()
+            if sel:
+                choice["idx"] = sel[0]
+            win.destroy()
+
+        tk.Button(win, text="Use this column", command=ok).pack(pady=(5, 0))
+        tk.Button(win, text="Cancel", command=win.destroy).pack(pady=(0, 10))
+        parent.wait_window(win)
+        return choice["idx"]
+    return confirm
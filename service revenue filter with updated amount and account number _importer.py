@@ -1,11 +1,15 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from openpyxl import load_workbook, Workbook
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 import os
+import sys
+import metrics
+from batch_io import save_workbook
+from jobs import PROGRESS_EVERY
+from sheet_reader import open_sheet
+from multi_sheet import check_columns, run_sheets, select_sheets, write_sheets
+from schema_registry import resolve_columns, tk_confirm, SERVICE_REVENUE_COLUMNS
 
 CONFIG_FILE = "config.txt"
+READER = "openpyxl"  # keeps formula cells as formulas, like the original load_workbook
 
 def parse_date(val):
     if val is None:
@@ -20,24 +24,32 @@ def parse_date(val):
             continue
     return None
 
-def filter_excel(file_path):
-    wb = load_workbook(file_path)
-    ws = wb.active
+def filter_sheet(file_path, sheet_name=None, backend=None, confirm=None, progress=None):
+    """Header plus the removed rows of one worksheet (the active one by default)."""
+    load = metrics.stage("workbook_load", "rows").start()
+    with open_sheet(file_path, backend or READER, sheet_name) as sheet:
+        load.stop((sheet.max_row or 1) - 1)
+        return _removed_rows(sheet, confirm, progress)
+
+def _removed_rows(sheet, confirm=None, progress=None):
+    from dateutil.relativedelta import relativedelta
 
     # find headers
-    headers = [cell.value for cell in ws[1]]
-    try:
-        date_idx = headers.index("Date")
-        exp_idx = headers.index("Expense Class")
-        acct_idx = headers.index("Expense Account")
-        amt_idx = headers.index("Expense Amount")
-    except ValueError as e:
-        raise Exception(f"Missing required column: {e}")
+    headers = sheet.header()
+    idxs = resolve_columns(headers, SERVICE_REVENUE_COLUMNS, confirm=confirm)
+    date_idx = idxs["date"]
+    exp_idx = idxs["expense class"]
+    acct_idx = idxs["expense account"]
+    amt_idx = idxs["expense amount"]
 
     removed_rows = [headers]
     last_kept = {}  # expense_class -> last kept date
 
-    for row in ws.iter_rows(min_row=2, values_only=True):
+    total = (sheet.max_row or 1) - 1
+    classify = metrics.stage("classify", "rows").start()
+    for n, row in enumerate(sheet.rows(min_row=2), start=1):
+        if progress is not None and n % PROGRESS_EVERY == 0:
+            progress(n, total)
         row = list(row)
         exp = row[exp_idx]
         date_val = parse_date(row[date_idx])
@@ -68,18 +80,41 @@ def filter_excel(file_path):
                     row[amt_idx] = "500.00"
                 removed_rows.append(row)
 
+    classify.stop(total)
+    return removed_rows
+
+def filter_excel(file_path, confirm=None, progress=None, backend=None, sheets=None, workers=None):
+    """`backend`: sheet reader, "openpyxl" (READER) or "fast" (sheet_reader),
+    which writes formula cells as their cached values.
+
+    `sheets` ("all" or a list of sheet names) exports the removed rows of
+    each of those sheets to a sheet of the same name, on `workers`
+    processes (multi_sheet); by default only the active sheet is read.
+    """
+    from openpyxl import Workbook
+
+    folder, original_file = os.path.split(file_path)
+    name, ext = os.path.splitext(original_file)
+    new_filename = f"{name}_removed_only{ext}"
+    new_file_path = os.path.join(folder, new_filename)
+    if sheets is not None:
+        names = select_sheets(file_path, sheets)
+        check_columns(file_path, names, SERVICE_REVENUE_COLUMNS, confirm)
+        results = run_sheets(__file__, "filter_sheet", file_path, names, (backend,), workers, progress)
+        write_sheets(new_file_path, zip(names, results))
+        return new_file_path
+
+    removed_rows = filter_sheet(file_path, None, backend, confirm, progress)
+
     # write only the removed rows workbook
+    save = metrics.stage("save", "rows").start()
     new_wb = Workbook()
     ws1 = new_wb.active
     ws1.title = "Removed"
     for r in removed_rows:
         ws1.append(r)
-
-    folder, original_file = os.path.split(file_path)
-    name, ext = os.path.splitext(original_file)
-    new_filename = f"{name}_removed_only{ext}"
-    new_file_path = os.path.join(folder, new_filename)
-    new_wb.save(new_file_path)
+    save_workbook(new_wb, new_file_path)
+    save.stop(len(removed_rows) - 1)
     return new_file_path
 
 # ---------- GUI ----------
@@ -109,24 +144,43 @@ def run_filter():
     if not os.path.isfile(path):
         messagebox.showwarning("Warning", "Please select a valid file.")
         return
-    try:
-        out = filter_excel(path)
-        messagebox.showinfo("Success", f"✅ Removed rows saved:\n{out}")
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
-
-root = tk.Tk()
-root.title("Removed Rows Exporter")
-root.geometry("600x220")
-root.resizable(False, False)
 
-tk.Label(root, text="Excel File Path:").pack(pady=(12, 0))
-entry_file_path = tk.Entry(root, width=70)
-entry_file_path.pack(pady=5)
-entry_file_path.insert(0, load_default_path())
-tk.Button(root, text="Browse...", command=browse_file).pack()
+    def done(out):
+        messagebox.showinfo("Success", f"✅ Removed rows saved:\n{out}")
 
-tk.Button(root, text="Save this as my default path", command=save_default_path, bg="#2196F3", fg="white").pack(pady=(10, 5))
-tk.Button(root, text="Run Filter", command=run_filter, bg="#4CAF50", fg="white", height=2).pack(pady=5)
+    def failed(e):
+        messagebox.showerror("Error", str(e))
 
-root.mainloop()
+    # Runs on a worker thread; header confirmation is asked on the Tk thread
+    job = BackgroundJob(root, progress_panel, filter_excel, path,
+                        on_done=done, on_error=failed)
+    job.kwargs["confirm"] = job.in_ui(tk_confirm(root))
+    job.start()
+
+if __name__ == "__main__":
+    # Any arguments -> headless run (no Tk); see qbd_cli.py
+    if len(sys.argv) > 1:
+        from qbd_cli import main as cli_main
+        sys.exit(cli_main(["sr-removed", *sys.argv[1:]]))
+
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_worker import BackgroundJob, ProgressPanel
+
+    root = tk.Tk()
+    root.title("Removed Rows Exporter")
+    root.geometry("600x280")
+    root.resizable(False, False)
+
+    tk.Label(root, text="Excel File Path:").pack(pady=(12, 0))
+    entry_file_path = tk.Entry(root, width=70)
+    entry_file_path.pack(pady=5)
+    entry_file_path.insert(0, load_default_path())
+    tk.Button(root, text="Browse...", command=browse_file).pack()
+
+    tk.Button(root, text="Save this as my default path", command=save_default_path, bg="#2196F3", fg="white").pack(pady=(10, 5))
+    tk.Button(root, text="Run Filter", command=run_filter, bg="#4CAF50", fg="white", height=2).pack(pady=5)
+    progress_panel = ProgressPanel(root)
+    progress_panel.pack(pady=(5, 0))
+
+    root.mainloop()
@@ -1,38 +1,29 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from openpyxl import load_workbook, Workbook
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
-from dateutil.parser import parse as du_parse
+from array import array
 import os
+import sys
+import metrics
+from batch_io import save_workbook
+from jobs import PROGRESS_EVERY
 from collections import defaultdict
+from sheet_reader import open_sheet
+from schema_registry import resolve_columns, tk_confirm, SERVICE_REVENUE_COLUMNS
+from sharded_output import write_rows
+from service_revenue_rules import (NO_DATE, date_key, window_cutoff,
+                                   pick_removed_rows, default_workers)
 
 CONFIG_FILE = "config.txt"
+WINDOW_MONTHS = 18                  # rows within this many months are "duplicates"
+SIMULATION_WINDOWS = (12, 18, 24)   # default what-if windows
 
 # ----------------- Helpers -----------------
-def find_header_indexes(headers):
-    """Find required columns by name (case-insensitive, trimmed)."""
-    need = {
-        "date": None,
-        "expense class": None,
-        "expense account": None,
-        "expense amount": None
-    }
-    norm_map = { (str(h).strip().lower() if h is not None else ""): i for i,h in enumerate(headers) }
-    for key in need.keys():
-        if key in norm_map:
-            need[key] = norm_map[key]
-        else:
-            # fallback: substring match
-            found = None
-            for h,i in norm_map.items():
-                if key in h:
-                    found = i
-                    break
-            if found is None:
-                raise Exception(f"Required column not found: '{key}'")
-            need[key] = found
-    return need
+def find_header_indexes(headers, confirm=None):
+    """Find required columns by name (case-insensitive, trimmed).
+
+    Resolved layouts are cached per header fingerprint in the shared
+    schema registry, so recurring exports skip the name matching.
+    """
+    return resolve_columns(headers, SERVICE_REVENUE_COLUMNS, confirm=confirm)
 
 def parse_date(val):
     if val is None:
@@ -48,111 +39,174 @@ def parse_date(val):
         except:
             pass
     try:
+        from dateutil.parser import parse as du_parse
         return du_parse(s, dayfirst=False, yearfirst=False)
     except:
         return None
 
+def service_amount(exp_text):
+    """Service revenue billed for one removed Expense Class."""
+    return 100.00 if "air" in exp_text.lower() else 500.00
+
 # ----------------- Core logic -----------------
-def filter_and_return_removed_only(file_path):
-    wb = load_workbook(file_path, data_only=True)
-    ws = wb.active
-
-    headers = [cell.value for cell in ws[1]]
-    idxs = find_header_indexes(headers)
-    date_idx = idxs["date"]
-    exp_idx  = idxs["expense class"]
-    acct_idx = idxs["expense account"]
-    amt_idx  = idxs["expense amount"]
-
-    entries = []
-    for r in ws.iter_rows(min_row=2, values_only=True):
-        vals = list(r)
-        if len(vals) < len(headers):
-            vals += [None] * (len(headers) - len(vals))
-        exp_val = vals[exp_idx]
-        exp_key = str(exp_val).strip().lower() if exp_val not in (None,"") else None
-        date_parsed = parse_date(vals[date_idx])
-        entries.append({
-            "values": vals,
-            "exp_val": exp_val,
-            "exp_key": exp_key,
-            "date": date_parsed
-        })
-
-    kept = []
-    removed_rows = [headers]
-    removed_count = 0
-
-    # Group by Expense Class
-    groups = defaultdict(list)
-    for e in entries:
-        if e["exp_key"]:
-            groups[e["exp_key"]].append(e)
-        else:
-            # Empty Expense Class → remove
-            removed_rows.append(e["values"])
-            removed_count += 1
-
-    for g in groups.values():
-        with_date = [x for x in g if x["date"]]
-        no_date   = [x for x in g if not x["date"]]
-
-        # remove no-date rows
-        for e in no_date:
-            removed_rows.append(e["values"])
-            removed_count += 1
-
-        # sort dated rows
-        with_date.sort(key=lambda x: x["date"])
-        last_kept = None
-        for e in with_date:
-            if last_kept is None:
-                kept.append(e)
-                last_kept = e["date"]
+def filter_and_return_removed_only(file_path, window_months=WINDOW_MONTHS, workers=None,
+                                   confirm=None, progress=None, shard_rows=None,
+                                   shard_mode="workbooks", backend=None):
+    """Export one removed row per Expense Class (billed as service revenue).
+
+    `workers` > 1 spreads the per-class window scan over a process pool.
+    `confirm` is the schema registry callback for unrecognised headers.
+    `progress(done, total)` is called every PROGRESS_EVERY rows read.
+    Past `shard_rows` (default: the Excel sheet limit) the output is split
+    into shards and the returned path is their manifest (sharded_output).
+    `backend` picks the sheet reader ("fast" or "openpyxl", sheet_reader).
+    """
+    with open_sheet(file_path, backend, data_only=True) as reader:
+        headers = reader.header()
+        idxs = find_header_indexes(headers, confirm)
+        date_idx = idxs["date"]
+        exp_idx  = idxs["expense class"]
+        acct_idx = idxs["expense account"]
+        amt_idx  = idxs["expense amount"]
+
+        # Only Date and Expense Class are decoded here, into parallel
+        # arrays (row number, class id, date key); full rows are fetched
+        # later for the few rows that reach the output.
+        rows = array("l")
+        class_ids = array("l")
+        date_keys = array("q")
+        class_index = {}        # class key -> class id (first-seen order)
+        class_keys = []
+        class_texts = []
+        total = reader.max_row - 1 if reader.max_row else None
+        load = metrics.stage("workbook_load", "rows").start()
+        for row_no, (date_val, exp_val), _ in reader.iter_rows(
+                columns=[date_idx, exp_idx], min_row=2):
+            if progress is not None and len(rows) % PROGRESS_EVERY == 0:
+                progress(len(rows), total)
+            # a falsy class (0, 0.0) counts as empty, as the original dedupe did
+            exp_key = str(exp_val).strip().lower() if exp_val else None
+            if exp_key:
+                cid = class_index.get(exp_key)
+                if cid is None:
+                    cid = class_index[exp_key] = len(class_texts)
+                    class_keys.append(exp_key)
+                    class_texts.append(str(exp_val))
             else:
-                delta = relativedelta(e["date"], last_kept)
-                months = delta.years*12 + delta.months
-                if months > 18 or (months == 18 and delta.days > 0):
-                    kept.append(e)
-                    last_kept = e["date"]
-                else:
-                    removed_rows.append(e["values"])
-                    removed_count += 1
-
-    # Deduplicate removed by Expense Class (keep only one)
-    seen_classes = set()
-    final_removed = [headers]
-    for row in removed_rows[1:]:
-        exp_text = str(row[exp_idx]) if row[exp_idx] else ""
-        exp_key = exp_text.strip().lower()
-        if not exp_key or exp_key in seen_classes:
-            continue
-        seen_classes.add(exp_key)
-
-        row = list(row)
-        if len(row) < len(headers):
-            row += [None]*(len(headers)-len(row))
-        row[acct_idx] = "45000 Service Revenue"
-        if "air" in exp_text.lower():
-            row[amt_idx] = 100.00
-        else:
-            row[amt_idx] = 500.00
-        final_removed.append(row)
-
-    # Save result
-    out_wb = Workbook()
-    out_ws = out_wb.active
-    out_ws.title = "Removed"
-    for r in final_removed:
-        out_ws.append(r)
+                cid = -1        # Empty Expense Class → removed, never billed
+            d = parse_date(date_val)
+            rows.append(row_no)
+            class_ids.append(cid)
+            date_keys.append(date_key(d) if d else NO_DATE)
+        load.stop(len(rows))
+
+        # One removed row per Expense Class, in first-seen class order
+        with metrics.stage("classify", "rows") as st:
+            picked = [(rows[i], class_texts[class_ids[i]])
+                      for i in pick_removed_rows(class_ids, date_keys, class_keys,
+                                                 window_months, workers)]
+            st.count = len(rows)
+
+        # Materialise full rows only for the rows that reach the output
+        full_rows = reader.rows_by_number([r for r, _ in picked], width=len(headers))
+        final_removed = [headers]
+        for row_no, exp_text in picked:
+            row = full_rows[row_no]
+            row[acct_idx] = "45000 Service Revenue"
+            row[amt_idx] = service_amount(exp_text)
+            final_removed.append(row)
 
+    # Save result (sharded past the sheet row limit)
+    save = metrics.stage("save", "rows").start()
     folder, fname = os.path.split(file_path)
     name, ext = os.path.splitext(fname)
     out_name = f"{name}_removed_only{ext or '.xlsx'}"
-    out_path = os.path.join(folder, out_name)
-    out_wb.save(out_path)
+    out_path = write_rows(os.path.join(folder, out_name), final_removed[0], final_removed[1:],
+                          title="Removed", max_rows=shard_rows, mode=shard_mode, workers=workers)
+    save.stop(len(final_removed) - 1)
+
+    return out_path, len(rows), len(final_removed)-1
+
+def simulate_windows(file_path, windows=SIMULATION_WINDOWS, confirm=None, progress=None,
+                     backend=None):
+    """What-if run of the removal rule for several window lengths at once.
+
+    Each Expense Class's dates are sorted once into a compact array of date
+    keys; a single pass over that array advances one "last kept" cutoff per
+    window. Writes a comparison sheet and returns (path, summary rows).
+    """
+    windows = sorted(set(int(w) for w in windows))
+    if not windows:
+        raise Exception("No window lengths given")
+
+    with open_sheet(file_path, backend, data_only=True) as reader:
+        headers = reader.header()
+        idxs = find_header_indexes(headers, confirm)
+
+        dates = defaultdict(list)       # class key -> date keys
+        no_date = defaultdict(int)      # class key -> rows without a date
+        total = empty = 0
+        expected = reader.max_row - 1 if reader.max_row else None
+        load = metrics.stage("workbook_load", "rows").start()
+        for _, (date_val, exp_val), _ in reader.iter_rows(
+                columns=[idxs["date"], idxs["expense class"]], min_row=2):
+            total += 1
+            if progress is not None and total % PROGRESS_EVERY == 0:
+                progress(total, expected)
+            exp_key = str(exp_val).strip().lower() if exp_val else None
+            if not exp_key:
+                empty += 1
+                continue
+            d = parse_date(date_val)
+            if d:
+                dates[exp_key].append(date_key(d))
+            else:
+                no_date[exp_key] += 1
+        load.stop(total)
+
+    classify = metrics.stage("classify", "rows").start()
+    n = len(windows)
+    kept = [0] * n
+    billed = [0] * n
+    revenue = [0.0] * n
+    for exp_key in set(dates) | set(no_date):
+        ords = array("q", sorted(dates.get(exp_key, ())))
+        undated = no_date.get(exp_key, 0)
+        class_kept = [0] * n
+        cutoff = [None] * n
+        for o in ords:
+            for k in range(n):
+                c = cutoff[k]
+                if c is None or o >= c:
+                    class_kept[k] += 1
+                    cutoff[k] = window_cutoff(o, windows[k])
+        for k in range(n):
+            kept[k] += class_kept[k]
+            if len(ords) - class_kept[k] + undated:
+                billed[k] += 1
+                revenue[k] += service_amount(exp_key)
+
+    classify.stop(total)
+
+    summary = [["Window (months)", "Rows", "Kept", "Removed",
+                "Classes Billed", "Service Revenue"]]
+    for k, w in enumerate(windows):
+        summary.append([w, total, kept[k], total - kept[k], billed[k], revenue[k]])
+
+    from openpyxl import Workbook
+    out_wb = Workbook()
+    out_ws = out_wb.active
+    out_ws.title = "Window Comparison"
+    for r in summary:
+        out_ws.append(r)
 
-    return out_path, len(entries), len(final_removed)-1
+    folder, fname = os.path.split(file_path)
+    name, _ = os.path.splitext(fname)
+    out_path = os.path.join(folder, f"{name}_window_simulation.xlsx")
+    with metrics.stage("save", "rows") as st:
+        save_workbook(out_wb, out_path)
+        st.count = len(summary) - 1
+    return out_path, summary[1:]
 
 # ----------------- GUI -----------------
 def load_default_path():
@@ -179,27 +233,83 @@ def run_process():
     if not os.path.isfile(p):
         messagebox.showwarning("Warning","Select a valid file.")
         return
-    try:
-        out, total, removed = filter_and_return_removed_only(p)
+    workers = default_workers() if parallel_var.get() else None
+
+    def done(result):
+        out, total, removed = result
         messagebox.showinfo("Done",
             f"Removed rows saved to:\n{out}\n\nProcessed: {total}\nRemoved (unique classes): {removed}")
-    except Exception as e:
+
+    def failed(e):
         messagebox.showerror("Error", str(e))
 
-root = tk.Tk()
-root.title("Removed Rows Exporter")
-root.geometry("720x250")
-root.resizable(False,False)
+    # Runs on a worker thread; header confirmation is asked on the Tk thread
+    job = BackgroundJob(root, progress_panel, filter_and_return_removed_only, p,
+                        workers=workers, on_done=done, on_error=failed)
+    job.kwargs["confirm"] = job.in_ui(tk_confirm(root))
+    job.start()
+
+def run_simulation():
+    p = entry_file_path.get()
+    if not os.path.isfile(p):
+        messagebox.showwarning("Warning","Select a valid file.")
+        return
+    try:
+        windows = [int(w) for w in entry_windows.get().replace(";", ",").split(",") if w.strip()]
+    except ValueError:
+        messagebox.showwarning("Warning","Windows must be whole months, e.g. 12, 18, 24")
+        return
+
+    def done(result):
+        out, summary = result
+        lines = "\n".join(f"{w} mo: kept {k}, removed {r}, revenue {rev:,.2f}"
+                          for w, _, k, r, _, rev in summary)
+        messagebox.showinfo("Done", f"Window comparison saved to:\n{out}\n\n{lines}")
+
+    def failed(e):
+        messagebox.showerror("Error", str(e))
+
+    job = BackgroundJob(root, progress_panel, simulate_windows, p, windows,
+                        on_done=done, on_error=failed)
+    job.kwargs["confirm"] = job.in_ui(tk_confirm(root))
+    job.start()
+
+# Guarded so process-pool workers can import this file without opening the GUI
+if __name__ == "__main__":
+    # Any arguments -> headless run (no Tk); see qbd_cli.py
+    if len(sys.argv) > 1:
+        from qbd_cli import main as cli_main
+        sys.exit(cli_main(["sr-process", *sys.argv[1:]]))
+
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_worker import BackgroundJob, ProgressPanel
+
+    root = tk.Tk()
+    root.title("Removed Rows Exporter")
+    root.geometry("720x410")
+    root.resizable(False,False)
+
+    tk.Label(root,text="Excel File Path:").pack(pady=(10,0))
+    entry_file_path = tk.Entry(root,width=95)
+    entry_file_path.pack(pady=5)
+    entry_file_path.insert(0, load_default_path())
+    tk.Button(root,text="Browse...",command=browse_file).pack()
+
+    tk.Button(root,text="Save this as my default path",command=save_default_path,
+              bg="#2196F3",fg="white").pack(pady=(10,5))
+    parallel_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(root,text="Use all CPU cores (large files)",variable=parallel_var).pack()
+    tk.Button(root,text="Run Filter",command=run_process,
+              bg="#4CAF50",fg="white",height=2).pack(pady=5)
 
-tk.Label(root,text="Excel File Path:").pack(pady=(10,0))
-entry_file_path = tk.Entry(root,width=95)
-entry_file_path.pack(pady=5)
-entry_file_path.insert(0, load_default_path())
-tk.Button(root,text="Browse...",command=browse_file).pack()
+    tk.Label(root,text="What-if windows (months):").pack(pady=(10,0))
+    entry_windows = tk.Entry(root,width=20)
+    entry_windows.pack(pady=5)
+    entry_windows.insert(0, ", ".join(str(w) for w in SIMULATION_WINDOWS))
+    tk.Button(root,text="Simulate Windows",command=run_simulation).pack()
 
-tk.Button(root,text="Save this as my default path",command=save_default_path,
-          bg="#2196F3",fg="white").pack(pady=(10,5))
-tk.Button(root,text="Run Filter",command=run_process,
-          bg="#4CAF50",fg="white",height=2).pack(pady=5)
+    progress_panel = ProgressPanel(root)
+    progress_panel.pack(pady=(10, 0))
 
-root.mainloop()
+    root.mainloop()
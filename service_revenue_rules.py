@@ -0,0 +1,116 @@
+"""Expense Class window rule shared by the service revenue tools.
+
+Rows are held as parallel arrays (class id, date key) and each Expense
+Class is evaluated independently, so classes can be spread across a
+process pool. Kept free of GUI code so pool workers can import it.
+"""
+import os
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from itertools import repeat
+
+from dateutil.relativedelta import relativedelta
+
+NO_DATE = -1
+
+
+def date_key(d):
+    """datetime -> microseconds since 0001-01-01; sortable and fits array('q')."""
+    secs = d.toordinal() * 86400 + d.hour * 3600 + d.minute * 60 + d.second
+    return secs * 1000000 + d.microsecond
+
+
+def key_to_datetime(key):
+    secs, micro = divmod(key, 1000000)
+    days, secs = divmod(secs, 86400)
+    return datetime.fromordinal(days) + timedelta(seconds=secs, microseconds=micro)
+
+
+def window_cutoff(key, months):
+    """First date key that is more than `months` months after `key`.
+
+    Same rule as relativedelta(later, earlier): months > N, or exactly N
+    months plus at least one day.
+    """
+    return date_key(key_to_datetime(key) + relativedelta(months=months) + timedelta(days=1))
+
+
+def removed_representative(members, date_keys, window_months):
+    """Row position billed for one Expense Class, or None if none is removed.
+
+    `members` are the class's row positions in file order. Undated rows are
+    removed first; otherwise it is the first dated row (in date order) that
+    falls inside the window of the last kept row.
+    """
+    for i in members:
+        if date_keys[i] == NO_DATE:
+            return i
+    cutoff = None
+    for i in sorted(members, key=date_keys.__getitem__):
+        k = date_keys[i]
+        if cutoff is None or k >= cutoff:
+            cutoff = window_cutoff(k, window_months)
+        else:
+            return i
+    return None
+
+
+def group_members(class_ids, n_classes):
+    """Row positions per class id (file order); negative ids are skipped."""
+    members = [array("l") for _ in range(n_classes)]
+    for i, cid in enumerate(class_ids):
+        if cid >= 0:
+            members[cid].append(i)
+    return members
+
+
+def partition_of(class_key, workers):
+    """Stable hash partition for a class key (same on every run/process)."""
+    return zlib.crc32(class_key.encode("utf-8")) % workers
+
+
+def _pick_partition(classes, window_months):
+    # classes: [(cid, array of date keys in file order)]
+    out = []
+    for cid, keys in classes:
+        i = removed_representative(range(len(keys)), keys, window_months)
+        if i is not None:
+            out.append((cid, i))
+    return out
+
+
+def pick_removed_rows(class_ids, date_keys, class_keys, window_months, workers=None):
+    """Billed row position per Expense Class, in class-id (first-seen) order.
+
+    With `workers` > 1 the classes are hash-partitioned on their key across
+    a process pool; results are merged back by class id, so the output is
+    the same as the serial path.
+    """
+    members = group_members(class_ids, len(class_keys))
+    if not workers or workers <= 1 or len(class_keys) < 2:
+        picked = []
+        for m in members:
+            i = removed_representative(m, date_keys, window_months)
+            if i is not None:
+                picked.append(i)
+        return picked
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers, len(class_keys))
+    partitions = [[] for _ in range(workers)]
+    for cid, m in enumerate(members):
+        keys = array("q", [date_keys[i] for i in m])
+        partitions[partition_of(class_keys[cid], workers)].append((cid, keys))
+
+    chosen = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_pick_partition, partitions, repeat(window_months)):
+            for cid, local in result:
+                chosen[cid] = members[cid][local]
+    return [chosen[cid] for cid in sorted(chosen)]
+
+
+def default_workers():
+    return os.cpu_count() or 1
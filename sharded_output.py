@@ -0,0 +1,158 @@
+"""Excel outputs that can outgrow one sheet.
+
+A sheet holds at most 1,048,576 rows; openpyxl writes more without
+complaint and Excel then refuses the file. write_rows() writes a header
+plus rows as one file while they fit in `max_rows` (header included).
+Past that it splits them into shards, each with the header repeated:
+
+    mode="workbooks"  out_part001.xlsx, out_part002.xlsx, ... written
+                      concurrently, one worker process per shard
+    mode="sheets"     one out.xlsx with sheets "Removed", "Removed (2)", ...
+
+and writes out_manifest.json listing every shard (file, sheet, first data
+row, row count), which is what it returns instead of the output path.
+"""
+import json
+import os
+from itertools import chain
+
+from jobs import PROGRESS_EVERY
+
+EXCEL_MAX_ROWS = 1048576
+SHARD_MODES = ("workbooks", "sheets")
+
+
+def shard_path(output_path, n):
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_part{n:03d}{ext or '.xlsx'}"
+
+
+def manifest_path(output_path):
+    return os.path.splitext(output_path)[0] + "_manifest.json"
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _write_shard(path, title, header, rows):
+    """One shard workbook; runs in a worker process."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    tmp = path + ".part"
+    wb.save(tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def write_rows(output_path, header, rows, title="Sheet", max_rows=None, mode="workbooks",
+               workers=None, progress=None, total=None):
+    """Write `header` + `rows`. Returns output_path, or the manifest path if sharded."""
+    max_rows = max_rows or EXCEL_MAX_ROWS
+    if not 2 <= max_rows <= EXCEL_MAX_ROWS:
+        raise Exception(f"Rows per shard must be between 2 and {EXCEL_MAX_ROWS:,}")
+    if mode not in SHARD_MODES:
+        raise Exception(f"Unknown shard mode: '{mode}' (use {' or '.join(SHARD_MODES)})")
+
+    parts = _chunks(rows, max_rows - 1)
+    first = next(parts, [])
+    second = next(parts, None)
+    if second is None:
+        _write_single(output_path, title, header, first, progress, total)
+        return output_path
+
+    shards = chain([first, second], parts)
+    if mode == "sheets":
+        entries = _write_sheets(output_path, title, header, shards, progress, total)
+    else:
+        entries = _write_workbooks(output_path, title, header, shards, workers, progress, total)
+    manifest = {
+        "output": os.path.basename(output_path),
+        "mode": mode,
+        "max_rows": max_rows,
+        "total_rows": sum(e["rows"] for e in entries),
+        "header": header,
+        "shards": entries,
+    }
+    path = manifest_path(output_path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return path
+
+
+def _write_single(output_path, title, header, rows, progress, total):
+    from openpyxl import Workbook
+
+    from batch_io import save_workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(header)
+    for n, row in enumerate(rows, start=1):
+        if progress is not None and n % PROGRESS_EVERY == 0:
+            progress(n, total)
+        ws.append(row)
+    save_workbook(wb, output_path)
+
+
+def _write_sheets(output_path, title, header, shards, progress, total):
+    """All shards as sheets of one workbook (a single writer: one file)."""
+    from openpyxl import Workbook
+
+    from batch_io import save_workbook
+
+    wb = Workbook(write_only=True)
+    entries = []
+    done = 0
+    for n, chunk in enumerate(shards, start=1):
+        sheet = title if n == 1 else f"{title} ({n})"
+        ws = wb.create_sheet(sheet)
+        ws.append(header)
+        for row in chunk:
+            ws.append(row)
+        entries.append({"file": os.path.basename(output_path), "sheet": sheet,
+                        "first_row": done + 1, "rows": len(chunk)})
+        done += len(chunk)
+        if progress is not None:
+            progress(done, total)
+    save_workbook(wb, output_path)
+    return entries
+
+
+def _write_workbooks(output_path, title, header, shards, workers, progress, total):
+    """One workbook per shard, written on a process pool."""
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    workers = max(workers or os.cpu_count() or 1, 1)
+    entries = []
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        for n, chunk in enumerate(shards, start=1):
+            path = shard_path(output_path, n)
+            entries.append({"file": os.path.basename(path), "sheet": title,
+                            "first_row": done + 1, "rows": len(chunk)})
+            done += len(chunk)
+            running.add(pool.submit(_write_shard, path, title, header, chunk))
+            # hold at most one shard per worker in memory
+            if len(running) >= workers:
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    fut.result()
+            if progress is not None:
+                progress(done, total)
+        for fut in running:
+            fut.result()
+    return entries
@@ -0,0 +1,185 @@
+"""Pluggable worksheet readers: the streaming fast reader or openpyxl.
+
+    with open_sheet(path, backend) as sheet:
+        header = sheet.header()
+        for row in sheet.rows(min_row=2):   # plain tuples
+            ...
+
+"fast" streams the sheet XML straight out of the zip with expat and a
+shared-strings table (xlsx_fast_reader); "openpyxl" loads the workbook
+object model. Both give the same interface (header, rows, iter_rows,
+rows_by_number, max_row, max_column) and rows come back as tuples padded
+to the sheet width, like openpyxl's values_only rows.
+`benchmarks/check_readers.py` checks that they agree.
+
+Formula cells: the fast path reads the cached value (None when the file
+has none), like openpyxl with data_only=True; plain openpyxl reads the
+formula text ("=A1+B1"). open_sheet's `data_only` follows each tool's
+original load_workbook call, and the tools that kept formulas (trader
+importers, sr-filter, sr-removed) default to openpyxl.
+
+open_for_update() is the same choice for the trader importers, which edit
+cells in place: openpyxl saves the whole workbook back with formatting,
+the fast path streams the edited values into a new single-sheet workbook.
+With copy=False nothing is kept for saving (the edits are only looked at,
+e.g. for a change log).
+"""
+from batch_io import save_workbook, source
+
+BACKENDS = ("fast", "openpyxl")
+DEFAULT_BACKEND = "fast"
+
+
+def _check(backend):
+    if backend not in BACKENDS:
+        raise Exception(f"Unknown reader backend: '{backend}' (use {' or '.join(BACKENDS)})")
+
+
+def open_sheet(file_path, backend=None, sheet=None, data_only=False):
+    """Reader for one worksheet (`sheet` name, or the active sheet).
+
+    `data_only` is passed to openpyxl's load_workbook; the fast reader
+    always reads cached values.
+    """
+    backend = backend or DEFAULT_BACKEND
+    _check(backend)
+    if backend == "fast":
+        from xlsx_fast_reader import FastSheetReader
+
+        return FastSheetReader(source(file_path), sheet)
+    return OpenpyxlSheet(file_path, sheet, data_only)
+
+
+class OpenpyxlSheet:
+    """openpyxl behind the FastSheetReader interface."""
+
+    def __init__(self, file_path, sheet=None, data_only=False):
+        from openpyxl import load_workbook
+
+        self.wb = load_workbook(source(file_path), data_only=data_only)
+        self.sheet_names = self.wb.sheetnames
+        self.ws = self.wb[sheet] if sheet is not None else self.wb.active
+        self.sheet_name = self.ws.title
+        self.max_row = self.ws.max_row
+        self.max_column = self.ws.max_column
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.wb.close()
+
+    def rows(self, min_row=1):
+        return self.ws.iter_rows(min_row=min_row, values_only=True)
+
+    def header(self, row=1):
+        return [cell.value for cell in self.ws[row]]
+
+    def iter_rows(self, columns=None, min_row=1, passthrough=False, row_numbers=None):
+        """Same contract as FastSheetReader.iter_rows."""
+        for r, values in enumerate(self.rows(min_row), start=min_row):
+            if row_numbers is not None and r not in row_numbers:
+                continue
+            proj = tuple(values[c] if c < len(values) else None for c in columns) \
+                if columns is not None else None
+            full = list(values) if passthrough or columns is None else None
+            yield r, proj, full
+
+    def rows_by_number(self, row_numbers, width=None):
+        found = {}
+        for r in row_numbers:
+            row = [cell.value for cell in self.ws[r]]
+            if width and len(row) < width:
+                row += [None] * (width - len(row))
+            found[r] = row
+        return found
+
+
+# ---- Editing (trader importers) ----
+class ValueCell:
+    """Stands in for an openpyxl cell on the fast path: only .value."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class SheetUpdate:
+    """Rows of cells to edit in place, then save() a copy.
+
+        with open_for_update(path, backend) as sheet:
+            for row in sheet.rows(min_row=2):
+                row[4].value = "51300"
+            sheet.save(new_path)
+    """
+
+    def __init__(self, file_path, backend, copy=True):
+        _check(backend)
+        self.backend = backend
+        self.copy = copy
+        if not copy:
+            self.reader = open_sheet(file_path, backend)
+            self.wb = None
+            self.title = self.reader.sheet_name
+            self.total = (self.reader.max_row or 1) - 1
+        elif backend == "openpyxl":
+            from openpyxl import load_workbook
+
+            self.wb = load_workbook(source(file_path))
+            self.ws = self.wb.active
+            self.reader = None
+            self.title = self.ws.title
+            self.total = self.ws.max_row - 1
+        else:
+            from openpyxl import Workbook
+
+            from xlsx_fast_reader import FastSheetReader
+
+            self.reader = FastSheetReader(source(file_path))
+            self.wb = Workbook(write_only=True)
+            self.ws = self.wb.create_sheet(self.reader.sheet_name)
+            self.title = self.reader.sheet_name
+            self.total = (self.reader.max_row or 1) - 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+
+    def rows(self, min_row=2):
+        if self.reader is None:
+            yield from self.ws.iter_rows(min_row=min_row)
+            return
+        if not self.copy:
+            for values in self.reader.rows(min_row):
+                yield [ValueCell(v) for v in values]
+            return
+        width = self.reader.width()
+        # rows above min_row are copied unchanged; each edited row is
+        # written out when the caller moves on to the next one
+        for r, _, full in self.reader.iter_rows():
+            if len(full) < width:
+                full += [None] * (width - len(full))
+            if r < min_row:
+                self.ws.append(full)
+                continue
+            row = [ValueCell(v) for v in full]
+            yield row
+            self.ws.append([c.value for c in row])
+
+    def save(self, path):
+        if not self.copy:
+            raise Exception("Opened without a copy to save (copy=False)")
+        save_workbook(self.wb, path)
+
+
+def open_for_update(file_path, backend="openpyxl", copy=True):
+    return SheetUpdate(file_path, backend or "openpyxl", copy)
@@ -0,0 +1,480 @@
+"""Streaming reader for the sheet XML inside an .xlsx file.
+
+The service revenue tools only need a handful of columns out of wide
+QuickBooks exports. This reader resolves the header row once, then streams
+the sheet XML with expat and decodes only the projected columns. Cells
+outside the projection are skipped: no text is collected and no value is
+built for them. Full rows are only decoded on request (passthrough), e.g.
+for the few rows that end up in an output workbook.
+
+Values follow openpyxl's ``data_only=True`` rules (shared strings, inline
+strings, booleans, errors, and date-styled numbers become datetimes).
+"""
+import posixpath
+import re
+import zipfile
+from datetime import datetime, timedelta, time
+from xml.etree import ElementTree
+from xml.parsers import expat
+
+CHUNK_SIZE = 1 << 16
+
+WINDOWS_EPOCH = datetime(1899, 12, 30)
+MAC_EPOCH = datetime(1904, 1, 1)
+
+# Built-in number formats that Excel renders as dates/times
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+BUILTIN_TIMEDELTA_FORMATS = {46}
+
+_LITERAL_RE = re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_DATE_TOKEN_RE = re.compile(r"(?<![_\\])[dmhysDMHYS]")
+_TIMEDELTA_RE = re.compile(r"\[hh?\](:mm(:ss(\.0*)?)?)?|\[mm?\](:ss(\.0*)?)?|\[ss?\](\.0*)?", re.I)
+
+_CELL_REF_RE = re.compile(rb'<(?:\w+:)?c\s[^>]*?\br="([A-Z]+)')
+
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+# ----------------- Helpers -----------------
+def column_index(ref):
+    """'C7' -> 2 (0-based column index of a cell reference)."""
+    idx = 0
+    for ch in ref:
+        o = ord(ch)
+        if 65 <= o <= 90:
+            idx = idx * 26 + o - 64
+        elif 97 <= o <= 122:
+            idx = idx * 26 + o - 96
+        else:
+            break
+    return idx - 1
+
+
+def _local(name):
+    return name.rpartition(":")[2] if ":" in name else name
+
+
+def _cast_number(s):
+    if "." in s or "E" in s or "e" in s:
+        return float(s)
+    return int(s)
+
+
+def _is_date_format(fmt):
+    fmt = _LITERAL_RE.sub("", fmt.split(";")[0])
+    return _DATE_TOKEN_RE.search(fmt) is not None
+
+
+def _is_timedelta_format(fmt):
+    return _TIMEDELTA_RE.search(fmt.split(";")[0]) is not None
+
+
+def from_excel(value, epoch=WINDOWS_EPOCH, as_timedelta=False):
+    """Excel serial number -> datetime (same rules as openpyxl)."""
+    if as_timedelta:
+        td = timedelta(days=value)
+        if td.microseconds:
+            td = timedelta(seconds=td.total_seconds() // 1,
+                           microseconds=round(td.microseconds, -3))
+        return td
+    day, fraction = divmod(value, 1)
+    diff = timedelta(milliseconds=round(fraction * 86400 * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        mins, seconds = divmod(diff.seconds, 60)
+        hours, mins = divmod(mins, 60)
+        return time(hours, mins, seconds, diff.microseconds)
+    if 0 < value < 60 and epoch == WINDOWS_EPOCH:
+        day += 1
+    return epoch + timedelta(days=day) + diff
+
+
+def _parse_iso(s):
+    try:
+        return datetime.fromisoformat(s.rstrip("Z"))
+    except ValueError:
+        return s
+
+
+# ----------------- Workbook parts -----------------
+def _read_shared_strings(zf, name):
+    strings = []
+    parts = []
+    state = {"depth_rph": 0}
+
+    def start(tag, attrs):
+        tag = _local(tag)
+        if tag == "si":
+            parts.clear()
+        elif tag == "rPh":
+            state["depth_rph"] += 1
+        elif tag == "t" and not state["depth_rph"]:
+            p.CharacterDataHandler = parts.append
+
+    def end(tag):
+        tag = _local(tag)
+        if tag == "t":
+            p.CharacterDataHandler = None
+        elif tag == "rPh":
+            state["depth_rph"] -= 1
+        elif tag == "si":
+            strings.append("".join(parts).replace("x005F_", ""))
+
+    p = expat.ParserCreate()
+    p.buffer_text = True
+    p.StartElementHandler = start
+    p.EndElementHandler = end
+    with zf.open(name) as f:
+        p.ParseFile(f)
+    return strings
+
+
+def _read_styles(zf, name):
+    """Return (date_style_ids, timedelta_style_ids) from styles.xml."""
+    root = ElementTree.fromstring(zf.read(name))
+    custom = {}
+    xfs = []
+    for el in root.iter():
+        tag = el.tag.rpartition("}")[2]
+        if tag == "numFmt":
+            custom[int(el.get("numFmtId"))] = el.get("formatCode", "")
+        elif tag == "cellXfs":
+            xfs = [int(xf.get("numFmtId", 0)) for xf in el
+                   if xf.tag.rpartition("}")[2] == "xf"]
+    dates, deltas = set(), set()
+    for idx, fmt_id in enumerate(xfs):
+        if fmt_id in custom:
+            fmt = custom[fmt_id]
+            if _is_date_format(fmt):
+                dates.add(idx)
+            if _is_timedelta_format(fmt):
+                deltas.add(idx)
+        else:
+            if fmt_id in BUILTIN_DATE_FORMATS:
+                dates.add(idx)
+            if fmt_id in BUILTIN_TIMEDELTA_FORMATS:
+                deltas.add(idx)
+    return dates, deltas
+
+
+def _part_path(base, target):
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _rels(zf, part):
+    folder, name = posixpath.split(part)
+    rels_name = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_name not in zf.namelist():
+        return {}
+    root = ElementTree.fromstring(zf.read(rels_name))
+    return {
+        r.get("Id"): (r.get("Type", ""), _part_path(part, r.get("Target", "")))
+        for r in root.iter("{%s}Relationship" % _PKG_REL_NS)
+    }
+
+
+# ----------------- Reader -----------------
+class FastSheetReader:
+    """Open one worksheet of an .xlsx for streaming reads.
+
+    `sheet` is a sheet name or None for the active sheet (same as wb.active).
+    """
+
+    def __init__(self, file_path, sheet=None):
+        self.file_path = file_path
+        self.zf = zipfile.ZipFile(file_path)
+        try:
+            self._load_workbook_parts(sheet)
+        except Exception:
+            self.zf.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.zf.close()
+
+    def _load_workbook_parts(self, sheet):
+        wb_part = "xl/workbook.xml"
+        for rel_type, target in _rels(self.zf, "").values():
+            if rel_type.endswith("/officeDocument"):
+                wb_part = target
+        root = ElementTree.fromstring(self.zf.read(wb_part))
+        ns = root.tag.rpartition("}")[0] + "}" if root.tag.startswith("{") else ""
+
+        self.epoch = WINDOWS_EPOCH
+        pr = root.find(ns + "workbookPr")
+        if pr is not None and pr.get("date1904") in ("1", "true"):
+            self.epoch = MAC_EPOCH
+
+        active = 0
+        view = root.find(ns + "bookViews/" + ns + "workbookView")
+        if view is not None:
+            active = int(view.get("activeTab", 0))
+
+        sheets = [(s.get("name"), s.get("{%s}id" % _REL_NS))
+                  for s in root.iter(ns + "sheet")]
+        self.sheet_names = [n for n, _ in sheets]
+        if not sheets:
+            raise Exception("Workbook contains no worksheets")
+        if sheet is None:
+            name, rid = sheets[min(active, len(sheets) - 1)]
+        else:
+            match = [s for s in sheets if s[0] == sheet]
+            if not match:
+                raise Exception(f"Worksheet not found: '{sheet}'")
+            name, rid = match[0]
+        self.sheet_name = name
+
+        rels = _rels(self.zf, wb_part)
+        self.sheet_part = rels[rid][1]
+        self.shared_strings = []
+        self.date_styles, self.timedelta_styles = set(), set()
+        for rel_type, target in rels.values():
+            if rel_type.endswith("/sharedStrings"):
+                self.shared_strings = _read_shared_strings(self.zf, target)
+            elif rel_type.endswith("/styles"):
+                self.date_styles, self.timedelta_styles = _read_styles(self.zf, target)
+
+        self.max_column = None
+        self.max_row = None         # from <dimension>; a hint only (progress totals)
+        self.dimension_range = False
+        self._read_dimension()
+
+    def _read_dimension(self):
+        # <dimension> sits before <sheetData>; stop as soon as data begins
+        with self.zf.open(self.sheet_part) as f:
+            head = f.read(4096).decode("utf-8", "ignore")
+        m = re.search(r'<(?:\w+:)?dimension\s+ref="([^"]+)"', head)
+        if m:
+            self.dimension_range = ":" in m.group(1)
+            last = m.group(1).split(":")[-1]
+            self.max_column = column_index(last) + 1
+            digits = last.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+            if digits.isdigit():
+                self.max_row = int(digits)
+
+    def _convert(self, t, s, text):
+        if t == "s":
+            return self.shared_strings[int(text)]
+        if t == "n":
+            if not text:
+                return None
+            value = _cast_number(text)
+            if s in self.date_styles:
+                try:
+                    return from_excel(value, self.epoch, s in self.timedelta_styles)
+                except (OverflowError, ValueError):
+                    return "#VALUE!"
+            return value
+        if t == "b":
+            return bool(int(text)) if text else None
+        if t == "d":
+            return _parse_iso(text) if text else None
+        if t == "inlineStr":
+            return text
+        # "str" (formula result) and "e" (error) stay as text
+        return text or None
+
+    def iter_rows(self, columns=None, min_row=1, passthrough=False, row_numbers=None):
+        """Yield (row_number, projected, full) for every data row.
+
+        `columns` lists 0-based column indexes; `projected` is a tuple of
+        their values in that order. `full` is the whole row as a list when
+        `passthrough` is true, else None. With `columns=None` only `full`
+        is produced. `row_numbers`, if given, restricts output to those rows.
+        Missing rows between populated rows come back as empty rows, the
+        same as openpyxl's iter_rows.
+        """
+        wanted = {c: pos for pos, c in enumerate(columns or ())}
+        width = len(wanted)
+        decode_all = passthrough or columns is None
+        empty_proj = (None,) * width
+
+        out = []
+        state = {
+            "row": 0, "col": -1, "emitted": min_row - 1,
+            "proj": None, "full": None, "keep": True,
+            "t": "n", "s": 0, "pos": None, "in_is": False, "rph": 0,
+        }
+        text = []
+
+        def start(tag, attrs):
+            tag = _local(tag)
+            if tag == "c":
+                ref = attrs.get("r")
+                state["col"] = column_index(ref) if ref else state["col"] + 1
+                state["has_cells"] = True
+                if not state["keep"]:
+                    return
+                col = state["col"]
+                pos = wanted.get(col)
+                if pos is None and not decode_all:
+                    state["pos"] = None
+                    return
+                state["pos"] = col
+                state["t"] = attrs.get("t", "n")
+                s = attrs.get("s")
+                state["s"] = int(s) if s else 0
+                state["had_is"] = False
+                text.clear()
+            elif state["pos"] is None:
+                return
+            elif tag == "v":
+                if state["t"] != "inlineStr":
+                    p.CharacterDataHandler = text.append
+            elif tag == "is":
+                state["in_is"] = state["had_is"] = True
+            elif tag == "rPh":
+                state["rph"] += 1
+            elif tag == "t" and state["in_is"] and not state["rph"]:
+                p.CharacterDataHandler = text.append
+
+        def end(tag):
+            tag = _local(tag)
+            if tag in ("v", "t"):
+                p.CharacterDataHandler = None
+            elif tag == "rPh":
+                state["rph"] -= 1
+            elif tag == "is":
+                state["in_is"] = False
+            elif tag == "c":
+                col = state["pos"]
+                state["pos"] = None
+                if col is None:
+                    return
+                if state["t"] == "inlineStr" and not state["had_is"]:
+                    value = None  # <c t="inlineStr"/>: an empty cell to openpyxl
+                else:
+                    value = self._convert(state["t"], state["s"], "".join(text))
+                pos = wanted.get(col)
+                if pos is not None:
+                    if state["proj"] is None:
+                        state["proj"] = [None] * width
+                    state["proj"][pos] = value
+                if decode_all:
+                    full = state["full"]
+                    if full is None:
+                        full = state["full"] = []
+                    if col >= len(full):
+                        full.extend([None] * (col + 1 - len(full)))
+                    full[col] = value
+            elif tag == "row":
+                finish_row()
+
+        def start_row(tag, attrs):
+            if _local(tag) == "row":
+                r = attrs.get("r")
+                state["row"] = int(r) if r else state["row"] + 1
+                state["col"] = -1
+                state["proj"] = None
+                state["full"] = None
+                state["has_cells"] = False
+                state["keep"] = state["row"] >= min_row and (
+                    row_numbers is None or state["row"] in row_numbers)
+            start(tag, attrs)
+
+        def finish_row():
+            if not state["has_cells"]:
+                return
+            r = state["row"]
+            if r < min_row:
+                return
+            # fill gaps (rows with no <row> element) like openpyxl does
+            for gap in range(state["emitted"] + 1, r):
+                if row_numbers is None or gap in row_numbers:
+                    out.append((gap, empty_proj if columns is not None else None,
+                                [] if decode_all else None))
+            state["emitted"] = r
+            if not state["keep"]:
+                return
+            proj = tuple(state["proj"]) if state["proj"] is not None else empty_proj
+            full = state["full"] if state["full"] is not None else ([] if decode_all else None)
+            out.append((r, proj if columns is not None else None, full))
+
+        state["has_cells"] = False
+
+        p = expat.ParserCreate()
+        p.buffer_text = True
+        p.buffer_size = CHUNK_SIZE
+        p.StartElementHandler = start_row
+        p.EndElementHandler = end
+
+        with self.zf.open(self.sheet_part) as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    p.Parse(b"", True)
+                    break
+                p.Parse(chunk, False)
+                if out:
+                    yield from out
+                    out.clear()
+        if out:
+            yield from out
+            out.clear()
+
+    def _scan_width(self):
+        """Used width from the cell references, for sheets written without
+        a <dimension> range (e.g. openpyxl write-only). One cheap regex pass."""
+        width = 0
+        tail = b""
+        with self.zf.open(self.sheet_part) as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = tail + chunk
+                for ref in set(_CELL_REF_RE.findall(data)):
+                    width = max(width, column_index(ref.decode()) + 1)
+                tail = data[-16:]
+        return width
+
+    def width(self):
+        """Sheet width as openpyxl counts it (max_column)."""
+        if not self.dimension_range:
+            self.max_column = self._scan_width()
+            self.dimension_range = True
+        return self.max_column or 0
+
+    def rows(self, min_row=1):
+        """Every row from `min_row` as a tuple padded to the sheet width,
+        like openpyxl's iter_rows(values_only=True)."""
+        width = self.width()
+        for _, _, full in self.iter_rows(min_row=min_row):
+            if len(full) < width:
+                full += [None] * (width - len(full))
+            yield tuple(full)
+
+    def header(self, row=1):
+        """Values of the header row, padded to the sheet's used width."""
+        values = []
+        for r, _, full in self.iter_rows(min_row=row, row_numbers={row}):
+            if r == row:
+                values = list(full)
+                break
+        width = self.width()
+        if len(values) < width:
+            values += [None] * (width - len(values))
+        return values
+
+    def rows_by_number(self, row_numbers, width=None):
+        """Materialise full rows for the given row numbers -> {row: list}."""
+        wanted = set(row_numbers)
+        found = {}
+        if not wanted:
+            return found
+        for r, _, full in self.iter_rows(min_row=min(wanted), row_numbers=wanted):
+            row = list(full)
+            if width and len(row) < width:
+                row += [None] * (width - len(row))
+            found[r] = row
+            if len(found) == len(wanted):
+                break
+        return found